@@ -5,51 +5,92 @@ import os
 from flask import Flask
 from flask_cors import CORS
 
-from backend.config import config, db
-from backend.models.kategori import Kategori
-from backend.models.vare import Vare
-from backend.models.indkoebsliste_element import IndkoebslisteElement
+from backend.config.config import config, db
+from backend.config.sqlite import init_sqlite_tuning, init_fork_safety, init_async_driver
+from backend.utils.versioning import init_versioning
+from backend.utils.cache import init_cache, cache_stats
+from backend.utils.compression import init_compression, compression_stats
+from backend.utils.coalescing import init_coalescing, coalescing_stats
+from backend.utils.events import init_events
+from backend.utils.autocomplete import init_autocomplete
+from backend.utils.metrics import init_metrics, get_metrics
+from backend.utils.serialization import init_json
+from backend.utils.tenancy import init_households
 
 
-def create_app(config_name=None):
-    """Application factory for creating Flask app instance."""
+def create_app(config_name=None, asgi=False):
+    """
+    Application factory for creating Flask app instance.
+    
+    Laver ingen database I/O; tabeller og sample data oprettes med
+    `flask db init` og `flask db seed` (se backend/cli.py).
+    
+    Med asgi=True bruges aiosqlite som database driver, og appen skal
+    køres af ASGI serveren i backend/asgi.py.
+    """
     
     if config_name is None:
         config_name = os.environ.get('FLASK_ENV', 'development')
     
     app = Flask(__name__)
     app.config.from_object(config.get(config_name, config['default']))
+    if asgi:
+        init_async_driver(app)  # Database I/O venter på event loopet
     
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        init_sqlite_tuning(app, db.engine)  # WAL og PRAGMAs på hver forbindelse
+        init_fork_safety(db.engine)  # Ny forbindelsespulje i forkede workers
+        init_metrics(app, db.engine)  # Server-Timing, /api/metrics og slow query log
     CORS(app)  # Enable CORS for React frontend
+    init_json(app)  # Hurtigere JSON provider (orjson hvis installeret)
+    init_versioning(app)  # Versionstællere til ETags
+    init_cache(app)  # Læsecache for kategori- og varelister
+    init_coalescing(app)  # Samtidige ens GET requests deler ét svar
+    init_events(app)  # Live opdateringer af indkøbslisten (SSE)
+    init_autocomplete(app)  # Prefix indeks over varenavne
+    init_households(app)  # Én database per husstand (HOUSEHOLD_MODE)
+    init_compression(app)  # gzip/brotli af store svar
+    
+    from backend.cli import db_cli
+    app.cli.add_command(db_cli)  # flask db init/seed/reset
     
     # Register blueprints
-    from backend.routes import kategori_bp, vare_bp, indkoebsliste_bp
+    from backend.routes import kategori_bp, vare_bp, indkoebsliste_bp, sync_bp, transfer_bp
     
     app.register_blueprint(kategori_bp, url_prefix='/api/kategorier')
     app.register_blueprint(vare_bp, url_prefix='/api/varer')
     app.register_blueprint(indkoebsliste_bp, url_prefix='/api/indkoebsliste')
+    app.register_blueprint(sync_bp, url_prefix='/api/sync')
+    app.register_blueprint(transfer_bp, url_prefix='/api')
     
     # Health check endpoint
     @app.route('/api/health')
     def health_check():
         return {'status': 'healthy', 'message': 'Huskeseddel API is running'}
     
-    # Create tables and sample data on first run
-    with app.app_context():
-        from backend.config.database import create_tables, init_sample_data
-        
-        # Check if tables exist, if not create them
-        try:
-            db.create_all()
-            init_sample_data()
-        except Exception as e:
-            app.logger.error(f"Error initializing database: {e}")
+    # Læsecache statistik (hit/miss tællere)
+    @app.route('/api/cache/stats')
+    def get_cache_stats():
+        return {**cache_stats(), 'coalescing': coalescing_stats(), 'compression': compression_stats()}
+    
+    # Prometheus metrics for processen
+    @app.route('/api/metrics')
+    def get_metrics_text():
+        metrics = get_metrics()
+        if metrics is None:
+            return {'error': 'Metrics er slået fra'}, 404
+        return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
     
     return app
 
 
 if __name__ == '__main__':
+    from backend.config.database import create_tables, init_sample_data
+    
     app = create_app()
+    with app.app_context():
+        create_tables()
+        init_sample_data()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
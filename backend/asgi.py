@@ -0,0 +1,13 @@
+"""
+ASGI entry point (valgfri, kræver pip install huskeseddel[asgi]).
+
+Serverer det samme API som backend/wsgi.py, men alle forbindelser deles om
+én event loop og database I/O går gennem aiosqlite (se backend/utils/asgi.py):
+
+    uvicorn backend.asgi:app --host 0.0.0.0 --port 5000
+"""
+import os
+from backend.app import create_app
+from backend.utils.asgi import AsgiApp
+
+app = AsgiApp(create_app(os.environ.get('FLASK_ENV', 'production'), asgi=True))
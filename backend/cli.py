@@ -0,0 +1,191 @@
+"""
+Flask CLI kommandoer til database administration.
+
+Bruges med `flask --app backend.app db <kommando>` (FLASK_APP er sat i .flaskenv):
+
+    flask db init      Opret tabeller, indekser, søgeindeks og triggers
+    flask db seed      Tilføj sample data hvis databasen er tom
+    flask db reset     Slet alle data og genopret med sample data
+    flask db prune-tombstones --days 30
+    flask db compact-history --days 30
+    flask db export varer --format csv -o varer.csv
+    flask db import varer varer.csv --format csv
+
+Med HOUSEHOLD_MODE tager kommandoerne --household og kører mod husstandens
+database. init opretter en ny husstand, og migrate-households kører init på
+alle husstande:
+
+    flask db init --household jensen
+    flask db seed --household jensen
+    flask db households
+    flask db migrate-households --jobs 4
+"""
+import functools
+import os
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+db_cli = AppGroup('db', help='Database administration.')
+
+
+def household_option(f=None, create=False):
+    """
+    Tilføj --household, der kører kommandoen mod en husstands database.
+
+    Kun kommandoer med create=True (init) opretter en husstand der ikke findes.
+    """
+    if f is None:
+        return functools.partial(household_option, create=create)
+
+    @click.option('--household', default=None, help='Husstand (kræver HOUSEHOLD_MODE).')
+    @functools.wraps(f)
+    def wrapper(*args, household=None, **kwargs):
+        if household is None:
+            return f(*args, **kwargs)
+        from backend.utils.tenancy import HouseholdError, use_household
+        try:
+            with use_household(household, create=create):
+                return f(*args, **kwargs)
+        except HouseholdError as e:
+            raise click.ClickException(e.message)
+    return wrapper
+
+
+@db_cli.command('init')
+@household_option(create=True)
+def init_command():
+    """Opret tabeller og migrer en eksisterende database (eller en ny husstand)."""
+    from backend.config.database import create_tables
+    create_tables()
+    click.echo('Database er initialiseret.')
+
+
+@db_cli.command('seed')
+@household_option
+def seed_command():
+    """Tilføj sample kategorier og varer."""
+    from backend.config.database import init_sample_data
+    init_sample_data()
+
+
+@db_cli.command('reset')
+@household_option
+@click.confirmation_option(prompt='Alle data slettes. Fortsæt?')
+def reset_command():
+    """Slet alle data og genopret tabeller med sample data."""
+    from backend.config.database import reset_database
+    reset_database()
+
+
+@db_cli.command('prune-tombstones')
+@household_option
+@click.option('--days', default=30, show_default=True, help='Slet tombstones ældre end så mange dage.')
+def prune_tombstones_command(days):
+    """Ryd gamle tombstones fra delta sync."""
+    from backend.utils.sync import prune_tombstones
+    antal = prune_tombstones(days=days)
+    click.echo(f'Slettede {antal} tombstones.')
+
+
+@db_cli.command('compact-history')
+@household_option
+@click.option('--days', type=int, default=None, help='Arkiver købte varer ældre end så mange dage (default ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, default=None, help='Elementer per transaktion (default ARCHIVE_BATCH_SIZE).')
+def compact_history_command(days, batch_size):
+    """Flyt gammel købshistorik til arkivet, så den aktive tabel forbliver lille."""
+    from backend.utils.archive import compact_history, get_archive_statistics
+    try:
+        antal = compact_history(days, batch_size)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    tal = get_archive_statistics()
+    click.echo(
+        f"Arkiverede {antal} elementer. "
+        f"{tal['elementer']} elementer i indkøbslisten, {tal['arkiverede']} i arkivet."
+    )
+
+
+@db_cli.command('export')
+@household_option
+@click.argument('entitet', type=click.Choice(['kategorier', 'varer', 'historik']))
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default='ndjson', show_default=True)
+@click.option('-o', '--output', type=click.File('w', encoding='utf-8'), default='-', help='Fil (default: stdout).')
+def export_command(entitet, fmt, output):
+    """Eksporter kategorier, varer eller historik som NDJSON eller CSV."""
+    from backend.utils.transfer import export_entity
+    for chunk in export_entity(entitet, fmt):
+        output.write(chunk)
+
+
+@db_cli.command('import')
+@household_option
+@click.argument('entitet', type=click.Choice(['kategorier', 'varer', 'historik']))
+@click.argument('fil', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default='ndjson', show_default=True)
+@click.option('--chunk-size', default=10000, show_default=True, help='Rækker per transaktion.')
+def import_command(entitet, fil, fmt, chunk_size):
+    """Importer kategorier, varer eller historik fra en NDJSON eller CSV fil."""
+    from backend.utils import ValidationError
+    from backend.utils.transfer import import_entity, read_rows
+    try:
+        resultat = import_entity(entitet, read_rows(fil, fmt), chunk_size=chunk_size)
+    except ValidationError as e:
+        raise click.ClickException(e.message)
+    click.echo(f"Importerede {resultat['importeret']} rækker, sprang {resultat['sprunget_over']} over.")
+
+
+def _get_household_pool():
+    from backend.utils.tenancy import get_pool
+    pool = get_pool()
+    if pool is None:
+        raise click.ClickException('Husstande er ikke slået til (sæt HOUSEHOLD_MODE=true).')
+    return pool
+
+
+@db_cli.command('households')
+def households_command():
+    """List husstande og størrelsen på deres databaser."""
+    pool = _get_household_pool()
+    for name in pool.names():
+        size = sum(
+            os.path.getsize(path) for path in (pool.path(name), pool.path(name) + '-wal')
+            if os.path.exists(path)
+        )
+        click.echo(f'{name:<30} {size / (1024 * 1024):8.1f} MiB')
+
+
+@db_cli.command('migrate-households')
+@click.option('--household', 'names', multiple=True, help='Kun denne husstand (kan gentages).')
+@click.option('--jobs', default=4, show_default=True, help='Husstande der migreres samtidigt.')
+def migrate_households_command(names, jobs):
+    """Kør init (tabeller, kolonner, indekser, triggers) på alle husstandes databaser."""
+    from concurrent.futures import ThreadPoolExecutor
+    from backend.utils.tenancy import use_household
+
+    pool = _get_household_pool()
+    names = list(names) or pool.names()
+    app = current_app._get_current_object()
+
+    def migrate(name):
+        # Hver tråd har sin egen app context og dermed sin egen session
+        with app.app_context():
+            try:
+                with use_household(name, create=False, migrate=True):
+                    pass
+            except Exception as e:
+                return name, e
+        return name, None
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for name, error in executor.map(migrate, names):
+            if error is None:
+                click.echo(f'{name}: migreret')
+            else:
+                failed += 1
+                click.echo(f'{name}: FEJL {error}', err=True)
+
+    click.echo(f'Migrerede {len(names) - failed} af {len(names)} husstande.')
+    if failed:
+        raise click.ClickException(f'{failed} husstande kunne ikke migreres.')
@@ -1,10 +1,23 @@
 """
 Configuration module initialization.
+
+Database funktionerne importeres først ved brug, så `import backend.config`
+ikke trækker modellerne og deres afhængigheder med ved opstart.
 """
 from .config import Config, DevelopmentConfig, ProductionConfig, TestConfig, config, db
-from .database import create_tables, init_sample_data, reset_database
+from .sqlite import init_sqlite_tuning, init_fork_safety
+
+_DATABASE_FUNCTIONS = ('create_tables', 'create_indexes', 'init_sample_data', 'reset_database')
+
+
+def __getattr__(name):
+    if name in _DATABASE_FUNCTIONS:
+        from . import database
+        return getattr(database, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     'Config', 'DevelopmentConfig', 'ProductionConfig', 'TestConfig', 'config',
-    'db', 'create_tables', 'init_sample_data', 'reset_database'
+    'db', 'create_tables', 'create_indexes', 'init_sample_data', 'reset_database', 'init_sqlite_tuning',
+    'init_fork_safety'
 ]
\ No newline at end of file
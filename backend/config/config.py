@@ -2,10 +2,29 @@
 Database konfiguration for Huskeseddel applikationen.
 """
 import os
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    SQLAlchemy der bruger den valgte husstands engine.
+    
+    db.session, db.engine og db.create_all() slår alle op i engines, så når
+    en husstand er valgt i flask.g (se backend/utils/tenancy.py) går alle
+    queries til husstandens database fil.
+    """
+    
+    @property
+    def engines(self):
+        household = g.get('household') if has_app_context() else None
+        if household is not None:
+            return household.engines
+        return super().engines
+
+
 # Initialiser SQLAlchemy instansen
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 
 
 class Config:
@@ -17,12 +36,93 @@ class Config:
     basedir = os.path.abspath(os.path.dirname(__file__))
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f'sqlite:///{os.path.join(basedir, "..", "huskeseddel.db")}'
+    
+    # Brug SQLite FTS5 til varesøgning (falder tilbage til LIKE hvis ikke tilgængeligt)
+    SEARCH_USE_FTS = os.environ.get('SEARCH_USE_FTS', 'true').lower() == 'true'
+    
+    # In-process læsecache for kategori- og varelister
+    READ_CACHE_ENABLED = os.environ.get('READ_CACHE_ENABLED', 'true').lower() == 'true'
+    READ_CACHE_MAX_ENTRIES = int(os.environ.get('READ_CACHE_MAX_ENTRIES', 256))
+    READ_CACHE_MAX_BYTES = int(os.environ.get('READ_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    
+    # Samtidige ens GET requests deler ét svar (se backend/utils/coalescing.py)
+    COALESCING_ENABLED = os.environ.get('COALESCING_ENABLED', 'true').lower() == 'true'
+    COALESCING_TTL_SECONDS = float(os.environ.get('COALESCING_TTL_SECONDS', 1.0))   # Genbrug af færdige svar
+    COALESCING_WAIT_SECONDS = 30.0  # Længste ventetid på lederen før en request selv kører
+    
+    # gzip/brotli komprimering af JSON svar (se backend/utils/compression.py)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))       # Bytes
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))      # 1-9
+    COMPRESSION_BROTLI_LEVEL = int(os.environ.get('COMPRESSION_BROTLI_LEVEL', 5))  # 0-11
+    COMPRESSION_MIMETYPES = ('application/json', 'text/plain')
+    COMPRESSION_CACHE_MAX_ENTRIES = int(os.environ.get('COMPRESSION_CACHE_MAX_ENTRIES', 256))  # 0 slår cachen fra
+    COMPRESSION_CACHE_MAX_BYTES = int(os.environ.get('COMPRESSION_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    
+    # Server-Sent Events for live opdateringer af indkøbslisten
+    EVENT_HISTORY_SIZE = 1000       # Events i liste_event der kan genafspilles med Last-Event-ID
+    EVENT_POLL_INTERVAL = 0.25      # Sekunder mellem opslag i liste_event efter andre processers events
+    EVENT_MAX_SUBSCRIBERS = 500
+    EVENT_QUEUE_SIZE = 100          # Events per klient før en langsom klient lukkes
+    EVENT_KEEPALIVE_SECONDS = 15
+    # Åbne streams per proces i den trådede server (gunicorn.conf.py sætter den til
+    # halvdelen af trådene); None eller 0 = kun EVENT_MAX_SUBSCRIBERS. Gælder ikke ASGI.
+    EVENT_MAX_STREAMS = int(os.environ['EVENT_MAX_STREAMS']) if os.environ.get('EVENT_MAX_STREAMS') else None
+    EVENT_RETRY_SECONDS = 10        # Ventetid klienten får ved 503
+    
+    # JSON svar: FastJSONProvider uden sorterede nøgler, med orjson hvis installeret
+    JSON_FAST_PROVIDER = os.environ.get('JSON_FAST_PROVIDER', 'true').lower() == 'true'
+    JSON_USE_ORJSON = os.environ.get('JSON_USE_ORJSON', 'true').lower() == 'true'
+    
+    # Instrumentering: Server-Timing headers, GET /api/metrics og slow query log
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))    # 0 slår loggen fra
+    SLOW_QUERY_LOG_PARAMS = os.environ.get('SLOW_QUERY_LOG_PARAMS', 'true').lower() == 'true'
+    
+    # Købte elementer ældre end ARCHIVE_AFTER_DAYS flyttes til arkivet af
+    # `flask db compact-history` (se backend/utils/archive.py)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 30))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))   # Elementer per transaktion
+    
+    # Husstande: én SQLite fil per husstand, valgt med header eller URL prefix
+    HOUSEHOLD_MODE = os.environ.get('HOUSEHOLD_MODE', 'false').lower() == 'true'
+    HOUSEHOLD_DATA_DIR = os.environ.get('HOUSEHOLD_DATA_DIR') or os.path.join(basedir, '..', 'households')
+    HOUSEHOLD_HEADER = 'X-Household'
+    HOUSEHOLD_URL_PREFIX = '/h'             # /h/<husstand>/api/...
+    HOUSEHOLD_MAX_ENGINES = int(os.environ.get('HOUSEHOLD_MAX_ENGINES', 64))
+    # Opret ukendte husstande ved første skrivning (POST/PUT/DELETE); ellers kun med
+    # `flask db init --household <navn>`. GET og HEAD opretter aldrig en husstand.
+    HOUSEHOLD_AUTO_CREATE = os.environ.get('HOUSEHOLD_AUTO_CREATE', 'false').lower() == 'true'
+    
+    # SQLite PRAGMAs der sættes på hver ny forbindelse (se backend/config/sqlite.py)
+    SQLITE_TUNING = os.environ.get('SQLITE_TUNING', 'true').lower() == 'true'
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',          # Læsere blokerer ikke skrivere
+        'synchronous': 'NORMAL',        # Sikkert med WAL, færre fsyncs
+        'busy_timeout': 5000,           # Vent op til 5 sek. på skrivelåsen
+        'cache_size': -20000,           # 20 MB page cache per forbindelse
+        'mmap_size': 268435456,         # 256 MB memory-mapped I/O
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON'
+    }
+    
+    # Connection pool til fil-baserede SQLite databaser
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        'pool_pre_ping': True,
+        'connect_args': {'timeout': 5, 'check_same_thread': False}
+    }
 
 
 class DevelopmentConfig(Config):
     """Development konfiguration."""
     DEBUG = True
-    SQLALCHEMY_ECHO = True  # Log SQL queries
+    # Log SQL queries (slået fra som standard, da det gør alle requests langsommere)
+    SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO', 'false').lower() == 'true'
 
 
 class ProductionConfig(Config):
@@ -34,12 +134,16 @@ class ProductionConfig(Config):
     basedir = os.path.abspath(os.path.dirname(__file__))
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f'sqlite:///data/huskeseddel.db'
+    # Relativ sti lægges i instance mappen ligesom databasen
+    HOUSEHOLD_DATA_DIR = os.environ.get('HOUSEHOLD_DATA_DIR') or 'data/households'
 
 
 class TestConfig(Config):
     """Test konfiguration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # In-memory databasen bruger en StaticPool, så pool indstillinger gælder ikke
+    SQLALCHEMY_ENGINE_OPTIONS = {}
 
 
 # Konfiguration mapping
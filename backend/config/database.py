@@ -1,13 +1,60 @@
 """
 Database initialiseringsscript og sample data.
 """
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
 from backend.config.config import db
 from backend.models import Kategori, Vare, IndkoebslisteElement
+from backend.utils.archive import create_archive
+from backend.utils.search import create_search_index, drop_search_index
+from backend.utils.statistics import create_statistics_triggers
+from backend.utils.sync import create_sync_triggers
+from backend.utils.suggestions import create_suggestion_triggers
 
 
 def create_tables():
-    """Opret alle database tabeller."""
+    """Opret alle database tabeller, manglende kolonner og indekser, søgeindekset og triggers."""
     db.create_all()
+    add_missing_columns()
+    create_indexes()
+    create_archive()
+    create_search_index()
+    create_statistics_triggers()
+    create_suggestion_triggers()
+    create_sync_triggers()
+
+
+def add_missing_columns():
+    """
+    Tilføj kolonner der mangler i eksisterende tabeller.
+    
+    db.create_all() ændrer ikke tabeller der allerede findes, så kolonner
+    der er tilføjet til en model senere (f.eks. sync_version) migreres her
+    med ALTER TABLE ADD COLUMN. Nye kolonner skal derfor have en server_default
+    eller være nullable.
+    """
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {ddl}'))
+
+
+def create_indexes():
+    """
+    Opret indekser der mangler i en eksisterende database.
+    
+    db.create_all() opretter kun indekser sammen med nye tabeller, så
+    databaser oprettet før et indeks blev tilføjet til en model migreres her.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
 
 
 def init_sample_data():
@@ -82,6 +129,7 @@ def init_sample_data():
 
 def reset_database():
     """Slet alle data og genopret tabeller."""
+    drop_search_index()
     db.drop_all()
     create_tables()
     init_sample_data()
@@ -0,0 +1,93 @@
+"""
+SQLite tuning: PRAGMAs der sættes på hver ny database forbindelse.
+
+Med WAL kan læsere og én skriver arbejde samtidigt, og busy_timeout får
+samtidige skrivere til at vente på låsen i stedet for at fejle med
+"database is locked".
+
+Når appen oprettes før en fork (f.eks. gunicorn med preload_app), må
+arbejderprocesserne ikke genbruge forældreprocessens åbne forbindelser.
+init_fork_safety sørger for at forbindelsespuljen kasseres i barnet.
+
+Under ASGI (backend/asgi.py) bruges aiosqlite som driver, så database I/O
+venter på event loopet i stedet for at blokere det (init_async_driver).
+"""
+import os
+import weakref
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Engines der skal have en frisk forbindelsespulje efter fork
+_fork_engines = weakref.WeakSet()
+_fork_hook_registered = False
+
+
+def _apply_pragmas(dbapi_connection, pragmas):
+    """Kør PRAGMA statements på en rå sqlite3 forbindelse."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def init_sqlite_tuning(app, engine):
+    """
+    Registrer en connect hook der sætter SQLITE_PRAGMAS på engine.
+    
+    Gør ingenting hvis SQLITE_TUNING er slået fra eller databasen ikke
+    er SQLite.
+    """
+    if engine.dialect.name != 'sqlite' or not app.config.get('SQLITE_TUNING', False):
+        return
+    
+    pragmas = dict(app.config.get('SQLITE_PRAGMAS', {}))
+    if engine.url.database in (None, '', ':memory:'):
+        # WAL og mmap giver ikke mening for en in-memory database
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+    
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        _apply_pragmas(dbapi_connection, pragmas)
+
+
+def _dispose_after_fork():
+    """Kassér nedarvede forbindelser i en ny proces uden at lukke forældrens."""
+    for engine in list(_fork_engines):
+        engine.dispose(close=False)
+
+
+def init_fork_safety(engine):
+    """
+    Sørg for at engine får en ny forbindelsespulje i processer der forkes fra denne.
+    
+    Forbindelserne lukkes ikke i barnet (close=False), da de stadig tilhører
+    forældreprocessen; barnet åbner blot sine egne ved første brug.
+    """
+    global _fork_hook_registered
+    if not _fork_hook_registered and hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_dispose_after_fork)
+        _fork_hook_registered = True
+    _fork_engines.add(engine)
+
+
+def init_async_driver(app):
+    """
+    Skift SQLALCHEMY_DATABASE_URI til aiosqlite driveren. Kaldes før db.init_app.
+    
+    Engine er stadig en almindelig SQLAlchemy Engine med de samme events og
+    den samme kode ovenpå, men hvert statement venter på aiosqlite og kan
+    derfor kun køres inde fra greenlet_spawn (se backend/asgi.py).
+    """
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'sqlite':
+        raise RuntimeError('ASGI serveren kræver en SQLite database')
+    if app.config.get('HOUSEHOLD_MODE', False):
+        # Husstandene holder en trådlås mens skemaet oprettes, og den kan
+        # ikke deles mellem requests der kører på samme tråd
+        raise RuntimeError('HOUSEHOLD_MODE understøttes ikke af ASGI serveren')
+    app.config['SQLALCHEMY_DATABASE_URI'] = url.set(drivername='sqlite+aiosqlite').render_as_string(
+        hide_password=False
+    )
@@ -4,5 +4,11 @@ Database models for Huskeseddel (Shopping List) application.
 from .kategori import Kategori
 from .vare import Vare
 from .indkoebsliste_element import IndkoebslisteElement
+from .arkiveret_element import ArkiveretElement
+from .data_version import DataVersion
+from .kategori_statistik import KategoriStatistik
+from .sletning import Sletning
+from .koebsstatistik import KoebsStatistik
+from .liste_event import ListeEvent
 
-__all__ = ['Kategori', 'Vare', 'IndkoebslisteElement']
\ No newline at end of file
+__all__ = ['Kategori', 'Vare', 'IndkoebslisteElement', 'ArkiveretElement', 'DataVersion', 'KategoriStatistik', 'Sletning', 'KoebsStatistik', 'ListeEvent']
\ No newline at end of file
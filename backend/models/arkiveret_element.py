@@ -0,0 +1,88 @@
+"""
+ArkiveretElement model - Købte elementer flyttet ud af den aktive tabel.
+"""
+from datetime import datetime
+from sqlalchemy import delete, insert, literal, select
+from backend.config.config import db
+from backend.models.indkoebsliste_element import IndkoebslisteElement
+
+
+class ArkiveretElement(db.Model):
+    """
+    Model for købshistorik der er ældre end ARCHIVE_AFTER_DAYS.
+
+    Rækkerne flyttes hertil fra indkoebsliste_element af compact_history
+    (se backend/utils/archive.py) og beholder deres id. Alle arkiverede
+    elementer har status 'købt', så kolonnen gemmes ikke.
+    """
+
+    __tablename__ = 'indkoebsliste_arkiv'
+    __table_args__ = (
+        # Historik sorteret efter (tilfoejelsesdato, id), nyeste først
+        db.Index('ix_indkoebsliste_arkiv_dato', 'tilfoejelsesdato', 'id'),
+        # Sletning af en vare og genberegning af statistik per vare
+        db.Index('ix_indkoebsliste_arkiv_vare', 'vare_id'),
+    )
+
+    # Samme id som elementet havde i indkoebsliste_element
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    vare_id = db.Column(db.Integer, db.ForeignKey('vare.id'), nullable=False)
+    note_liste = db.Column(db.Text, nullable=True)
+    tilfoejelsesdato = db.Column(db.DateTime, nullable=False)
+    # server_default, da compact_history indsætter med INSERT ... SELECT
+    arkiveret = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), nullable=False)
+
+    def __repr__(self):
+        return f'<ArkiveretElement {self.id} - vare {self.vare_id}>'
+
+    @classmethod
+    def get_ids(cls, element_ids):
+        """De af element_ids der ligger i arkivet."""
+        if not element_ids:
+            return set()
+        return set(db.session.scalars(select(cls.id).where(cls.id.in_(element_ids))))
+
+    @classmethod
+    def restore(cls, element_ids):
+        """
+        Flyt arkiverede elementer tilbage til indkoebsliste_element som købte.
+
+        Bruges før et arkiveret element genaktiveres, redigeres eller
+        slettes, så routes kan behandle det som ethvert andet element.
+        Elementet indsættes før det slettes fra arkivet, så triggers kan se
+        at det ikke er et nyt køb. Committer ikke.
+
+        Returns:
+            int: Antal flyttede elementer
+        """
+        # Typisk er ingen af dem arkiveret; så skrives der ikke noget
+        archived = cls.get_ids(element_ids)
+        if not archived:
+            return 0
+
+        db.session.execute(
+            insert(IndkoebslisteElement).from_select(
+                ['id', 'vare_id', 'note_liste', 'tilfoejelsesdato', 'status'],
+                select(cls.id, cls.vare_id, cls.note_liste, cls.tilfoejelsesdato, literal('købt'))
+                .where(cls.id.in_(archived))
+            )
+        )
+        return db.session.execute(
+            delete(cls).where(cls.id.in_(archived))
+        ).rowcount
+
+    @classmethod
+    def delete_purchased(cls, older_than=None):
+        """Slet arkiverede elementer, eventuelt kun dem tilføjet før older_than. Committer ikke."""
+        criteria = () if older_than is None else (cls.tilfoejelsesdato < older_than,)
+        # Et tomt arkiv skal ikke give en skrivning og nye dataversioner
+        if not db.session.scalar(select(select(cls.id).where(*criteria).exists())):
+            return 0
+        return db.session.execute(delete(cls).where(*criteria)).rowcount
+
+    @classmethod
+    def bulk_delete(cls, element_ids):
+        """Slet flere arkiverede elementer med én DELETE. Committer ikke."""
+        if not element_ids:
+            return 0
+        return db.session.execute(delete(cls).where(cls.id.in_(element_ids))).rowcount
@@ -0,0 +1,43 @@
+"""
+DataVersion model - Versionstæller per tabel til ETags og cache invalidering.
+"""
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from backend.config.config import db
+
+
+class DataVersion(db.Model):
+    """Model for en versionstæller der tælles op hver gang en tabel ændres."""
+    
+    __tablename__ = 'data_version'
+    
+    tabel = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<DataVersion {self.tabel}={self.version}>'
+    
+    @classmethod
+    def get_versions(cls, tables):
+        """Hent versioner for de angivne tabeller (tabel -> version, 0 hvis ukendt)."""
+        rows = db.session.execute(
+            select(cls.tabel, cls.version).where(cls.tabel.in_(tables))
+        ).all()
+        versions = dict.fromkeys(tables, 0)
+        versions.update(rows)
+        return versions
+    
+    @classmethod
+    def bump(cls, connection, tables):
+        """
+        Tæl versionen op for de angivne tabeller.
+        
+        Kører på den givne connection, så optællingen er en del af den
+        samme transaktion som selve ændringen.
+        """
+        for tabel in tables:
+            statement = sqlite_insert(cls.__table__).values(tabel=tabel, version=1)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[cls.tabel],
+                set_={'version': cls.__table__.c.version + 1}
+            ))
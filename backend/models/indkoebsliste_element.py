@@ -2,20 +2,41 @@
 IndkoebslisteElement model - Elementer på den aktive indkøbsliste.
 """
 from datetime import datetime
+from sqlalchemy import DateTime, literal, select, tuple_, union_all
 from sqlalchemy.orm import validates
 from backend.config.config import db
+from backend.utils.serialization import iso_datetime
 
 
 class IndkoebslisteElement(db.Model):
     """Model for elementer på indkøbslisten."""
     
     __tablename__ = 'indkoebsliste_element'
+    __table_args__ = (
+        # find_active_by_vare og paa_liste EXISTS: (vare_id, status)
+        db.Index('ix_indkoebsliste_element_vare_status', 'vare_id', 'status'),
+        # get_active_list / get_purchased_items: filter på status, sorteret efter dato
+        db.Index('ix_indkoebsliste_element_status_dato', 'status', 'tilfoejelsesdato', 'id'),
+        # Delta sync: ændringer siden en given version
+        db.Index('ix_indkoebsliste_element_sync_version', 'sync_version'),
+        # Id'er genbruges aldrig, da arkiverede elementer beholder deres id
+        # (se backend/utils/archive.py)
+        {'sqlite_autoincrement': True},
+    )
+    
+    # Felter der kan vælges med fields= projektion
+    SERIALIZABLE_FIELDS = (
+        'id', 'vare_id', 'vare_navn', 'kategori_navn',
+        'note_liste', 'tilfoejelsesdato', 'status'
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     vare_id = db.Column(db.Integer, db.ForeignKey('vare.id'), nullable=False)
     note_liste = db.Column(db.Text, nullable=True)
     tilfoejelsesdato = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     status = db.Column(db.String(20), default='aktiv', nullable=False)
+    # Sættes af SQLite triggers ved hver ændring (se backend/utils/sync.py)
+    sync_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     
     @validates('status')
     def validate_status(self, key, status):
@@ -27,17 +48,25 @@ class IndkoebslisteElement(db.Model):
     def __repr__(self):
         return f'<IndkoebslisteElement {self.vare.navn if self.vare else "N/A"} - {self.status}>'
     
-    def to_dict(self):
-        """Konverter til dictionary for JSON serialisering."""
-        return {
+    def to_dict(self, fields=None):
+        """
+        Konverter til dictionary for JSON serialisering.
+        
+        Med fields returneres kun de valgte felter; vare og kategori
+        indlæses kun hvis vare_navn eller kategori_navn er med.
+        """
+        data = {
             'id': self.id,
             'vare_id': self.vare_id,
-            'vare_navn': self.vare.navn if self.vare else None,
-            'kategori_navn': self.vare.kategori.navn if self.vare and self.vare.kategori else None,
             'note_liste': self.note_liste,
             'tilfoejelsesdato': self.tilfoejelsesdato.isoformat(),
             'status': self.status
         }
+        if fields is None or 'vare_navn' in fields:
+            data['vare_navn'] = self.vare.navn if self.vare else None
+        if fields is None or 'kategori_navn' in fields:
+            data['kategori_navn'] = self.vare.kategori.navn if self.vare and self.vare.kategori else None
+        return data if fields is None else {field: data[field] for field in fields}
     
     def marker_som_købt(self):
         """Marker elementet som købt."""
@@ -48,20 +77,150 @@ class IndkoebslisteElement(db.Model):
         self.status = 'aktiv'
     
     @classmethod
-    def get_active_list(cls):
-        """Hent alle aktive elementer på indkøbslisten."""
+    def active_list_query(cls):
+        """Query for aktive elementer, nyeste først."""
         return cls.query.filter_by(status='aktiv').order_by(
             cls.tilfoejelsesdato.desc()
-        ).all()
+        )
     
     @classmethod
-    def get_purchased_items(cls, limit=50):
-        """Hent nyligt købte varer (historik)."""
+    def purchased_items_query(cls):
+        """Query for købte elementer, nyeste først."""
         return cls.query.filter_by(status='købt').order_by(
             cls.tilfoejelsesdato.desc()
-        ).limit(limit).all()
+        )
+    
+    @classmethod
+    def listing_rows_query(cls, status):
+        """
+        Elementer med en given status som rækker, nyeste først.
+        
+        Rækkerne er (id, vare_id, note_liste, tilfoejelsesdato, status,
+        vare_navn, kategori_id) med datoen som ISO tekst, klar til
+        serialize_elementer. Varen joines i samme query, så der ikke
+        lazy-loades en vare og kategori per element.
+        """
+        from backend.models.vare import Vare
+        
+        return db.session.query(
+            cls.id, cls.vare_id, cls.note_liste,
+            iso_datetime(cls.tilfoejelsesdato).label('tilfoejelsesdato'),
+            cls.status, Vare.navn.label('vare_navn'), Vare.kategori_id
+        ).join(Vare, Vare.id == cls.vare_id).filter(
+            cls.status == status
+        ).order_by(cls.tilfoejelsesdato.desc())
+    
+    @classmethod
+    def historik_rows_query(cls, limit, before=None):
+        """
+        Købte elementer fra både listen og arkivet som rækker, nyeste først.
+        
+        Rækkerne har samme form som listing_rows_query('købt'). Hver del af
+        UNION ALL'en sorteres og begrænses for sig med sit eget indeks, så en
+        side kun læser limit rækker fra hver tabel uanset historikkens længde.
+        
+        Args:
+            limit (int): Højst så mange rækker
+            before (list): (tilfoejelsesdato, id) fra en cursor; kun ældre rækker
+        """
+        from backend.models.arkiveret_element import ArkiveretElement
+        from backend.models.vare import Vare
+        
+        def newest(model, *criteria):
+            if before is not None:
+                bound = tuple_(literal(before[0], DateTime()), literal(before[1]))
+                criteria += (tuple_(model.tilfoejelsesdato, model.id) < bound,)
+            return select(
+                model.id, model.vare_id, model.note_liste, model.tilfoejelsesdato
+            ).where(*criteria).order_by(
+                model.tilfoejelsesdato.desc(), model.id.desc()
+            ).limit(limit).subquery()
+        
+        historik = union_all(
+            select(newest(cls, cls.status == 'købt')),
+            select(newest(ArkiveretElement))
+        ).subquery('historik')
+        
+        return db.session.query(
+            historik.c.id, historik.c.vare_id, historik.c.note_liste,
+            iso_datetime(historik.c.tilfoejelsesdato).label('tilfoejelsesdato'),
+            literal('købt').label('status'), Vare.navn.label('vare_navn'), Vare.kategori_id
+        ).join(Vare, Vare.id == historik.c.vare_id).order_by(
+            historik.c.tilfoejelsesdato.desc(), historik.c.id.desc()
+        ).limit(limit)
+    
+    @classmethod
+    def get_active_list(cls):
+        """Hent alle aktive elementer på indkøbslisten."""
+        return cls.active_list_query().all()
+    
+    @classmethod
+    def get_purchased_items(cls, limit=50):
+        """Hent nyligt købte varer (historik)."""
+        return cls.purchased_items_query().limit(limit).all()
+    
+    @classmethod
+    def sort_columns(cls):
+        """Kolonner der bruges til keyset paginering (tilfoejelsesdato, id), faldende."""
+        return (cls.tilfoejelsesdato, cls.id)
     
     @classmethod
     def find_active_by_vare(cls, vare_id):
         """Find aktivt element for en specifik vare."""
-        return cls.query.filter_by(vare_id=vare_id, status='aktiv').first()
\ No newline at end of file
+        return cls.query.filter_by(vare_id=vare_id, status='aktiv').first()
+    
+    @classmethod
+    def find_active_by_varer(cls, vare_ids):
+        """Find aktive elementer for flere varer på én gang (vare_id -> element)."""
+        if not vare_ids:
+            return {}
+        elementer = cls.query.filter(
+            cls.vare_id.in_(vare_ids),
+            cls.status == 'aktiv'
+        ).all()
+        return {element.vare_id: element for element in elementer}
+    
+    @classmethod
+    def get_statuses(cls, element_ids):
+        """Hent status for flere elementer på én gang (id -> status)."""
+        if not element_ids:
+            return {}
+        return dict(
+            db.session.query(cls.id, cls.status).filter(cls.id.in_(element_ids)).all()
+        )
+    
+    @classmethod
+    def bulk_update_status(cls, element_ids, status):
+        """Sæt status på flere elementer med én UPDATE. Committer ikke."""
+        if status not in ['aktiv', 'købt']:
+            raise ValueError("Status skal være enten 'aktiv' eller 'købt'")
+        if not element_ids:
+            return 0
+        return cls.query.filter(cls.id.in_(element_ids)).update(
+            {cls.status: status}, synchronize_session=False
+        )
+    
+    @classmethod
+    def delete_purchased(cls, older_than=None):
+        """
+        Slet købte elementer, også i arkivet, uden at indlæse dem. Committer ikke.
+        
+        Args:
+            older_than (datetime): Slet kun elementer tilføjet før dette tidspunkt
+        
+        Returns:
+            int: Antal slettede elementer
+        """
+        from backend.models.arkiveret_element import ArkiveretElement
+        
+        query = cls.query.filter(cls.status == 'købt')
+        if older_than is not None:
+            query = query.filter(cls.tilfoejelsesdato < older_than)
+        return query.delete(synchronize_session=False) + ArkiveretElement.delete_purchased(older_than)
+    
+    @classmethod
+    def bulk_delete(cls, element_ids):
+        """Slet flere elementer med én DELETE. Committer ikke."""
+        if not element_ids:
+            return 0
+        return cls.query.filter(cls.id.in_(element_ids)).delete(synchronize_session=False)
\ No newline at end of file
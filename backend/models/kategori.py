@@ -2,18 +2,29 @@
 Kategori model - Kategorier til organisering af varer.
 """
 from datetime import datetime
+from sqlalchemy import func
 from backend.config.config import db
+from backend.models.kategori_statistik import KategoriStatistik
 
 
 class Kategori(db.Model):
     """Model for varekategorier."""
     
     __tablename__ = 'kategori'
+    __table_args__ = (
+        # Delta sync: ændringer siden en given version
+        db.Index('ix_kategori_sync_version', 'sync_version'),
+    )
+    
+    # Felter der kan vælges med fields= projektion
+    SERIALIZABLE_FIELDS = ('id', 'navn', 'beskrivelse', 'oprettelsesdato', 'antal_varer')
     
     id = db.Column(db.Integer, primary_key=True)
     navn = db.Column(db.String(100), unique=True, nullable=False)
     beskrivelse = db.Column(db.Text, nullable=True)
     oprettelsesdato = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Sættes af SQLite triggers ved hver ændring (se backend/utils/sync.py)
+    sync_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     
     # Relationship til varer
     varer = db.relationship('Vare', backref='kategori', lazy=True, cascade='all, delete-orphan')
@@ -21,15 +32,33 @@ class Kategori(db.Model):
     def __repr__(self):
         return f'<Kategori {self.navn}>'
     
-    def to_dict(self):
-        """Konverter til dictionary for JSON serialisering."""
-        return {
+    def to_dict(self, fields=None, antal_varer=None):
+        """
+        Konverter til dictionary for JSON serialisering.
+        
+        antal_varer kan gives med fra listing_query; ellers slås det op i
+        de materialiserede tællere. Med fields returneres kun de valgte felter.
+        """
+        data = {
             'id': self.id,
             'navn': self.navn,
             'beskrivelse': self.beskrivelse,
-            'oprettelsesdato': self.oprettelsesdato.isoformat(),
-            'antal_varer': len(self.varer)
+            'oprettelsesdato': self.oprettelsesdato.isoformat()
         }
+        if fields is None or 'antal_varer' in fields:
+            if antal_varer is None:
+                statistik = db.session.get(KategoriStatistik, self.id)
+                antal_varer = statistik.antal_varer if statistik else 0
+            data['antal_varer'] = antal_varer
+        return data if fields is None else {field: data[field] for field in fields}
+    
+    @classmethod
+    def listing_query(cls):
+        """Query der henter (kategori, antal_varer) rækker fra de materialiserede tællere."""
+        return db.session.query(
+            cls,
+            func.coalesce(KategoriStatistik.antal_varer, 0).label('antal_varer')
+        ).outerjoin(KategoriStatistik, KategoriStatistik.kategori_id == cls.id)
     
     @classmethod
     def find_by_name(cls, navn):
@@ -39,4 +68,9 @@ class Kategori(db.Model):
     @classmethod
     def get_all(cls):
         """Hent alle kategorier sorteret efter navn."""
-        return cls.query.order_by(cls.navn).all()
\ No newline at end of file
+        return cls.query.order_by(cls.navn).all()
+    
+    @classmethod
+    def sort_columns(cls):
+        """Kolonner der bruges til keyset paginering (navn, id)."""
+        return (cls.navn, cls.id)
\ No newline at end of file
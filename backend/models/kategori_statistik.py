@@ -0,0 +1,32 @@
+"""
+KategoriStatistik model - Materialiserede tællere per kategori.
+"""
+from backend.config.config import db
+
+
+class KategoriStatistik(db.Model):
+    """
+    Model for tællere per kategori.
+    
+    Rækkerne vedligeholdes af SQLite triggers (se backend/utils/statistics.py)
+    og skal ikke ændres fra applikationen.
+    """
+    
+    __tablename__ = 'kategori_statistik'
+    
+    kategori_id = db.Column(db.Integer, primary_key=True)
+    antal_varer = db.Column(db.Integer, default=0, nullable=False)
+    aktive_varer = db.Column(db.Integer, default=0, nullable=False)
+    koebte_varer = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<KategoriStatistik {self.kategori_id}: {self.antal_varer} varer>'
+    
+    def to_dict(self):
+        """Konverter til dictionary for JSON serialisering."""
+        return {
+            'kategori_id': self.kategori_id,
+            'antal_varer': self.antal_varer,
+            'aktive_varer': self.aktive_varer,
+            'købte_varer': self.koebte_varer
+        }
@@ -0,0 +1,24 @@
+"""
+KoebsStatistik model - Aggregeret købshistorik per vare.
+"""
+from backend.config.config import db
+
+
+class KoebsStatistik(db.Model):
+    """
+    Model for købsfrekvens per vare (grundlag for "køb igen" forslag).
+    
+    Rækkerne vedligeholdes af SQLite triggers når elementer markeres som
+    købt (se backend/utils/suggestions.py) og skal ikke ændres fra
+    applikationen. De bevares når historikken ryddes.
+    """
+    
+    __tablename__ = 'koebsstatistik'
+    
+    vare_id = db.Column(db.Integer, primary_key=True)
+    antal_koeb = db.Column(db.Integer, default=0, nullable=False)
+    foerste_koeb = db.Column(db.DateTime, nullable=False)
+    sidste_koeb = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<KoebsStatistik {self.vare_id}: {self.antal_koeb} køb>'
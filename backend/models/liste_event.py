@@ -0,0 +1,28 @@
+"""
+ListeEvent model - Log over ændringer på indkøbslisten til SSE streams.
+"""
+from datetime import datetime
+from backend.config.config import db
+
+
+class ListeEvent(db.Model):
+    """
+    Model for et event der sendes til Server-Sent Events klienter.
+
+    publish_event skriver en række efter hver ændring, og brokeren i hver
+    worker-proces læser nye rækker (se backend/utils/events.py), så alle
+    klienter ser ændringer uanset hvilken proces de er forbundet til. id er
+    SSE event ID'et; kun de seneste EVENT_HISTORY_SIZE rækker beholdes.
+    """
+
+    __tablename__ = 'liste_event'
+    # AUTOINCREMENT, så ID'er ikke genbruges efter oprydning
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    type = db.Column(db.String(50), nullable=False)
+    data = db.Column(db.Text, nullable=False)
+    oprettet = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), nullable=False)
+
+    def __repr__(self):
+        return f'<ListeEvent {self.id} {self.type}>'
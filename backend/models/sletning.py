@@ -0,0 +1,28 @@
+"""
+Sletning model - Tombstones for slettede rækker til delta sync.
+"""
+from datetime import datetime
+from backend.config.config import db
+
+
+class Sletning(db.Model):
+    """
+    Model for en slettet kategori, vare eller liste element.
+    
+    Rækkerne oprettes af SQLite triggers (se backend/utils/sync.py), så
+    /api/sync kan fortælle klienter hvad de skal fjerne.
+    """
+    
+    __tablename__ = 'sletning'
+    __table_args__ = (
+        db.Index('ix_sletning_sync_version', 'sync_version'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tabel = db.Column(db.String(50), nullable=False)
+    raekke_id = db.Column(db.Integer, nullable=False)
+    sync_version = db.Column(db.Integer, nullable=False)
+    slettet = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.current_timestamp(), nullable=False)
+    
+    def __repr__(self):
+        return f'<Sletning {self.tabel}#{self.raekke_id} v{self.sync_version}>'
@@ -2,20 +2,41 @@
 Vare model - Vareregister med kategorier og noter.
 """
 from datetime import datetime
+from sqlalchemy import exists, literal
 from sqlalchemy.orm import validates
 from backend.config.config import db
+from backend.models.kategori import Kategori
+from backend.models.indkoebsliste_element import IndkoebslisteElement
+from backend.utils import search
+from backend.utils.serialization import iso_datetime
 
 
 class Vare(db.Model):
     """Model for varer i vareregisteret."""
     
     __tablename__ = 'vare'
+    __table_args__ = (
+        # Listen sorteres altid efter (navn, id)
+        db.Index('ix_vare_navn', 'navn', 'id'),
+        # get_by_category og kategorifilter i search, sorteret efter navn
+        db.Index('ix_vare_kategori_navn', 'kategori_id', 'navn'),
+        # Delta sync: ændringer siden en given version
+        db.Index('ix_vare_sync_version', 'sync_version'),
+    )
+    
+    # Felter der kan vælges med fields= projektion
+    SERIALIZABLE_FIELDS = (
+        'id', 'navn', 'kategori_id', 'kategori_navn',
+        'note_vareregister', 'oprettelsesdato', 'paa_liste'
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     navn = db.Column(db.String(200), nullable=False)
     kategori_id = db.Column(db.Integer, db.ForeignKey('kategori.id'), nullable=False)
     note_vareregister = db.Column(db.Text, nullable=True)
     oprettelsesdato = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Sættes af SQLite triggers ved hver ændring (se backend/utils/sync.py)
+    sync_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     
     # Relationship til indkøbsliste elementer
     indkoebsliste_elementer = db.relationship(
@@ -35,36 +56,155 @@ class Vare(db.Model):
     def __repr__(self):
         return f'<Vare {self.navn}>'
     
-    def to_dict(self):
-        """Konverter til dictionary for JSON serialisering."""
-        return {
+    def to_dict(self, kategori_navn=None, paa_liste=None, fields=None):
+        """
+        Konverter til dictionary for JSON serialisering.
+        
+        kategori_navn og paa_liste kan gives med fra en listing query, så
+        relationerne ikke skal lazy-loades for hver vare. Med fields
+        returneres kun de valgte felter, og relationer der ikke skal bruges
+        bliver ikke indlæst.
+        """
+        wanted = fields or self.SERIALIZABLE_FIELDS
+        if kategori_navn is None and 'kategori_navn' in wanted:
+            kategori_navn = self.kategori.navn if self.kategori else None
+        if paa_liste is None and 'paa_liste' in wanted:
+            paa_liste = IndkoebslisteElement.find_active_by_vare(self.id) is not None
+        
+        data = {
             'id': self.id,
             'navn': self.navn,
             'kategori_id': self.kategori_id,
-            'kategori_navn': self.kategori.navn if self.kategori else None,
+            'kategori_navn': kategori_navn,
             'note_vareregister': self.note_vareregister,
             'oprettelsesdato': self.oprettelsesdato.isoformat(),
-            'paa_liste': any(elem.status == 'aktiv' for elem in self.indkoebsliste_elementer)
+            'paa_liste': bool(paa_liste)
         }
+        return data if fields is None else {field: data[field] for field in fields}
     
     @classmethod
-    def search(cls, query, kategori_ids=None):
-        """Søg efter varer med valgfri kategorifiltrering."""
-        search_query = cls.query
+    def paa_liste_expression(cls):
+        """EXISTS-udtryk der er sandt hvis varen har et aktivt element på listen."""
+        return exists().where(
+            IndkoebslisteElement.vare_id == cls.id,
+            IndkoebslisteElement.status == 'aktiv'
+        )
+    
+    @classmethod
+    def listing_query(cls, fields=None):
+        """
+        Query der henter varer sammen med kategorinavn og paa_liste-flag.
+        
+        Hver række er en tuple (vare, kategori_navn, paa_liste), så en hel
+        liste kan serialiseres med et fast antal forespørgsler. Felter der
+        ikke er med i fields springes over i SQL'en (værdien er None).
+        """
+        wanted = fields or cls.SERIALIZABLE_FIELDS
+        
+        if 'paa_liste' in wanted:
+            paa_liste = cls.paa_liste_expression().label('paa_liste')
+        else:
+            paa_liste = literal(None).label('paa_liste')
+        
+        if 'kategori_navn' not in wanted:
+            return db.session.query(cls, literal(None).label('kategori_navn'), paa_liste)
+        
+        return db.session.query(
+            cls,
+            Kategori.navn.label('kategori_navn'),
+            paa_liste
+        ).outerjoin(Kategori, cls.kategori_id == Kategori.id)
+    
+    @classmethod
+    def listing_rows_query(cls, fields=None):
+        """
+        Som listing_query, men med kolonner i stedet for Vare objekter.
+        
+        Rækkerne er (id, navn, kategori_id, note_vareregister,
+        oprettelsesdato, paa_liste) med datoen som ISO tekst, klar til
+        serialize_varer. Kategorinavnet slås op efter kategori_id, så der
+        ikke joines med kategori.
+        """
+        wanted = fields or cls.SERIALIZABLE_FIELDS
+        
+        if 'paa_liste' in wanted:
+            paa_liste = cls.paa_liste_expression().label('paa_liste')
+        else:
+            paa_liste = literal(None).label('paa_liste')
+        
+        return db.session.query(
+            cls.id, cls.navn, cls.kategori_id, cls.note_vareregister,
+            iso_datetime(cls.oprettelsesdato).label('oprettelsesdato'),
+            paa_liste
+        )
+    
+    @classmethod
+    def _search_query(cls, search_query, query, kategori_ids):
+        """
+        Tilføj søgeterm, kategorifilter og sortering til en query.
+        
+        Bruger FTS5 indekset (rangeret efter relevans) når det er
+        tilgængeligt, ellers LIKE på navn sorteret alfabetisk.
+        """
+        order_by = [cls.navn]
         
         if query:
-            search_query = search_query.filter(
-                cls.navn.ilike(f'%{query}%')
-            )
+            ranked = search.ranked_matches(query)
+            if ranked is not None:
+                search_query = search_query.join(ranked, ranked.c.rowid == cls.id)
+                order_by = [ranked.c.rank, cls.navn]
+            else:
+                search_query = search_query.filter(
+                    cls.navn.ilike(f'%{query}%')
+                )
         
         if kategori_ids:
             search_query = search_query.filter(
                 cls.kategori_id.in_(kategori_ids)
             )
         
-        return search_query.order_by(cls.navn).all()
+        return search_query.order_by(*order_by)
+    
+    @classmethod
+    def search(cls, query, kategori_ids=None):
+        """Søg efter varer med valgfri kategorifiltrering."""
+        return cls._search_query(cls.query, query, kategori_ids).all()
+    
+    @classmethod
+    def search_listing_query(cls, query, kategori_ids=None, fields=None):
+        """Query til search_listing, så den kan pagineres af kalderen."""
+        return cls._search_query(cls.listing_query(fields), query, kategori_ids)
+    
+    @classmethod
+    def search_rows_query(cls, query, kategori_ids=None, fields=None):
+        """Som search_listing_query, men med rækker fra listing_rows_query."""
+        return cls._search_query(cls.listing_rows_query(fields), query, kategori_ids)
+    
+    @classmethod
+    def search_listing(cls, query, kategori_ids=None, fields=None):
+        """Som search, men returnerer (vare, kategori_navn, paa_liste) rækker."""
+        return cls.search_listing_query(query, kategori_ids, fields).all()
+    
+    @classmethod
+    def sort_columns(cls):
+        """Kolonner der bruges til keyset paginering (navn, id)."""
+        return (cls.navn, cls.id)
     
     @classmethod
     def get_by_category(cls, kategori_id):
         """Hent alle varer i en specifik kategori."""
-        return cls.query.filter_by(kategori_id=kategori_id).order_by(cls.navn).all()
\ No newline at end of file
+        return cls.query.filter_by(kategori_id=kategori_id).order_by(cls.navn).all()
+    
+    @classmethod
+    def get_by_category_listing(cls, kategori_id, fields=None):
+        """Som get_by_category, men returnerer (vare, kategori_navn, paa_liste) rækker."""
+        return cls.listing_query(fields).filter(
+            cls.kategori_id == kategori_id
+        ).order_by(cls.navn).all()
+    
+    @classmethod
+    def get_by_category_rows(cls, kategori_id, fields=None):
+        """Som get_by_category_listing, men med rækker fra listing_rows_query."""
+        return cls.listing_rows_query(fields).filter(
+            cls.kategori_id == kategori_id
+        ).order_by(cls.navn).all()
@@ -4,5 +4,7 @@ Routes module initialization.
 from .kategori_routes import kategori_bp
 from .vare_routes import vare_bp
 from .indkoebsliste_routes import indkoebsliste_bp
+from .sync_routes import sync_bp
+from .transfer_routes import transfer_bp
 
-__all__ = ['kategori_bp', 'vare_bp', 'indkoebsliste_bp']
\ No newline at end of file
+__all__ = ['kategori_bp', 'vare_bp', 'indkoebsliste_bp', 'sync_bp', 'transfer_bp']
\ No newline at end of file
@@ -1,35 +1,198 @@
 """
 API routes for indkoebsliste (shopping list) management.
 """
-from flask import Blueprint, request, jsonify
+from datetime import datetime
+from flask import Blueprint, Response, current_app, request, jsonify
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
 from backend.config import db
 from backend.models.vare import Vare
 from backend.models.indkoebsliste_element import IndkoebslisteElement
+from backend.models.arkiveret_element import ArkiveretElement
+from backend.utils import ValidationError, pagination_requested, paginate, get_fields
+from backend.utils.versioning import conditional_get
+from backend.utils.coalescing import coalesced
+from backend.utils.statistics import get_list_statistics
+from backend.utils.suggestions import get_suggestions
+from backend.utils.pagination import get_limit, paginate_with
+from backend.utils.serialization import serialize_elementer
+from backend.utils.events import StreamClosed, get_broker, publish_event, format_sse, format_unavailable
 
 indkoebsliste_bp = Blueprint('indkoebsliste', __name__)
 
+# Maksimalt antal elementer i ét batch request
+MAX_BATCH_SIZE = 500
+
+
+def _get_id_list(key):
+    """
+    Læs en liste af ID'er fra JSON body'en til et batch request.
+    
+    Dubletter fjernes, men rækkefølgen bevares.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        raise ValidationError('Ingen data modtaget')
+    
+    ids = data.get(key)
+    if not isinstance(ids, list) or not ids:
+        raise ValidationError(f'{key} skal være en ikke-tom liste')
+    if len(ids) > MAX_BATCH_SIZE:
+        raise ValidationError(f'Højst {MAX_BATCH_SIZE} elementer per request')
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise ValidationError(f'{key} må kun indeholde heltal')
+    
+    return list(dict.fromkeys(ids))
+
+
+def _get_element(element_id):
+    """
+    Hent et element på listen med id.
+    
+    Et arkiveret element flyttes først tilbage til listen (uden commit),
+    så det kan ændres og slettes som alle andre.
+    """
+    element = db.session.get(IndkoebslisteElement, element_id)
+    if element is None and ArkiveretElement.restore([element_id]):
+        element = db.session.get(IndkoebslisteElement, element_id)
+    return element
+
+
+def _status_event_data(element):
+    """Kompakt event data for en statusændring."""
+    return {'id': element.id, 'status': element.status, 'note_liste': element.note_liste}
+
+
+def _paginated_elements(query, fields):
+    """Returner én side af liste elementer (rækker fra listing_rows_query), nyeste først."""
+    rows, next_cursor = paginate(
+        query,
+        IndkoebslisteElement.sort_columns(),
+        key=lambda row: (row.tilfoejelsesdato, row.id),
+        descending=True
+    )
+    return jsonify({
+        'items': serialize_elementer(rows, fields),
+        'next_cursor': next_cursor
+    }), 200
+
 
 @indkoebsliste_bp.route('/', methods=['GET'])
+@conditional_get('indkoebsliste_element', 'vare', 'kategori')
+@coalesced('indkoebsliste_element', 'vare', 'kategori')
 def get_indkoebsliste():
     """Hent den aktive indkøbsliste."""
     try:
-        aktive_elementer = IndkoebslisteElement.get_active_list()
-        return jsonify([element.to_dict() for element in aktive_elementer]), 200
+        fields = get_fields(IndkoebslisteElement.SERIALIZABLE_FIELDS)
+        
+        query = IndkoebslisteElement.listing_rows_query('aktiv')
+        if pagination_requested():
+            return _paginated_elements(query, fields)
+        
+        return jsonify(serialize_elementer(query.all(), fields)), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': 'Kunne ikke hente indkøbsliste', 'details': str(e)}), 500
 
 
+@indkoebsliste_bp.route('/stream', methods=['GET'])
+def stream_indkoebsliste():
+    """
+    Server-Sent Events stream med ændringer på indkøbslisten.
+    
+    Events: element_added, element_updated, element_removed,
+    purchased_cleared og reset (klienten skal hente listen igen).
+    Genoptag med Last-Event-ID headeren eller last_event_id parameteren.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    # Hver stream optager en tråd; uden ledig plads afvises den, så resten af API'et kan svare
+    streams = current_app.extensions.get('event_streams')
+    if streams is not None and not streams.acquire(blocking=False):
+        return _stream_unavailable()
+    try:
+        subscription = get_broker().subscribe(last_event_id)
+    except StreamClosed:
+        if streams is not None:
+            streams.release()
+        return _stream_unavailable()
+    
+    keepalive = current_app.config.get('EVENT_KEEPALIVE_SECONDS', 15)
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                event = subscription.get(timeout=keepalive)
+                yield ': keepalive\n\n' if event is None else format_sse(event)
+        except StreamClosed:
+            return
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Ingen buffering i nginx
+    })
+    # Også hvis serveren lukker svaret før generatoren er startet
+    response.call_on_close(subscription.close)
+    if streams is not None:
+        response.call_on_close(streams.release)
+    return response
+
+
+def _stream_unavailable():
+    """503 med Retry-After og et SSE retry felt."""
+    retry = current_app.config.get('EVENT_RETRY_SECONDS', 10)
+    return Response(format_unavailable(retry), status=503, mimetype='text/event-stream', headers={
+        'Retry-After': str(retry),
+        'Cache-Control': 'no-cache'
+    })
+
+
 @indkoebsliste_bp.route('/historik', methods=['GET'])
+@conditional_get('indkoebsliste_element', 'indkoebsliste_arkiv', 'vare', 'kategori')
+@coalesced('indkoebsliste_element', 'indkoebsliste_arkiv', 'vare', 'kategori')
 def get_historik():
-    """Hent historik over købte varer."""
+    """Hent historik over købte varer, også arkiverede."""
     try:
+        fields = get_fields(IndkoebslisteElement.SERIALIZABLE_FIELDS)
+        
+        # limit uden cursor er historikkens oprindelige, ikke-paginerede grænse
+        if pagination_requested(by_limit=False):
+            rows, next_cursor = paginate_with(
+                lambda limit, before: IndkoebslisteElement.historik_rows_query(limit, before).all(),
+                IndkoebslisteElement.sort_columns(),
+                key=lambda row: (row.tilfoejelsesdato, row.id)
+            )
+            return jsonify({
+                'items': serialize_elementer(rows, fields),
+                'next_cursor': next_cursor
+            }), 200
+        
         limit = request.args.get('limit', 50, type=int)
-        købte_elementer = IndkoebslisteElement.get_purchased_items(limit)
-        return jsonify([element.to_dict() for element in købte_elementer]), 200
+        rows = IndkoebslisteElement.historik_rows_query(limit).all()
+        return jsonify(serialize_elementer(rows, fields)), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': 'Kunne ikke hente historik', 'details': str(e)}), 500
 
 
+@indkoebsliste_bp.route('/forslag', methods=['GET'])
+def get_forslag():
+    """
+    Hent "køb igen" forslag ud fra købsfrekvens og tid siden seneste køb.
+    
+    Query params:
+        limit: Antal forslag (default 20)
+    """
+    try:
+        return jsonify(get_suggestions(get_limit(default=20))), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': 'Kunne ikke hente forslag', 'details': str(e)}), 500
+
+
 @indkoebsliste_bp.route('/tilfoej', methods=['POST'])
 def tilfoej_til_liste():
     """Tilføj en vare til indkøbslisten."""
@@ -66,7 +229,9 @@ def tilfoej_til_liste():
         db.session.add(element)
         db.session.commit()
         
-        return jsonify(element.to_dict()), 201
+        element_data = element.to_dict()
+        publish_event('element_added', {'elements': [element_data]})
+        return jsonify(element_data), 201
         
     except Exception as e:
         db.session.rollback()
@@ -77,7 +242,7 @@ def tilfoej_til_liste():
 def update_liste_element(element_id):
     """Opdater et element på indkøbslisten."""
     try:
-        element = IndkoebslisteElement.query.get(element_id)
+        element = _get_element(element_id)
         if not element:
             return jsonify({'error': 'Liste element ikke fundet'}), 404
         
@@ -97,6 +262,8 @@ def update_liste_element(element_id):
             element.status = status
         
         db.session.commit()
+        
+        publish_event('element_updated', {'elements': [_status_event_data(element)]})
         return jsonify(element.to_dict()), 200
         
     except ValueError as e:
@@ -111,7 +278,7 @@ def update_liste_element(element_id):
 def marker_som_købt(element_id):
     """Marker en vare som købt."""
     try:
-        element = IndkoebslisteElement.query.get(element_id)
+        element = _get_element(element_id)
         if not element:
             return jsonify({'error': 'Liste element ikke fundet'}), 404
         
@@ -120,6 +287,7 @@ def marker_som_købt(element_id):
         
         element.marker_som_købt()
         db.session.commit()
+        publish_event('element_updated', {'elements': [_status_event_data(element)]})
         
         return jsonify({
             'message': f'Varen "{element.vare.navn}" er markeret som købt',
@@ -135,7 +303,7 @@ def marker_som_købt(element_id):
 def genaktiver_element(element_id):
     """Genaktiver en købt vare (flyt tilbage til aktiv liste)."""
     try:
-        element = IndkoebslisteElement.query.get(element_id)
+        element = _get_element(element_id)
         if not element:
             return jsonify({'error': 'Liste element ikke fundet'}), 404
         
@@ -144,6 +312,7 @@ def genaktiver_element(element_id):
         
         element.marker_som_aktiv()
         db.session.commit()
+        publish_event('element_updated', {'elements': [_status_event_data(element)]})
         
         return jsonify({
             'message': f'Varen "{element.vare.navn}" er genaktiveret',
@@ -159,13 +328,14 @@ def genaktiver_element(element_id):
 def fjern_fra_liste(element_id):
     """Fjern en vare helt fra indkøbslisten."""
     try:
-        element = IndkoebslisteElement.query.get(element_id)
+        element = _get_element(element_id)
         if not element:
             return jsonify({'error': 'Liste element ikke fundet'}), 404
         
         vare_navn = element.vare.navn if element.vare else "Ukendt vare"
         db.session.delete(element)
         db.session.commit()
+        publish_event('element_removed', {'ids': [element_id]})
         
         return jsonify({'message': f'Varen "{vare_navn}" er fjernet fra listen'}), 200
         
@@ -174,20 +344,191 @@ def fjern_fra_liste(element_id):
         return jsonify({'error': 'Kunne ikke fjerne fra liste', 'details': str(e)}), 500
 
 
-@indkoebsliste_bp.route('/ryd-købte', methods=['DELETE'])
-def ryd_købte_varer():
-    """Fjern alle købte varer fra listen."""
+def _get_statuses(element_ids):
+    """
+    Status for flere elementer, også arkiverede (id -> status), og de arkiveredes id'er.
+    
+    Arkivet slås kun op for id'er der ikke findes i indkoebsliste_element.
+    """
+    statuses = IndkoebslisteElement.get_statuses(element_ids)
+    archived = ArkiveretElement.get_ids([i for i in element_ids if i not in statuses])
+    statuses.update(dict.fromkeys(archived, 'købt'))
+    return statuses, archived
+
+
+def _batch_set_status(element_ids, status, already_message, done_message):
+    """Sæt status på flere elementer i én transaktion og returner resultat per element."""
+    statuses, archived = _get_statuses(element_ids)
+    to_update = [i for i in element_ids if i in statuses and statuses[i] != status]
+    
+    # Arkiverede elementer (altid købte) flyttes tilbage før de genaktiveres
+    if status != 'købt':
+        ArkiveretElement.restore(archived)
+    IndkoebslisteElement.bulk_update_status(to_update, status)
+    db.session.commit()
+    if to_update:
+        publish_event('element_updated', {
+            'elements': [{'id': element_id, 'status': status} for element_id in to_update]
+        })
+    
+    results = []
+    for element_id in element_ids:
+        if element_id not in statuses:
+            results.append({'id': element_id, 'status_code': 404, 'error': 'Liste element ikke fundet'})
+        elif statuses[element_id] == status:
+            results.append({'id': element_id, 'status_code': 200, 'message': already_message})
+        else:
+            results.append({'id': element_id, 'status_code': 200, 'message': done_message})
+    return results
+
+
+@indkoebsliste_bp.route('/batch/koeb', methods=['POST'])
+def batch_marker_som_købt():
+    """Marker flere varer som købt i én transaktion."""
     try:
-        købte_elementer = IndkoebslisteElement.query.filter_by(status='købt').all()
+        element_ids = _get_id_list('element_ids')
+        results = _batch_set_status(
+            element_ids, 'købt',
+            'Varen er allerede markeret som købt', 'Varen er markeret som købt'
+        )
+        return jsonify({'results': results}), 200
         
-        if not købte_elementer:
-            return jsonify({'message': 'Ingen købte varer at fjerne'}), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Kunne ikke markere som købt', 'details': str(e)}), 500
+
+
+@indkoebsliste_bp.route('/batch/genaktiver', methods=['POST'])
+def batch_genaktiver():
+    """Genaktiver flere købte varer i én transaktion."""
+    try:
+        element_ids = _get_id_list('element_ids')
+        results = _batch_set_status(
+            element_ids, 'aktiv',
+            'Varen er allerede aktiv', 'Varen er genaktiveret'
+        )
+        return jsonify({'results': results}), 200
+        
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Kunne ikke genaktivere elementer', 'details': str(e)}), 500
+
+
+@indkoebsliste_bp.route('/batch/tilfoej', methods=['POST'])
+def batch_tilfoej_til_liste():
+    """Tilføj flere varer til indkøbslisten i én transaktion."""
+    try:
+        vare_ids = _get_id_list('vare_ids')
+        
+        # Hent varer (med kategori) og eksisterende aktive elementer i to queries
+        varer = {
+            vare.id: vare
+            for vare in Vare.query.options(joinedload(Vare.kategori)).filter(Vare.id.in_(vare_ids))
+        }
+        eksisterende = IndkoebslisteElement.find_active_by_varer(list(varer))
+        
+        nye = [
+            {'vare_id': vare_id, 'status': 'aktiv', 'tilfoejelsesdato': datetime.utcnow()}
+            for vare_id in vare_ids
+            if vare_id in varer and vare_id not in eksisterende
+        ]
+        oprettede = {}
+        if nye:
+            elementer = db.session.scalars(
+                insert(IndkoebslisteElement).returning(IndkoebslisteElement), nye
+            ).all()
+            oprettede = {element.vare_id: element for element in elementer}
+        
+        # Resultaterne bygges før commit, så objekterne ikke skal genindlæses
+        results = []
+        for vare_id in vare_ids:
+            if vare_id not in varer:
+                results.append({'vare_id': vare_id, 'status_code': 404, 'error': 'Varen eksisterer ikke'})
+            elif vare_id in eksisterende:
+                results.append({
+                    'vare_id': vare_id,
+                    'status_code': 409,
+                    'error': f'Varen "{varer[vare_id].navn}" er allerede på indkøbslisten',
+                    'existing_element': eksisterende[vare_id].to_dict()
+                })
+            else:
+                results.append({
+                    'vare_id': vare_id,
+                    'status_code': 201,
+                    'element': oprettede[vare_id].to_dict()
+                })
+        
+        db.session.commit()
+        if oprettede:
+            publish_event('element_added', {
+                'elements': [result['element'] for result in results if result['status_code'] == 201]
+            })
+        return jsonify({'results': results}), 200
+        
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Kunne ikke tilføje til liste', 'details': str(e)}), 500
+
+
+@indkoebsliste_bp.route('/batch/fjern', methods=['POST'])
+def batch_fjern_fra_liste():
+    """Fjern flere varer helt fra indkøbslisten i én transaktion."""
+    try:
+        element_ids = _get_id_list('element_ids')
+        
+        statuses, archived = _get_statuses(element_ids)
+        IndkoebslisteElement.bulk_delete([i for i in statuses if i not in archived])
+        ArkiveretElement.bulk_delete(list(archived))
+        db.session.commit()
+        if statuses:
+            publish_event('element_removed', {'ids': list(statuses)})
+        
+        results = [
+            {'id': element_id, 'status_code': 200, 'message': 'Varen er fjernet fra listen'}
+            if element_id in statuses else
+            {'id': element_id, 'status_code': 404, 'error': 'Liste element ikke fundet'}
+            for element_id in element_ids
+        ]
+        return jsonify({'results': results}), 200
         
-        antal = len(købte_elementer)
-        for element in købte_elementer:
-            db.session.delete(element)
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Kunne ikke fjerne fra liste', 'details': str(e)}), 500
+
+
+@indkoebsliste_bp.route('/ryd-købte', methods=['DELETE'])
+def ryd_købte_varer():
+    """
+    Fjern alle købte varer fra listen.
+    
+    Query params:
+        older_than: ISO dato/tidspunkt; fjern kun varer tilføjet før dette
+    """
+    try:
+        older_than = request.args.get('older_than', '').strip() or None
+        if older_than:
+            try:
+                older_than = datetime.fromisoformat(older_than)
+            except ValueError:
+                return jsonify({'error': 'older_than skal være en ISO dato, f.eks. 2024-01-31'}), 400
         
+        antal = IndkoebslisteElement.delete_purchased(older_than)
         db.session.commit()
+        if antal:
+            publish_event('purchased_cleared', {
+                'older_than': older_than.isoformat() if older_than else None
+            })
+        
+        if not antal:
+            return jsonify({'message': 'Ingen købte varer at fjerne'}), 200
         
         return jsonify({'message': f'Fjernede {antal} købte varer fra listen'}), 200
         
@@ -197,18 +538,12 @@ def ryd_købte_varer():
 
 
 @indkoebsliste_bp.route('/stats', methods=['GET'])
+@conditional_get('indkoebsliste_element', 'indkoebsliste_arkiv', 'vare', 'kategori')
+@coalesced('indkoebsliste_element', 'indkoebsliste_arkiv', 'vare', 'kategori')
 def get_liste_statistik():
-    """Hent statistik over indkøbslisten."""
+    """Hent statistik over indkøbslisten, også fordelt på kategorier."""
     try:
-        aktive = IndkoebslisteElement.query.filter_by(status='aktiv').count()
-        købte = IndkoebslisteElement.query.filter_by(status='købt').count()
-        
-        return jsonify({
-            'aktive_varer': aktive,
-            'købte_varer': købte,
-            'total_varer': aktive + købte,
-            'procent_købt': round((købte / (aktive + købte)) * 100, 1) if (aktive + købte) > 0 else 0
-        }), 200
+        return jsonify(get_list_statistics()), 200
         
     except Exception as e:
-        return jsonify({'error': 'Kunne ikke hente statistik', 'details': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': 'Kunne ikke hente statistik', 'details': str(e)}), 500
@@ -4,21 +4,43 @@ API routes for kategori (category) management.
 from flask import Blueprint, request, jsonify
 from backend.config import db
 from backend.models.kategori import Kategori
+from backend.models.vare import Vare
+from backend.utils import ValidationError, pagination_requested, paginate, get_fields
+from backend.utils.versioning import conditional_get
+from backend.utils.cache import cached_response
+from backend.utils.coalescing import coalesced
 
 kategori_bp = Blueprint('kategorier', __name__)
 
 
 @kategori_bp.route('/', methods=['GET'])
+@conditional_get('kategori', 'vare')
+@cached_response('kategori', 'vare')
+@coalesced('kategori', 'vare')
 def get_kategorier():
     """Hent alle kategorier."""
     try:
-        kategorier = Kategori.get_all()
-        return jsonify([kategori.to_dict() for kategori in kategorier]), 200
+        fields = get_fields(Kategori.SERIALIZABLE_FIELDS)
+        
+        if pagination_requested():
+            rows, next_cursor = paginate(
+                Kategori.listing_query(), Kategori.sort_columns(), key=lambda row: (row[0].navn, row[0].id)
+            )
+            return jsonify({
+                'items': [kategori.to_dict(fields, antal_varer) for kategori, antal_varer in rows],
+                'next_cursor': next_cursor
+            }), 200
+        
+        rows = Kategori.listing_query().order_by(Kategori.navn).all()
+        return jsonify([kategori.to_dict(fields, antal_varer) for kategori, antal_varer in rows]), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': 'Kunne ikke hente kategorier', 'details': str(e)}), 500
 
 
 @kategori_bp.route('/<int:kategori_id>', methods=['GET'])
+@conditional_get('kategori', 'vare')
 def get_kategori(kategori_id):
     """Hent en specifik kategori."""
     try:
@@ -108,9 +130,10 @@ def delete_kategori(kategori_id):
             return jsonify({'error': 'Kategori ikke fundet'}), 404
         
         # Check om kategorien har varer
-        if kategori.varer:
+        antal_varer = Vare.query.filter_by(kategori_id=kategori_id).count()
+        if antal_varer:
             return jsonify({
-                'error': f'Kategorien "{kategori.navn}" kan ikke slettes da den indeholder {len(kategori.varer)} varer'
+                'error': f'Kategorien "{kategori.navn}" kan ikke slettes da den indeholder {antal_varer} varer'
             }), 409
         
         db.session.delete(kategori)
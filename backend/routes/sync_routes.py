@@ -0,0 +1,27 @@
+"""
+API routes for delta sync af kategorier, varer og indkøbsliste.
+"""
+from flask import Blueprint, request, jsonify
+from backend.utils.sync import get_changes
+
+sync_bp = Blueprint('sync', __name__)
+
+
+@sync_bp.route('', methods=['GET'])
+@sync_bp.route('/', methods=['GET'])
+def get_sync():
+    """
+    Hent ændringer siden et token.
+    
+    Query params:
+        since: Token fra forrige sync (udelades ved første sync)
+    """
+    try:
+        since = request.args.get('since', '').strip()
+        if since and not since.isdigit():
+            return jsonify({'error': 'Ugyldigt sync token'}), 400
+        
+        return jsonify(get_changes(int(since) if since else 0)), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Kunne ikke hente ændringer', 'details': str(e)}), 500
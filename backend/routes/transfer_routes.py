@@ -0,0 +1,54 @@
+"""
+API routes for eksport og import af kategorier, varer og historik.
+"""
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from backend.utils import ValidationError
+from backend.utils.transfer import MIMETYPES, export_entity, import_entity, read_rows
+
+transfer_bp = Blueprint('transfer', __name__)
+
+
+@transfer_bp.route('/eksport/<entitet>', methods=['GET'])
+def eksporter(entitet):
+    """
+    Stream en eksport af kategorier, varer eller historik.
+    
+    Query params:
+        format: ndjson (default) eller csv
+    """
+    fmt = request.args.get('format', 'ndjson')
+    try:
+        chunks = export_entity(entitet, fmt)
+        # Valider entitet og format før streamen starter
+        first = next(chunks, '')
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': 'Kunne ikke eksportere data', 'details': str(e)}), 500
+    
+    def generate():
+        yield first
+        yield from chunks
+    
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    return Response(stream_with_context(generate()), mimetype=MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename={entitet}.{extension}'
+    })
+
+
+@transfer_bp.route('/import/<entitet>', methods=['POST'])
+def importer(entitet):
+    """
+    Importer kategorier, varer eller historik fra NDJSON eller CSV i request body'en.
+    
+    Formatet vælges med ?format= eller Content-Type (text/csv giver CSV).
+    """
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    try:
+        if fmt not in MIMETYPES:
+            raise ValidationError(f'Ukendt format: {fmt} (brug ndjson eller csv)')
+        return jsonify(import_entity(entitet, read_rows(request.stream, fmt))), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': 'Kunne ikke importere data', 'details': str(e)}), 500
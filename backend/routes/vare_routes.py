@@ -5,11 +5,23 @@ from flask import Blueprint, request, jsonify
 from backend.config import db
 from backend.models.vare import Vare
 from backend.models.kategori import Kategori
+from backend.models.indkoebsliste_element import IndkoebslisteElement
+from backend.utils import ValidationError, pagination_requested, paginate, get_fields
+from backend.utils.versioning import conditional_get
+from backend.utils.cache import cached_response
+from backend.utils.coalescing import coalesced
+from backend.utils.events import publish_event
+from backend.utils.autocomplete import autocomplete
+from backend.utils.pagination import get_limit
+from backend.utils.serialization import serialize_varer
 
 vare_bp = Blueprint('varer', __name__)
 
 
 @vare_bp.route('/', methods=['GET'])
+@conditional_get('vare', 'kategori', 'indkoebsliste_element')
+@cached_response('vare', 'kategori', 'indkoebsliste_element')
+@coalesced('vare', 'kategori', 'indkoebsliste_element')
 def get_varer():
     """Hent varer med valgfri søgning og filtrering."""
     try:
@@ -24,16 +36,49 @@ def get_varer():
             except ValueError:
                 return jsonify({'error': 'Ugyldige kategori ID\'er'}), 400
         
-        # Søg efter varer
-        varer = Vare.search(search_query, kategori_ids if kategori_ids else None)
+        fields = get_fields(Vare.SERIALIZABLE_FIELDS)
         
-        return jsonify([vare.to_dict() for vare in varer]), 200
+        # Søg efter varer (rækker med paa_liste fra samme query, se serialize_varer)
+        listing = Vare.search_rows_query(
+            search_query, kategori_ids if kategori_ids else None, fields
+        )
+        
+        if pagination_requested():
+            rows, next_cursor = paginate(
+                listing, Vare.sort_columns(), key=lambda row: (row.navn, row.id)
+            )
+            return jsonify({
+                'items': serialize_varer(rows, fields),
+                'next_cursor': next_cursor
+            }), 200
         
+        return jsonify(serialize_varer(listing.all(), fields)), 200
+        
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
     except Exception as e:
         return jsonify({'error': 'Kunne ikke hente varer', 'details': str(e)}), 500
 
 
+@vare_bp.route('/autocomplete', methods=['GET'])
+def autocomplete_varer():
+    """
+    Forslag til varenavne mens brugeren skriver.
+    
+    Query params:
+        q: Prefix af varenavnet (eller af et ord i navnet)
+        limit: Antal forslag (default 10)
+    """
+    try:
+        return jsonify(autocomplete(request.args.get('q', ''), get_limit(default=10))), 200
+    except ValidationError as e:
+        return jsonify({'error': e.message}), e.status_code
+    except Exception as e:
+        return jsonify({'error': 'Kunne ikke hente forslag', 'details': str(e)}), 500
+
+
 @vare_bp.route('/<int:vare_id>', methods=['GET'])
+@conditional_get('vare', 'kategori', 'indkoebsliste_element')
 def get_vare(vare_id):
     """Hent en specifik vare."""
     try:
@@ -140,9 +185,13 @@ def delete_vare(vare_id):
         # Note: Dette vil også slette alle relaterede indkøbsliste elementer
         # på grund af cascade='all, delete-orphan'
         vare_navn = vare.navn
+        aktivt_element = IndkoebslisteElement.find_active_by_vare(vare_id)
         db.session.delete(vare)
         db.session.commit()
         
+        if aktivt_element:
+            publish_event('element_removed', {'ids': [aktivt_element.id]})
+        
         return jsonify({'message': f'Vare "{vare_navn}" blev slettet'}), 200
         
     except Exception as e:
@@ -151,6 +200,9 @@ def delete_vare(vare_id):
 
 
 @vare_bp.route('/kategori/<int:kategori_id>', methods=['GET'])
+@conditional_get('vare', 'kategori', 'indkoebsliste_element')
+@cached_response('vare', 'kategori', 'indkoebsliste_element')
+@coalesced('vare', 'kategori', 'indkoebsliste_element')
 def get_varer_by_kategori(kategori_id):
     """Hent alle varer i en specifik kategori."""
     try:
@@ -159,8 +211,7 @@ def get_varer_by_kategori(kategori_id):
         if not kategori:
             return jsonify({'error': 'Kategorien eksisterer ikke'}), 404
         
-        varer = Vare.get_by_category(kategori_id)
-        return jsonify([vare.to_dict() for vare in varer]), 200
+        return jsonify(serialize_varer(Vare.get_by_category_rows(kategori_id))), 200
         
     except Exception as e:
         return jsonify({'error': 'Kunne ikke hente varer for kategori', 'details': str(e)}), 500
\ No newline at end of file
@@ -2,8 +2,10 @@
 Utilities module initialization.
 """
 from .validation import validate_json, validate_kategori_data, validate_vare_data, validate_indkoebsliste_data, ValidationError
+from .pagination import pagination_requested, paginate, get_fields
 
 __all__ = [
     'validate_json', 'validate_kategori_data', 'validate_vare_data', 
-    'validate_indkoebsliste_data', 'ValidationError'
+    'validate_indkoebsliste_data', 'ValidationError',
+    'pagination_requested', 'paginate', 'get_fields'
 ]
\ No newline at end of file
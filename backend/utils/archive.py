@@ -0,0 +1,189 @@
+"""
+Arkivering af gammel købshistorik (varm og kold tabel).
+
+indkoebsliste_element rummer den aktive liste og købshistorikken. Uden
+arkivering vokser tabellen med hvert køb, og dermed også de indekser som
+den aktive liste, find_active_by_vare og paa_liste EXISTS slår op i.
+compact_history flytter købte elementer der er ældre end ARCHIVE_AFTER_DAYS
+over i indkoebsliste_arkiv, så den varme tabel holder sig omkring listens
+størrelse plus den nyeste historik:
+
+    flask db compact-history --days 30
+
+Flytningen sker i bidder af ARCHIVE_BATCH_SIZE elementer, hver i sin egen
+transaktion, så skrivelåsen kun holdes kort. Jobbet kan køres fra cron og
+afbrydes når som helst.
+
+Læsning er uændret for klienterne:
+
+- /historik læser begge tabeller (IndkoebslisteElement.historik_rows_query).
+- kategori_statistik og koebsstatistik tæller arkivet med, så statistik
+  og forslag ikke ændres af en arkivering.
+- Et arkiveret element kan genaktiveres, redigeres og slettes med sit id;
+  det flyttes først tilbage til den varme tabel (ArkiveretElement.restore).
+- Eksport af historik medtager arkivet.
+
+Elementerne beholder deres id, og indkoebsliste_element bruger AUTOINCREMENT,
+så et id aldrig genbruges af et nyt element. Databaser fra før arkivet
+migreres af create_archive. Delta sync ser en arkivering som en sletning
+(tombstone), da elementet forlader den tabel sync læser fra.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, insert, select
+from sqlalchemy.schema import CreateTable
+from backend.config.config import db
+from backend.models.arkiveret_element import ArkiveretElement
+from backend.models.indkoebsliste_element import IndkoebslisteElement
+from backend.utils.triggers import install_triggers
+
+TRIGGER_PREFIX = 'indkoebsliste_arkiv'
+
+_TRIGGERS = {
+    # Før varen slettes, så triggers på arkivet stadig kan finde kategorien
+    'vare_bd': """
+        BEFORE DELETE ON vare BEGIN
+            DELETE FROM indkoebsliste_arkiv WHERE vare_id = old.id;
+        END
+    """,
+}
+
+
+def _enable_autoincrement(engine):
+    """
+    Genopbyg indkoebsliste_element med AUTOINCREMENT i en ældre database.
+
+    SQLite kan ikke tilføje AUTOINCREMENT til en eksisterende tabel, så
+    tabellen kopieres til en ny. Triggers og indekser gemmes og oprettes
+    igen uændrede, så afledte tabeller ikke skal genberegnes.
+
+    Returns:
+        bool: True hvis tabellen blev genopbygget
+    """
+    table = IndkoebslisteElement.__table__
+    raw = engine.raw_connection()
+    try:
+        connection = raw.driver_connection
+        sql = connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+        ).fetchone()
+        if sql is None or 'AUTOINCREMENT' in sql[0].upper():
+            return False
+
+        triggers = connection.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+        ).fetchall()
+        indexes = connection.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table.name,)
+        ).fetchall()
+        create = str(CreateTable(table).compile(dialect=engine.dialect)).replace(
+            f'CREATE TABLE {table.name} ', f'CREATE TABLE {table.name}_ny ', 1
+        )
+        columns = ', '.join(column.name for column in table.columns)
+
+        isolation_level = connection.isolation_level
+        foreign_keys = connection.execute('PRAGMA foreign_keys').fetchone()[0]
+        connection.isolation_level = None
+        connection.execute('PRAGMA foreign_keys = OFF')
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                # Triggers på andre tabeller der nævner tabellen, får RENAME til at fejle
+                for name, _ in triggers:
+                    connection.execute(f'DROP TRIGGER {name}')
+                connection.execute(create)
+                connection.execute(
+                    f'INSERT INTO {table.name}_ny ({columns}) SELECT {columns} FROM {table.name}'
+                )
+                connection.execute(f'DROP TABLE {table.name}')
+                connection.execute(f'ALTER TABLE {table.name}_ny RENAME TO {table.name}')
+                for (statement,) in indexes:
+                    connection.execute(statement)
+                for _, statement in triggers:
+                    connection.execute(statement)
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+        finally:
+            connection.execute(f'PRAGMA foreign_keys = {foreign_keys}')
+            connection.isolation_level = isolation_level
+    finally:
+        raw.close()
+    return True
+
+
+def create_archive():
+    """
+    Migrer indkoebsliste_element til AUTOINCREMENT og opret arkivets triggers.
+
+    Tabellen indkoebsliste_arkiv oprettes af db.create_all(). Skal køres
+    før triggers på indkoebsliste_element oprettes i en ny database.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    if _enable_autoincrement(db.engine):
+        current_app.logger.info('indkoebsliste_element er genopbygget med AUTOINCREMENT')
+    with db.engine.begin() as conn:
+        install_triggers(conn, TRIGGER_PREFIX, _TRIGGERS)
+    return True
+
+
+def compact_history(older_than_days=None, batch_size=None):
+    """
+    Flyt købte elementer ældre end older_than_days til arkivet.
+
+    Args:
+        older_than_days (int): Alder i dage (default ARCHIVE_AFTER_DAYS)
+        batch_size (int): Elementer per transaktion (default ARCHIVE_BATCH_SIZE)
+
+    Returns:
+        int: Antal arkiverede elementer
+    """
+    if older_than_days is None:
+        older_than_days = current_app.config.get('ARCHIVE_AFTER_DAYS', 30)
+    if batch_size is None:
+        batch_size = current_app.config.get('ARCHIVE_BATCH_SIZE', 1000)
+    if older_than_days < 0 or batch_size < 1:
+        raise ValueError('Alderen må ikke være negativ, og bidderne skal have mindst ét element')
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    element = IndkoebslisteElement
+    antal = 0
+    while True:
+        # Ældste først via ix_indkoebsliste_element_status_dato
+        ids = db.session.scalars(
+            select(element.id).where(
+                element.status == 'købt', element.tilfoejelsesdato < cutoff
+            ).order_by(element.tilfoejelsesdato, element.id).limit(batch_size)
+        ).all()
+        if not ids:
+            return antal
+
+        try:
+            db.session.execute(
+                insert(ArkiveretElement).from_select(
+                    ['id', 'vare_id', 'note_liste', 'tilfoejelsesdato'],
+                    select(element.id, element.vare_id, element.note_liste, element.tilfoejelsesdato)
+                    .where(element.id.in_(ids))
+                )
+            )
+            db.session.execute(
+                delete(element).where(element.id.in_(ids)),
+                execution_options={'synchronize_session': False}
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        antal += len(ids)
+
+
+def get_archive_statistics():
+    """Antal elementer i den varme tabel og i arkivet."""
+    return {
+        'elementer': db.session.scalar(select(db.func.count()).select_from(IndkoebslisteElement)),
+        'arkiverede': db.session.scalar(select(db.func.count()).select_from(ArkiveretElement))
+    }
@@ -0,0 +1,233 @@
+"""
+ASGI server oven på Flask appen med aiosqlite som database driver.
+
+Med gunicorn (gthread) optager hver åben forbindelse en tråd, så en SSE
+stream eller en langsom mobilklient holder en af de få tråde fast. Under
+ASGI håndterer én event loop alle forbindelser:
+
+- Hver request kører Flask appen uændret i en greenlet på event loopet
+  (SQLAlchemys greenlet_spawn, den samme mekanisme som AsyncSession
+  bygger på). Appen er oprettet med create_app(asgi=True), så engine
+  bruger aiosqlite, og hvert statement venter med await_only på event
+  loopet mens andre requests kører videre. Routes, modeller, validering,
+  versionering, cache og events er de samme som under WSGI.
+- Request body'en læses fra receive efterhånden som Flask beder om den,
+  og svaret sendes i de bidder appen giver (f.eks. streamet eksport).
+- GET /api/indkoebsliste/stream er en rigtig async handler, der venter på
+  events med AsyncSubscription og ikke binder en greenlet eller tråd.
+
+CPU arbejde (serialisering, autocomplete) kører stadig på event loopet, så
+flere kerner udnyttes med flere worker-processer (WEB_WORKERS).
+HOUSEHOLD_MODE understøttes ikke (se init_async_driver).
+
+    uvicorn backend.asgi:app
+"""
+import asyncio
+import io
+import sys
+from urllib.parse import parse_qs
+from sqlalchemy.util.concurrency import await_only, greenlet_spawn
+from backend.config.config import db
+from backend.utils.events import AsyncSubscription, StreamClosed, format_sse, format_unavailable
+
+STREAM_PATH = '/api/indkoebsliste/stream'
+
+
+class _RequestBody(io.RawIOBase):
+    """wsgi.input der henter request body'en fra ASGI receive. Bruges fra greenlet."""
+
+    def __init__(self, receive):
+        self.receive = receive
+        self.buffer = b''
+        self.more_body = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self.buffer and self.more_body:
+            message = await_only(self.receive())
+            if message['type'] == 'http.disconnect':
+                self.more_body = False
+                break
+            self.buffer = message.get('body', b'')
+            self.more_body = message.get('more_body', False)
+
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def _environ(scope, receive):
+    """Byg et WSGI environ ud fra et ASGI http scope."""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or ''),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BufferedReader(_RequestBody(receive)),
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            value = environ[key] + ('; ' if name == 'cookie' else ',') + value
+        environ[key] = value
+    return environ
+
+
+class _Response:
+    """start_response og afsendelse af et WSGI svar over ASGI send. Bruges fra greenlet."""
+
+    def __init__(self, send):
+        self.send = send
+        self.status = None
+        self.headers = None
+        self.started = False
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info is not None and self.started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        return self.write
+
+    def write(self, data, more_body=True):
+        if not self.started:
+            self.started = True
+            await_only(self.send({'type': 'http.response.start', 'status': self.status, 'headers': self.headers}))
+        await_only(self.send({'type': 'http.response.body', 'body': data, 'more_body': more_body}))
+
+    def send_body(self, chunks):
+        """Send bidderne; den sidste holdes tilbage, så et svar i én bid sendes som én besked."""
+        pending = None
+        for chunk in chunks:
+            if chunk:
+                if pending is not None:
+                    self.write(pending)
+                pending = chunk
+        self.write(pending or b'', more_body=False)
+
+
+async def _close_on_disconnect(receive, subscription):
+    """Luk abonnementet når klienten lukker forbindelsen."""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+    subscription.close()
+
+
+class AsgiApp:
+    """ASGI applikation der kører en Flask app oprettet med create_app(asgi=True)."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.routes = {('GET', STREAM_PATH): self.stream_indkoebsliste}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise RuntimeError(f"ASGI scope {scope['type']} understøttes ikke")
+
+        handler = self.routes.get((scope['method'], scope['path']))
+        if handler is not None:
+            return await handler(scope, receive, send)
+        await greenlet_spawn(self._call_flask, scope, receive, send)
+
+    def _call_flask(self, scope, receive, send):
+        """Kør Flask appen for én request. Kører i en greenlet på event loopet."""
+        response = _Response(send)
+        result = self.flask_app(_environ(scope, receive), response.start_response)
+        try:
+            response.send_body(result)
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+
+    async def lifespan(self, receive, send):
+        """Luk databaseforbindelserne når serveren stopper."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await greenlet_spawn(self._dispose)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _dispose(self):
+        with self.flask_app.app_context():
+            db.engine.dispose()
+
+    async def stream_indkoebsliste(self, scope, receive, send):
+        """
+        Server-Sent Events stream med ændringer på indkøbslisten.
+
+        Samme svar som stream_indkoebsliste i indkoebsliste_routes, men
+        forbindelsen venter på event loopet i stedet for at optage en tråd.
+        """
+        headers = dict(scope['headers'])
+        last_event_id = headers.get(b'last-event-id', b'').decode('latin-1') or \
+            parse_qs(scope['query_string'].decode('latin-1')).get('last_event_id', [None])[0]
+        # Som flask_cors giver resten af API'et
+        cors = [(b'access-control-allow-origin', b'*')] if b'origin' in headers else []
+
+        broker = self.flask_app.extensions['event_broker']
+        try:
+            subscription = broker.subscribe(last_event_id, AsyncSubscription)
+        except StreamClosed:
+            retry = self.flask_app.config.get('EVENT_RETRY_SECONDS', 10)
+            body = format_unavailable(retry).encode('utf-8')
+            await send({'type': 'http.response.start', 'status': 503, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'content-length', str(len(body)).encode('ascii')),
+                (b'retry-after', str(retry).encode('ascii'))
+            ] + cors})
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        keepalive = self.flask_app.config.get('EVENT_KEEPALIVE_SECONDS', 15)
+        watcher = asyncio.ensure_future(_close_on_disconnect(receive, subscription))
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no')  # Ingen buffering i nginx
+            ] + cors})
+            await send({'type': 'http.response.body', 'body': b'retry: 3000\n\n', 'more_body': True})
+            while True:
+                event = await subscription.get(timeout=keepalive)
+                chunk = ': keepalive\n\n' if event is None else format_sse(event)
+                await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        except StreamClosed:
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            watcher.cancel()
+            subscription.close()
@@ -0,0 +1,274 @@
+"""
+Autocomplete af varenavne fra et in-memory prefix indeks.
+
+Indekset er et sorteret array af (nøgle, vare_id) par, hvor nøglerne er det
+normaliserede varenavn (NFC, casefold, enkelt mellemrum) fra starten af hvert
+ord: "Hakket oksekød" giver "hakket oksekød" og "oksekød". Et opslag er en
+bisect til første nøgle >= prefix efterfulgt af en scanning så længe nøglerne
+starter med prefix, dvs. O(log n + k).
+
+Indekset bygges ved første opslag og holdes derefter opdateret af model
+events på Vare og Kategori: ændringer opsamles under flush og lægges ind i
+indekset efter commit (og kasseres ved rollback). Indekset husker hvilke
+versioner af vare og kategori (data_version) det svarer til. Et opslag der
+ser andre versioner i databasen - fordi en anden proces eller et bulk
+statement har ændret data - bygger indekset forfra. Med husstande har hver
+husstand sit eget indeks.
+"""
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from itertools import chain
+from flask import has_app_context, has_request_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
+from backend.config.config import db
+from backend.utils.tenancy import household_extension
+from backend.utils.versioning import _changed_tables, get_versions
+
+TABLES = ('kategori', 'vare')
+
+_PENDING = 'autocomplete_pending'        # Ændringer i den aktuelle flush
+_CHANGES = 'autocomplete_changes'        # Ændringer i transaktionen
+_VERSIONS = 'autocomplete_versions'      # Versioner efter transaktionens flushes
+_STALE = 'autocomplete_stale'            # Indekset skal bygges forfra
+
+
+def normalize(text):
+    """Normaliser et navn eller prefix til sammenligning."""
+    return ' '.join(unicodedata.normalize('NFC', text).casefold().split())
+
+
+def _keys(navn):
+    """Nøgler for et varenavn: navnet fra starten af hvert ord."""
+    words = normalize(navn).split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class AutocompleteIndex:
+    """Sorteret prefix indeks over varenavne."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._varer = {}
+        self._kategorier = {}
+        self.versions = None
+
+    def build(self, varer, kategorier, versions):
+        """Byg indekset fra (id, navn, kategori_id) rækker og {kategori_id: navn}."""
+        entries = []
+        varer_map = {}
+        for vare_id, navn, kategori_id in varer:
+            keys = _keys(navn)
+            varer_map[vare_id] = (navn, kategori_id, keys)
+            entries.extend((key, vare_id) for key in keys)
+        entries.sort()
+
+        with self._lock:
+            self._entries = entries
+            self._varer = varer_map
+            self._kategorier = dict(kategorier)
+            self.versions = versions
+
+    def _remove_vare(self, vare_id):
+        old = self._varer.pop(vare_id, None)
+        if old is None:
+            return
+        for key in old[2]:
+            index = bisect_left(self._entries, (key, vare_id))
+            if index < len(self._entries) and self._entries[index] == (key, vare_id):
+                del self._entries[index]
+
+    def apply(self, changes, versions):
+        """Læg committede ændringer ind og sæt de nye versioner."""
+        with self._lock:
+            for kind, item_id, values in changes:
+                if kind == 'vare':
+                    self._remove_vare(item_id)
+                    if values is not None:
+                        navn, kategori_id = values
+                        keys = _keys(navn)
+                        self._varer[item_id] = (navn, kategori_id, keys)
+                        for key in keys:
+                            insort(self._entries, (key, item_id))
+                elif values is None:
+                    self._kategorier.pop(item_id, None)
+                else:
+                    self._kategorier[item_id] = values
+            self.versions = versions
+
+    def invalidate(self):
+        """Marker indekset som forældet, så det bygges forfra ved næste opslag."""
+        with self._lock:
+            self.versions = None
+
+    def lookup(self, prefix, limit=10):
+        """
+        Find op til limit varer hvor et ord i navnet starter med prefix.
+
+        Returns:
+            list: Dictionaries med id, navn og kategori_navn
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        results = []
+        seen = set()
+        with self._lock:
+            index = bisect_left(self._entries, (prefix,))
+            entries = self._entries
+            while index < len(entries) and len(results) < limit:
+                key, vare_id = entries[index]
+                if not key.startswith(prefix):
+                    break
+                if vare_id not in seen:
+                    seen.add(vare_id)
+                    navn, kategori_id, _ = self._varer[vare_id]
+                    results.append({
+                        'id': vare_id,
+                        'navn': navn,
+                        'kategori_navn': self._kategorier.get(kategori_id)
+                    })
+                index += 1
+        return results
+
+    def __len__(self):
+        return len(self._varer)
+
+
+def _get_index():
+    if not has_app_context():
+        return None
+    return household_extension('autocomplete', AutocompleteIndex)
+
+
+def _record(target, kind, values):
+    """Mapper event: husk en ændring til efter commit."""
+    session = object_session(target)
+    index = _get_index()
+    if session is None or index is None or index.versions is None:
+        return
+    session.info.setdefault(_PENDING, []).append((kind, target.id, values))
+
+
+def _vare_saved(mapper, connection, target):
+    _record(target, 'vare', (target.navn, target.kategori_id))
+
+
+def _vare_deleted(mapper, connection, target):
+    _record(target, 'vare', None)
+
+
+def _kategori_saved(mapper, connection, target):
+    _record(target, 'kategori', target.navn)
+
+
+def _kategori_deleted(mapper, connection, target):
+    _record(target, 'kategori', None)
+
+
+def _after_flush(session, flush_context):
+    """
+    Flyt flushens ændringer til transaktionen og kontroller versionerne.
+
+    versioning.py har netop talt vare/kategori op. Hvis versionen ikke er
+    præcis én højere end den indekset (eller transaktionens forrige flush)
+    kendte, har nogen andre ændret tabellen, og indekset skal bygges forfra.
+    SQLite har kun én skriver ad gangen, så ingen kan nå at skrive imellem.
+    """
+    pending = session.info.pop(_PENDING, None)
+    tables = _changed_tables(chain(session.new, session.dirty, session.deleted)) & set(TABLES)
+    index = _get_index()
+    if not tables or index is None or index.versions is None:
+        return
+
+    from backend.models.data_version import DataVersion
+
+    known = session.info.setdefault(_VERSIONS, dict(index.versions))
+    current = dict(session.connection().execute(
+        select(DataVersion.tabel, DataVersion.version).where(DataVersion.tabel.in_(tables))
+    ).all())
+    for tabel in tables:
+        if current.get(tabel, 0) != known[tabel] + 1:
+            session.info[_STALE] = True
+        known[tabel] = current.get(tabel, 0)
+    session.info.setdefault(_CHANGES, []).extend(pending or [])
+
+
+def _do_orm_execute(orm_execute_state):
+    """Bulk INSERT/UPDATE/DELETE på vare eller kategori giver ingen model events."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table.name in TABLES:
+        orm_execute_state.session.info[_STALE] = True
+
+
+def _after_commit(session):
+    changes = session.info.pop(_CHANGES, None)
+    versions = session.info.pop(_VERSIONS, None)
+    stale = session.info.pop(_STALE, False)
+    session.info.pop(_PENDING, None)
+    index = _get_index()
+    if index is None:
+        return
+    if stale:
+        index.invalidate()
+    elif versions is not None:
+        index.apply(changes or [], versions)
+
+
+def _after_rollback(session):
+    for key in (_PENDING, _CHANGES, _VERSIONS, _STALE):
+        session.info.pop(key, None)
+
+
+def init_autocomplete(app):
+    """Opret autocomplete indekset og registrer model og session events."""
+    # Modellerne importeres her, så `import backend.app` ikke indlæser dem
+    from backend.models.kategori import Kategori
+    from backend.models.vare import Vare
+
+    app.extensions['autocomplete'] = AutocompleteIndex()
+    if not event.contains(Vare, 'after_insert', _vare_saved):
+        event.listen(Vare, 'after_insert', _vare_saved)
+        event.listen(Vare, 'after_update', _vare_saved)
+        event.listen(Vare, 'after_delete', _vare_deleted)
+        event.listen(Kategori, 'after_insert', _kategori_saved)
+        event.listen(Kategori, 'after_update', _kategori_saved)
+        event.listen(Kategori, 'after_delete', _kategori_deleted)
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'do_orm_execute', _do_orm_execute)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
+    return app.extensions['autocomplete']
+
+
+def get_index():
+    """
+    Hent indekset for den aktuelle app, bygget og opdateret.
+
+    Bygges forfra hvis det ikke er bygget endnu, eller hvis versionerne i
+    databasen ikke matcher dem indekset blev opdateret til.
+    """
+    from backend.models.data_version import DataVersion
+    from backend.models.kategori import Kategori
+    from backend.models.vare import Vare
+
+    index = _get_index()
+    if has_request_context():
+        versions = get_versions(list(TABLES))
+    else:
+        versions = DataVersion.get_versions(list(TABLES))
+    if index.versions != versions:
+        varer = db.session.execute(select(Vare.id, Vare.navn, Vare.kategori_id)).all()
+        kategorier = db.session.execute(select(Kategori.id, Kategori.navn)).all()
+        index.build(varer, kategorier, versions)
+    return index
+
+
+def autocomplete(prefix, limit=10):
+    """Top limit varer hvis navn (eller et ord i navnet) starter med prefix."""
+    return get_index().lookup(prefix, limit)
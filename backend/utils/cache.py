@@ -0,0 +1,166 @@
+"""
+In-process læsecache for serialiserede listesvar (kategorier og varer).
+
+Cachen gemmer de færdige JSON svar, så et træf hverken rammer SQLite,
+kalder to_dict eller serialiserer igen. Nøglen indeholder request-URL'en og
+versionerne af de tabeller svaret afhænger af, så et svar aldrig genbruges
+efter en ændring - heller ikke hvis ændringen skete i en anden proces.
+Ændringer i denne proces fjerner desuden de berørte svar med det samme
+(write-through invalidering via on_commit), så hukommelsen frigives.
+
+Cachen er begrænset i både antal elementer og bytes og smider de mindst
+nyligt brugte elementer ud først (LRU). Med husstande deles cachen, men
+nøgler og afhængigheder indeholder husstanden, så en husstand aldrig får
+en andens svar og kun invaliderer sine egne.
+"""
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, make_response
+from backend.utils.tenancy import household_name
+from backend.utils.versioning import get_versions, on_commit
+
+
+class ReadCache:
+    """Trådsikker LRU cache med hit/miss tællere."""
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Hent et element og marker det som senest brugt."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, tables):
+        """Gem et element (bytes) sammen med de (husstand, tabel) par det afhænger af."""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+
+            self._entries[key] = (value, frozenset(tables))
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, tables):
+        """Fjern alle elementer der afhænger af et af de ændrede (husstand, tabel) par."""
+        with self._lock:
+            stale = [key for key, (_, deps) in self._entries.items() if deps & tables]
+            for key in stale:
+                value, _ = self._entries.pop(key)
+                self._bytes -= len(value)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """Tøm cachen."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Tællere til at måle cachens effekt."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': True,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+def init_cache(app):
+    """Opret læsecachen hvis READ_CACHE_ENABLED er sat."""
+    if not app.config.get('READ_CACHE_ENABLED', False):
+        app.extensions['read_cache'] = None
+        return None
+
+    cache = ReadCache(
+        max_entries=app.config.get('READ_CACHE_MAX_ENTRIES', 256),
+        max_bytes=app.config.get('READ_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+    )
+    app.extensions['read_cache'] = cache
+    on_commit(app, _invalidate)
+    return cache
+
+
+def _invalidate(tables):
+    """on_commit: fjern svar fra den aktuelle husstand der afhænger af tabellerne."""
+    cache = get_cache()
+    if cache is not None:
+        household = household_name()
+        cache.invalidate({(household, table) for table in tables})
+
+
+def get_cache():
+    """Hent læsecachen for den aktuelle app (None hvis slået fra)."""
+    return current_app.extensions.get('read_cache')
+
+
+def cache_stats():
+    """Hit/miss statistik for læsecachen."""
+    cache = get_cache()
+    return cache.stats() if cache is not None else {'enabled': False}
+
+
+def cached_response(*tables):
+    """
+    Decorator der cacher 200-svar fra et GET endpoint.
+
+    Args:
+        tables: Navne på de tabeller endpointet læser fra
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return f(*args, **kwargs)
+
+            household = household_name()
+            versions = get_versions(sorted(tables))
+            key = (household, request.full_path, tuple(sorted(versions.items())))
+
+            body = cache.get(key)
+            if body is not None:
+                response = make_response(body, 200)
+                response.mimetype = 'application/json'
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and response.mimetype == 'application/json':
+                cache.set(key, response.get_data(), {(household, table) for table in tables})
+                response.headers['X-Cache'] = 'MISS'
+            return response
+        return decorated_function
+    return decorator
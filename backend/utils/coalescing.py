@@ -0,0 +1,201 @@
+"""
+Sammenlægning af samtidige ens GET requests (single-flight).
+
+Når en husstand åbner appen på flere enheder på én gang, eller React Query
+henter igen når vinduet får fokus, kommer de samme GET requests næsten
+samtidigt. Endpoints dekoreret med coalesced lader den første request
+(lederen) køre route funktionen, mens de andre med samme nøgle venter på
+dens svar i stedet for at køre de samme queries og den samme serialisering.
+
+Nøglen er husstanden, request-URL'en (sti og query string) og versionerne
+af de tabeller endpointet læser fra, ligesom i læsecachen, så et svar
+aldrig deles på tværs af en ændring - heller ikke en ændring i en anden
+proces. Et færdigt 200-svar genbruges i COALESCING_TTL_SECONDS, så
+requests der kommer lige efter også slipper.
+
+Under ASGI venter følgerne på event loopet (ikke i en blokerende tråd), så
+lederens greenlet kan køre færdig.
+"""
+import asyncio
+import threading
+import time
+from functools import wraps
+from flask import current_app, request, make_response
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from backend.utils.tenancy import household_name
+from backend.utils.versioning import get_versions
+
+
+class _Flight:
+    """Ét igangværende eller nyligt færdigt kald."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None      # (status, body, mimetype) eller None hvis lederen fejlede
+        self.expires = None
+        self._waiters = []
+        self._lock = threading.Lock()
+
+    def finish(self, result, expires):
+        """Gem resultatet og væk alle der venter."""
+        with self._lock:
+            self.result = result
+            self.expires = expires
+            self.done.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def wait(self, timeout):
+        """Vent på lederen; True hvis den blev færdig inden for timeout."""
+        if not in_greenlet():
+            return self.done.wait(timeout)
+
+        # ASGI: vent på event loopet, så andre greenlets (og lederen) kører videre
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self.done.is_set():
+                return True
+            self._waiters.append((loop, future))
+        try:
+            await_only(asyncio.wait_for(future, timeout))
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    """Trådsikker tabel over igangværende kald med tællere."""
+
+    def __init__(self, ttl=1.0, wait_timeout=30.0):
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.joined = 0
+        self.reused = 0
+        self.timeouts = 0
+
+    def do(self, key, fn):
+        """
+        Kør fn() én gang for alle samtidige kald med samme nøgle.
+
+        fn skal returnere (status, body, mimetype). Kun 200-svar genbruges
+        efter lederen er færdig. Returnerer None hvis lederen fejlede eller
+        ikke blev færdig inden for wait_timeout; så må kalderen selv køre.
+        """
+        now = time.monotonic()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.done.is_set() and flight.expires <= now:
+                flight = None
+            if flight is None:
+                self._prune(now)
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                leader = False
+                if flight.done.is_set():
+                    self.reused += 1
+                else:
+                    self.joined += 1
+
+        if leader:
+            result = None
+            try:
+                result = fn()
+                return result
+            finally:
+                reusable = result is not None and result[0] == 200
+                flight.finish(result, time.monotonic() + self.ttl if reusable else now)
+                if not reusable:
+                    with self._lock:
+                        if self._flights.get(key) is flight:
+                            del self._flights[key]
+
+        if not flight.wait(self.wait_timeout):
+            with self._lock:
+                self.timeouts += 1
+            return None
+        return flight.result
+
+    def _prune(self, now):
+        """Fjern udløbne svar. Kaldes med låsen."""
+        expired = [key for key, flight in self._flights.items()
+                   if flight.done.is_set() and flight.expires <= now]
+        for key in expired:
+            del self._flights[key]
+
+    def stats(self):
+        """Tællere til at måle hvor mange requests der blev lagt sammen."""
+        with self._lock:
+            requests = self.leaders + self.joined + self.reused
+            return {
+                'enabled': True,
+                'in_flight': sum(1 for flight in self._flights.values() if not flight.done.is_set()),
+                'leaders': self.leaders,
+                'joined': self.joined,
+                'reused': self.reused,
+                'timeouts': self.timeouts,
+                'coalesced_ratio': round((self.joined + self.reused) / requests, 3) if requests else 0
+            }
+
+
+def init_coalescing(app):
+    """Opret single-flight tabellen hvis COALESCING_ENABLED er sat."""
+    if not app.config.get('COALESCING_ENABLED', False):
+        app.extensions['coalescing'] = None
+        return None
+
+    flights = SingleFlight(
+        ttl=app.config.get('COALESCING_TTL_SECONDS', 1.0),
+        wait_timeout=app.config.get('COALESCING_WAIT_SECONDS', 30.0)
+    )
+    app.extensions['coalescing'] = flights
+    return flights
+
+
+def coalescing_stats():
+    """Statistik for sammenlægning af requests."""
+    flights = current_app.extensions.get('coalescing')
+    return flights.stats() if flights is not None else {'enabled': False}
+
+
+def coalesced(*tables):
+    """
+    Decorator der lægger samtidige ens GET requests sammen.
+
+    Args:
+        tables: Navne på de tabeller endpointet læser fra
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            flights = current_app.extensions.get('coalescing')
+            if flights is None:
+                return f(*args, **kwargs)
+
+            versions = get_versions(sorted(tables))
+            key = (household_name(), request.full_path, tuple(sorted(versions.items())))
+
+            def run():
+                response = make_response(f(*args, **kwargs))
+                return response.status_code, response.get_data(), response.mimetype
+
+            result = flights.do(key, run)
+            if result is None:
+                return f(*args, **kwargs)
+            status, body, mimetype = result
+            response = make_response(body, status)
+            response.mimetype = mimetype
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,145 @@
+"""
+Komprimering af svar med gzip eller brotli (Content-Encoding).
+
+Et after_request hook komprimerer JSON og tekst svar på mindst
+COMPRESSION_MIN_SIZE bytes med den bedste kodning klienten accepterer
+(Accept-Encoding). brotli bruges kun hvis pakken er installeret
+(pip install huskeseddel[fast]); ellers gzip. Streamede svar (eksport og
+SSE) komprimeres ikke.
+
+Svar fra endpoints med conditional_get har en ETag, der er bygget af
+husstanden, request-URL'en og versionerne af de tabeller svaret afhænger
+af. Den komprimerede body gemmes derfor under (ETag, kodning), så gentagne
+læsninger af en uændret liste ikke komprimeres igen. Efter en ændring får
+svaret en ny ETag, og de gamle elementer forsvinder med LRU.
+
+Komprimerede svar får en svag ETag (W/"..."), da de ikke er byte-identiske
+med det ukomprimerede svar; conditional_get sammenligner svagt.
+"""
+import gzip
+import threading
+import time
+from flask import current_app, request
+from backend.utils.cache import ReadCache
+
+try:
+    import brotli
+except ImportError:  # brotli er valgfri
+    brotli = None
+
+
+class Compressor:
+    """Komprimerer svar og cacher komprimerede bodies. Trådsikker."""
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_level=5, mimetypes=(), cache=None):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_level = brotli_level
+        self.mimetypes = frozenset(mimetypes)
+        self.cache = cache
+        # Foretrukne kodning først; Accept-Encoding's q-værdier vinder
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def compress(self, data, encoding):
+        """Komprimer data med den angivne kodning."""
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_level)
+        # mtime=0 giver samme bytes for samme data
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def compressed_body(self, data, encoding, etag):
+        """Komprimeret body, fra cachen hvis svaret har en stærk ETag."""
+        key = (etag, encoding) if etag is not None and self.cache is not None else None
+        body = self.cache.get(key) if key is not None else None
+        if body is None:
+            start = time.process_time()
+            body = self.compress(data, encoding)
+            seconds = time.process_time() - start
+            if key is not None:
+                self.cache.set(key, body, ())
+            with self._lock:
+                self.seconds += seconds
+
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += len(data)
+            self.bytes_out += len(body)
+        return body
+
+    def stats(self):
+        """Tællere til at måle besparelsen og CPU forbruget."""
+        with self._lock:
+            stats = {
+                'enabled': True,
+                'encodings': list(self.encodings),
+                'responses': self.responses,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else 0,
+                'cpu_seconds': round(self.seconds, 3)
+            }
+        stats['cache'] = self.cache.stats() if self.cache is not None else {'enabled': False}
+        return stats
+
+
+def init_compression(app):
+    """Registrer komprimering af svar hvis COMPRESSION_ENABLED er sat."""
+    if not app.config.get('COMPRESSION_ENABLED', False):
+        app.extensions['compression'] = None
+        return None
+
+    cache = None
+    if app.config.get('COMPRESSION_CACHE_MAX_ENTRIES', 256) > 0:
+        cache = ReadCache(
+            max_entries=app.config.get('COMPRESSION_CACHE_MAX_ENTRIES', 256),
+            max_bytes=app.config.get('COMPRESSION_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        )
+    compressor = Compressor(
+        min_size=app.config.get('COMPRESSION_MIN_SIZE', 1024),
+        gzip_level=app.config.get('COMPRESSION_GZIP_LEVEL', 6),
+        brotli_level=app.config.get('COMPRESSION_BROTLI_LEVEL', 5),
+        mimetypes=app.config.get('COMPRESSION_MIMETYPES', ('application/json',)),
+        cache=cache
+    )
+    app.extensions['compression'] = compressor
+    app.after_request(_compress_response)
+    return compressor
+
+
+def compression_stats():
+    """Statistik for komprimering af svar."""
+    compressor = current_app.extensions.get('compression')
+    return compressor.stats() if compressor is not None else {'enabled': False}
+
+
+def _compress_response(response):
+    compressor = current_app.extensions['compression']
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in compressor.mimetypes):
+        return response
+
+    # Svaret afhænger af Accept-Encoding, også når det ikke komprimeres
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(compressor.encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < compressor.min_size:
+        return response
+
+    etag, weak = response.get_etag()
+    body = compressor.compressed_body(data, encoding, None if weak else etag)
+    if len(body) >= len(data):
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,334 @@
+"""
+Fan-out af ændringer på indkøbslisten til Server-Sent Events klienter.
+
+Routes publicerer kompakte events efter commit (element tilføjet, status
+ændret, fjernet). publish_event skriver eventet i tabellen liste_event, og
+brokeren i hver worker-proces læser nye rækker derfra og lægger dem i
+abonnenternes køer. Dermed ser en klient ændringer fra alle workers, ikke
+kun fra den proces den er forbundet til:
+
+- Den proces der publicerer, leverer straks til sine egne abonnenter.
+- Andre processer finder eventet inden for EVENT_POLL_INTERVAL sekunder.
+  Hver broker har én baggrundstråd der læser tabellen, og kun mens den har
+  abonnenter, så en proces uden åbne streams ikke laver noget.
+
+Rækkens id er SSE event ID'et, så en klient der genforbinder med sit
+Last-Event-ID - også til en anden worker - får de events den har misset.
+Er ID'et ukendt eller ældre end de EVENT_HISTORY_SIZE events tabellen
+beholder, starter streamen med et 'reset' event (hent listen igen).
+
+Hver abonnent har en begrænset kø. Hvis en klient er så langsom at køen
+løber fuld, lukkes dens stream; klienten genforbinder og indhenter det
+manglende. Med husstande har hver husstand sin egen broker og tabel.
+
+I den trådede server (gunicorn gthread) optager hver stream en tråd, så
+højst EVENT_MAX_STREAMS streams er åbne per proces; resten får 503 med
+Retry-After, så der altid er tråde tilbage til resten af API'et.
+
+Under ASGI (backend/asgi.py) venter en stream på event loopet i stedet for
+i en tråd; AsyncSubscription vækkes når brokeren lægger et event i køen.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+from flask import current_app
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SQLAlchemyError
+from backend.config.config import db
+from backend.config.sqlite import init_sqlite_tuning, init_fork_safety
+from backend.utils.tenancy import household_extension
+
+logger = logging.getLogger('backend.events')
+
+
+class StreamClosed(Exception):
+    """Abonnementet er lukket (kø løb fuld eller brokeren er for mange)."""
+
+
+class Subscription:
+    """Én SSE klients kø af events."""
+
+    def __init__(self, broker, queue_size):
+        self.broker = broker
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def get(self, timeout):
+        """Vent på næste event; returnerer None ved timeout (til keepalive)."""
+        if self.closed:
+            raise StreamClosed()
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if item is None:
+            raise StreamClosed()
+        return item
+
+    def close(self):
+        """Afmeld fra brokeren."""
+        self.broker.unsubscribe(self)
+
+    def notify(self):
+        """Kaldes af brokeren efter et element er lagt i køen."""
+
+
+class AsyncSubscription(Subscription):
+    """
+    Abonnement der ventes på med await fra en asyncio event loop.
+
+    Brokeren kan publicere fra en hvilken som helst tråd; notify vækker
+    ventende get med call_soon_threadsafe.
+    """
+
+    def __init__(self, broker, queue_size):
+        super().__init__(broker, queue_size)
+        self.loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+
+    async def get(self, timeout):
+        """Vent på næste event; returnerer None ved timeout (til keepalive)."""
+        while True:
+            if self.closed:
+                raise StreamClosed()
+            self._ready.clear()
+            try:
+                item = self.queue.get_nowait()
+                break
+            except queue.Empty:
+                pass
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if item is None:
+            raise StreamClosed()
+        return item
+
+    def close(self):
+        """Afmeld fra brokeren og væk en ventende get."""
+        super().close()
+        self.notify()
+
+    def notify(self):
+        self.loop.call_soon_threadsafe(self._ready.set)
+
+
+class EventBroker:
+    """
+    Fan-out af events fra tabellen liste_event til denne proces' abonnenter.
+
+    engine skal være en synkron engine til samme database som appen; den
+    bruges af baggrundstråden, og til replay når en klient forbinder. Med en
+    in-memory database (tests) er der ingen andre processer, og publish
+    leverer direkte i stedet for at starte en tråd.
+    """
+
+    def __init__(self, engine, history_size=1000, max_subscribers=500, queue_size=100, poll_interval=0.25):
+        self.engine = engine
+        self.history_size = history_size
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.poll_interval = None if engine.url.database in (None, '', ':memory:') else poll_interval
+        self._subscribers = set()
+        # _poll_lock tages altid før _lock
+        self._poll_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._last_id = None    # Seneste række leveret til abonnenterne; None uden abonnenter
+        self._thread = None
+        self._wakeup = threading.Event()
+
+    def published(self):
+        """Kaldes efter et event er skrevet, så egne abonnenter får det med det samme."""
+        if self.poll_interval is None:
+            self.poll()
+        else:
+            self._wakeup.set()
+
+    def poll(self):
+        """Læs nye rækker fra liste_event og læg dem i abonnenternes køer."""
+        with self._poll_lock:
+            if self._last_id is None:
+                return
+            with self.engine.connect() as conn:
+                rows = conn.execute(_SELECT_EVENTS, {'id': self._last_id}).all()
+            if not rows:
+                return
+            self._last_id = rows[-1][0]
+
+            with self._lock:
+                for subscription in list(self._subscribers):
+                    try:
+                        for row_id, event_type, data in rows:
+                            subscription.queue.put_nowait((str(row_id), event_type, data))
+                    except queue.Full:
+                        self._drop(subscription)
+                    else:
+                        subscription.notify()
+
+    def subscribe(self, last_event_id=None, subscription_class=Subscription):
+        """
+        Opret et abonnement, eventuelt med replay fra last_event_id.
+
+        Hvis last_event_id er ukendt eller ældre end tabellens events,
+        starter streamen med et 'reset' event, så klienten henter listen igen.
+        subscription_class er AsyncSubscription for streams under ASGI.
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise StreamClosed()
+
+        # Replay og tilmelding sker under _poll_lock, så intet event hverken
+        # mistes eller sendes to gange mellem de to
+        with self._poll_lock:
+            with self.engine.connect() as conn:
+                if self._last_id is None:
+                    self._last_id = conn.execute(_MAX_EVENT_ID).scalar() or 0
+                replay = self._replay(conn, last_event_id) if last_event_id else []
+
+            with self._lock:
+                if len(self._subscribers) >= self.max_subscribers:
+                    raise StreamClosed()
+                subscription = subscription_class(self, self.queue_size + len(replay))
+                for event in replay:
+                    subscription.queue.put_nowait(event)
+                self._subscribers.add(subscription)
+                if self.poll_interval is not None and self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='event-broker', daemon=True)
+                    self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Fjern et abonnement."""
+        with self._lock:
+            self._subscribers.discard(subscription)
+            subscription.closed = True
+
+    def subscriber_count(self):
+        """Antal aktive abonnenter."""
+        with self._lock:
+            return len(self._subscribers)
+
+    def _run(self):
+        """Baggrundstråd: læs tabellen hvert poll_interval sekund så længe der er abonnenter."""
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self._poll_lock, self._lock:
+                if not self._subscribers:
+                    # Næste abonnent starter en ny tråd fra tabellens seneste række
+                    self._thread = None
+                    self._last_id = None
+                    return
+            try:
+                self.poll()
+            except SQLAlchemyError as e:
+                logger.warning(f'Kunne ikke læse liste_event: {e}')
+
+    def _replay(self, conn, last_event_id):
+        """Events efter last_event_id, eller et reset event hvis det ikke kan lade sig gøre."""
+        try:
+            number = int(last_event_id)
+        except ValueError:
+            number = -1
+        oldest = conn.execute(_MIN_EVENT_ID).scalar()
+
+        if number < 0 or number > self._last_id or (oldest is not None and number < oldest - 1):
+            return [(str(self._last_id), 'reset', '{}')]
+        rows = conn.execute(_SELECT_EVENTS_UNTIL, {'id': number, 'last': self._last_id})
+        return [(str(row_id), event_type, data) for row_id, event_type, data in rows]
+
+    def _drop(self, subscription):
+        """Luk en abonnent hvis kø er fuld. Kaldes med låsen holdt."""
+        self._subscribers.discard(subscription)
+        subscription.closed = True
+        try:
+            subscription.queue.get_nowait()
+        except queue.Empty:
+            pass
+        subscription.queue.put_nowait(None)
+        subscription.notify()
+
+
+_INSERT_EVENT = text('INSERT INTO liste_event (type, data, oprettet) VALUES (:type, :data, CURRENT_TIMESTAMP)')
+_PRUNE_EVENTS = text('DELETE FROM liste_event WHERE id <= :id')
+_MAX_EVENT_ID = text('SELECT MAX(id) FROM liste_event')
+_MIN_EVENT_ID = text('SELECT MIN(id) FROM liste_event')
+_SELECT_EVENTS = text('SELECT id, type, data FROM liste_event WHERE id > :id ORDER BY id')
+_SELECT_EVENTS_UNTIL = text('SELECT id, type, data FROM liste_event WHERE id > :id AND id <= :last ORDER BY id')
+
+# Gamle events slettes ved hvert PRUNE_EVERY'te event
+PRUNE_EVERY = 100
+
+
+def _sync_engine(app, engine):
+    """Engine som brokerens tråd kan bruge: under ASGI en pysqlite engine til samme fil."""
+    if engine.dialect.driver != 'aiosqlite':
+        return engine
+    sync_engine = create_engine(engine.url.set(drivername='sqlite'))
+    init_sqlite_tuning(app, sync_engine)
+    init_fork_safety(sync_engine)
+    return sync_engine
+
+
+def _create_broker(app, engine):
+    return EventBroker(
+        _sync_engine(app, engine),
+        history_size=app.config.get('EVENT_HISTORY_SIZE', 1000),
+        max_subscribers=app.config.get('EVENT_MAX_SUBSCRIBERS', 500),
+        queue_size=app.config.get('EVENT_QUEUE_SIZE', 100),
+        poll_interval=app.config.get('EVENT_POLL_INTERVAL', 0.25)
+    )
+
+
+def init_events(app):
+    """Opret event brokeren til live opdateringer af indkøbslisten."""
+    with app.app_context():
+        broker = _create_broker(app, db.engine)
+    app.extensions['event_broker'] = broker
+    # Fælles for alle husstande, da de deler processens tråde
+    max_streams = app.config.get('EVENT_MAX_STREAMS')
+    app.extensions['event_streams'] = threading.BoundedSemaphore(max_streams) if max_streams else None
+    return broker
+
+
+def get_broker():
+    """Hent event brokeren for den aktuelle app (og husstand)."""
+    return household_extension(
+        'event_broker', lambda: _create_broker(current_app._get_current_object(), db.engine)
+    )
+
+
+def publish_event(event_type, data):
+    """
+    Publicer et event til klienter i alle processer. Kaldes efter commit.
+
+    Eventet skrives i sin egen transaktion; fejler det, logges det, og
+    klienterne henter listen igen næste gang de genforbinder.
+    """
+    broker = get_broker()
+    try:
+        with db.engine.begin() as conn:
+            event_id = conn.execute(
+                _INSERT_EVENT, {'type': event_type, 'data': json.dumps(data, default=str)}
+            ).lastrowid
+            if event_id % PRUNE_EVERY == 0:
+                conn.execute(_PRUNE_EVENTS, {'id': event_id - broker.history_size})
+    except SQLAlchemyError as e:
+        logger.warning(f'Kunne ikke publicere {event_type}: {e}')
+        return
+    broker.published()
+
+
+def format_unavailable(retry_seconds):
+    """Body til et 503 svar på en stream: bed klienten vente retry_seconds."""
+    data = json.dumps({'error': 'For mange åbne forbindelser, prøv igen senere'}, ensure_ascii=False)
+    return f'retry: {retry_seconds * 1000}\nevent: error\ndata: {data}\n\n'
+
+
+def format_sse(event):
+    """Formater et (id, type, data) event som en SSE besked."""
+    event_id, event_type, data = event
+    return f'id: {event_id}\nevent: {event_type}\ndata: {data}\n\n'
@@ -0,0 +1,250 @@
+"""
+Instrumentering af requests og SQL: Server-Timing, Prometheus metrics og
+en log over langsomme queries.
+
+SQLAlchemy events (before/after_cursor_execute) måler hvert statement på
+engine. Under en request lægges antal queries og SQL tid sammen i flask.g,
+og after_request sætter en Server-Timing header:
+
+    Server-Timing: app;dur=12.41, db;dur=3.02;desc="4 queries"
+
+Samtidig registreres requesten i et in-process register med en latency
+histogram per endpoint (URL reglen, ikke den konkrete URL, så antallet af
+serier er begrænset). GET /api/metrics returnerer registret i Prometheus'
+tekstformat. Registret lever i processen, så med flere gunicorn workers
+skal hver worker scrapes for sig (eller tallene summeres i Prometheus).
+
+Statements der tager mindst SLOW_QUERY_MS logges med statement, parametre
+og varighed på loggeren 'backend.slow_query'.
+"""
+import logging
+import threading
+import time
+from flask import current_app, g, request, has_app_context
+from sqlalchemy import event
+
+slow_query_logger = logging.getLogger('backend.slow_query')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Længste repr af parametre i slow query loggen (executemany kan være stor)
+MAX_PARAMS_LENGTH = 1000
+
+_QUERY_START = 'metrics_query_start'
+
+
+class Histogram:
+    """Kumulativ histogram i Prometheus' forstand (le buckets, sum og count)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Trådsikkert register over request- og query-metrics for processen."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._latency = {}          # (method, endpoint) -> Histogram
+        self._requests = {}         # (method, endpoint, status) -> antal
+        self._db_queries = {}       # (method, endpoint) -> antal queries
+        self._db_seconds = {}       # (method, endpoint) -> SQL tid
+        self._slow_queries = 0
+        self._queries = 0
+        self._query_seconds = 0.0
+
+    def observe_request(self, method, endpoint, status, seconds, queries, db_seconds):
+        key = (method, endpoint)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            status_key = (method, endpoint, str(status))
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+            self._db_queries[key] = self._db_queries.get(key, 0) + queries
+            self._db_seconds[key] = self._db_seconds.get(key, 0.0) + db_seconds
+
+    def observe_query(self, seconds, slow):
+        with self._lock:
+            self._queries += 1
+            self._query_seconds += seconds
+            if slow:
+                self._slow_queries += 1
+
+    def render(self):
+        """Registret i Prometheus' tekstformat (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            lines += [
+                '# HELP http_request_duration_seconds Request latency per endpoint.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for (method, endpoint), histogram in sorted(self._latency.items()):
+                labels = _labels(method=method, endpoint=endpoint)
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(
+                        f'http_request_duration_seconds_bucket{_labels(method=method, endpoint=endpoint, le=_number(bound))} {count}'
+                    )
+                lines.append(
+                    f'http_request_duration_seconds_bucket{_labels(method=method, endpoint=endpoint, le="+Inf")} {histogram.count}'
+                )
+                lines.append(f'http_request_duration_seconds_sum{labels} {_number(histogram.sum)}')
+                lines.append(f'http_request_duration_seconds_count{labels} {histogram.count}')
+
+            lines += [
+                '# HELP http_requests_total Requests per endpoint and status code.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (method, endpoint, status), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{_labels(method=method, endpoint=endpoint, status=status)} {count}')
+
+            lines += [
+                '# HELP http_request_db_queries_total SQL statements executed by requests per endpoint.',
+                '# TYPE http_request_db_queries_total counter',
+            ]
+            for (method, endpoint), count in sorted(self._db_queries.items()):
+                lines.append(f'http_request_db_queries_total{_labels(method=method, endpoint=endpoint)} {count}')
+
+            lines += [
+                '# HELP http_request_db_seconds_total Time spent in SQL by requests per endpoint.',
+                '# TYPE http_request_db_seconds_total counter',
+            ]
+            for (method, endpoint), seconds in sorted(self._db_seconds.items()):
+                lines.append(f'http_request_db_seconds_total{_labels(method=method, endpoint=endpoint)} {_number(seconds)}')
+
+            lines += [
+                '# HELP db_queries_total SQL statements executed by the process.',
+                '# TYPE db_queries_total counter',
+                f'db_queries_total {self._queries}',
+                '# HELP db_query_seconds_total Time spent in SQL by the process.',
+                '# TYPE db_query_seconds_total counter',
+                f'db_query_seconds_total {_number(self._query_seconds)}',
+                '# HELP db_slow_queries_total SQL statements slower than SLOW_QUERY_MS.',
+                '# TYPE db_slow_queries_total counter',
+                f'db_slow_queries_total {self._slow_queries}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _format_params(parameters):
+    text = repr(parameters)
+    if len(text) > MAX_PARAMS_LENGTH:
+        text = text[:MAX_PARAMS_LENGTH] + '...'
+    return text
+
+
+def _init_query_events(app, engine, registry):
+    """Registrer cursor events der måler hvert statement på engine."""
+    slow_ms = app.config.get('SLOW_QUERY_MS')
+    slow_seconds = slow_ms / 1000 if slow_ms else None
+    log_params = app.config.get('SLOW_QUERY_LOG_PARAMS', True)
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_QUERY_START, []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info[_QUERY_START].pop()
+        slow = slow_seconds is not None and seconds >= slow_seconds
+        registry.observe_query(seconds, slow)
+
+        if has_app_context() and 'metrics_start' in g:
+            g.metrics_queries += 1
+            g.metrics_db_seconds += seconds
+
+        if slow:
+            slow_query_logger.warning(
+                'Langsom query (%.1f ms): %s | parametre: %s',
+                seconds * 1000, ' '.join(statement.split()),
+                _format_params(parameters) if log_params else '<skjult>'
+            )
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(exception_context):
+        # after_cursor_execute kaldes ikke når statementet fejler
+        connection = exception_context.connection
+        if connection is not None and connection.info.get(_QUERY_START):
+            connection.info[_QUERY_START].pop()
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_db_seconds = 0.0
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    seconds = time.perf_counter() - start
+    queries = g.metrics_queries
+    db_seconds = g.metrics_db_seconds
+
+    # URL reglen (f.eks. /api/varer/<int:vare_id>) i stedet for den konkrete URL
+    endpoint = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    current_app.extensions['metrics'].observe_request(
+        request.method, endpoint, response.status_code, seconds, queries, db_seconds
+    )
+
+    if current_app.config.get('SERVER_TIMING_ENABLED', True):
+        response.headers.add(
+            'Server-Timing',
+            f'app;dur={seconds * 1000:.2f}, db;dur={db_seconds * 1000:.2f};desc="{queries} queries"'
+        )
+    return response
+
+
+def init_metrics(app, engine):
+    """
+    Opret metrics registret og registrer SQL events og request hooks.
+
+    Gør ingenting hvis METRICS_ENABLED er slået fra.
+    """
+    if not app.config.get('METRICS_ENABLED', False):
+        app.extensions['metrics'] = None
+        return None
+
+    registry = MetricsRegistry(app.config.get('METRICS_BUCKETS') or DEFAULT_BUCKETS)
+    app.extensions['metrics'] = registry
+    _init_query_events(app, engine, registry)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    return registry
+
+
+def instrument_engine(app, engine):
+    """Mål statements på endnu en engine (f.eks. en husstands database)."""
+    registry = app.extensions.get('metrics')
+    if registry is not None:
+        _init_query_events(app, engine, registry)
+
+
+def get_metrics():
+    """Hent metrics registret for den aktuelle app (None hvis slået fra)."""
+    return current_app.extensions.get('metrics')
@@ -0,0 +1,134 @@
+"""
+Keyset (cursor) paginering og feltprojektion for liste-endpoints.
+
+Paginering er opt-in: et endpoint returnerer kun en side når `cursor`
+parameteren er med i requesten (tom for første side). `limit` alene
+giver også første side, så en grænse aldrig ignoreres stille. Svaret har formen
+{'items': [...], 'next_cursor': '...'} hvor next_cursor er None på sidste side.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import DateTime, literal, tuple_
+from backend.utils.validation import ValidationError
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def pagination_requested(by_limit=True):
+    """
+    Afgør om klienten har bedt om en pagineret side.
+
+    Args:
+        by_limit: Om `limit` uden `cursor` også tæller som første side. Slås
+                  fra for endpoints hvor `limit` i forvejen betyder noget
+                  uden paginering, f.eks. historikken.
+    """
+    return 'cursor' in request.args or (by_limit and 'limit' in request.args)
+
+
+def get_limit(default=DEFAULT_PAGE_SIZE):
+    """Læs `limit` fra requesten og begræns den til MAX_PAGE_SIZE."""
+    limit = request.args.get('limit', default, type=int)
+    if limit is None or limit < 1:
+        raise ValidationError('limit skal være et positivt heltal')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def get_fields(allowed):
+    """
+    Læs `fields` (kommasepareret) fra requesten.
+
+    Returnerer None hvis alle felter ønskes, ellers en liste af feltnavne.
+    """
+    raw = request.args.get('fields', '').strip()
+    if not raw:
+        return None
+
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValidationError(f'Ukendte felter: {", ".join(unknown)}')
+    return fields
+
+
+def encode_cursor(values):
+    """Pak sorteringsnøglen for sidste række ind i en opak cursor streng."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Pak en cursor ud til værdier med samme typer som sorteringskolonnerne."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('forkert antal værdier')
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+            for column, value in zip(columns, values)
+        ]
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise ValidationError('Ugyldig cursor')
+
+
+def paginate(query, columns, key, descending=False):
+    """
+    Hent én side af en query med keyset paginering.
+
+    Args:
+        query: SQLAlchemy query (eventuel eksisterende sortering erstattes)
+        columns: Sorteringskolonner, f.eks. (Vare.navn, Vare.id)
+        key: Funktion der returnerer sorteringsværdierne for en række
+        descending: Sorter faldende i stedet for stigende
+
+    Returns:
+        tuple: (rækker, next_cursor)
+    """
+    limit = get_limit()
+    cursor = request.args.get('cursor', '')
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        bound = tuple_(*[literal(value, column.type) for column, value in zip(columns, values)])
+        if descending:
+            query = query.filter(tuple_(*columns) < bound)
+        else:
+            query = query.filter(tuple_(*columns) > bound)
+
+    order_by = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(None).order_by(*order_by).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(key(rows[limit - 1])) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def paginate_with(fetch, columns, key):
+    """
+    Hent én side med keyset paginering, hvor fetch selv bygger queryen.
+
+    Til queries hvor grænsen fra cursoren skal bruges flere steder, f.eks.
+    i hver del af en UNION ALL, og sorteringen derfor ikke kan lægges på
+    udefra som i paginate.
+
+    Args:
+        fetch: Funktion (limit, values) -> rækker, hvor values er
+               sorteringsværdierne fra cursoren eller None på første side
+        columns: Sorteringskolonnerne (bruges til at afkode cursoren)
+        key: Funktion der returnerer sorteringsværdierne for en række
+
+    Returns:
+        tuple: (rækker, next_cursor)
+    """
+    limit = get_limit()
+    cursor = request.args.get('cursor', '')
+    values = decode_cursor(cursor, columns) if cursor else None
+
+    rows = fetch(limit + 1, values)
+    next_cursor = encode_cursor(key(rows[limit - 1])) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,152 @@
+"""
+Fuldtekstsøgning i vareregisteret med SQLite FTS5.
+
+Indekset er en FTS5 tabel med ekstern indhold (content='vare'), som holdes
+synkroniseret af triggers på vare tabellen. Tokenizeren er unicode61 med
+remove_diacritics 0, så Æ/Ø/Å case-foldes til æ/ø/å uden at blive reduceret
+til a/o (som ville give falske træffere på dansk).
+
+Hvis SQLite er bygget uden FTS5, eller SEARCH_USE_FTS er slået fra, falder
+Vare.search tilbage til LIKE søgning.
+"""
+import re
+from flask import current_app
+from sqlalchemy import Float, Integer, text
+from sqlalchemy.exc import OperationalError
+from backend.config.config import db
+
+FTS_TABLE = 'vare_fts'
+
+# Vægtning af kolonner i bm25: et træf i navn tæller mere end i noten
+NAVN_WEIGHT = 10.0
+NOTE_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_CREATE_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        navn, note_vareregister,
+        content='vare', content_rowid='id',
+        tokenize="unicode61 remove_diacritics 0"
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON vare BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, navn, note_vareregister)
+        VALUES (new.id, new.navn, new.note_vareregister);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON vare BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, navn, note_vareregister)
+        VALUES ('delete', old.id, old.navn, old.note_vareregister);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF navn, note_vareregister ON vare BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, navn, note_vareregister)
+        VALUES ('delete', old.id, old.navn, old.note_vareregister);
+        INSERT INTO {FTS_TABLE}(rowid, navn, note_vareregister)
+        VALUES (new.id, new.navn, new.note_vareregister);
+    END
+    """,
+]
+
+
+def _state():
+    """Cache for om indekset findes, per database URI."""
+    return current_app.extensions.setdefault('vare_search', {})
+
+
+def create_search_index():
+    """
+    Opret FTS5 tabellen og triggers, og byg indekset fra vare tabellen.
+
+    Indekset bygges kun hvis tabellen eller en af dens triggers manglede;
+    ellers holder triggerne det allerede synkroniseret, og en genopbygning
+    ved hver opstart ville koste tid i forhold til antal varer.
+
+    Returnerer True hvis indekset er tilgængeligt, False hvis SQLite
+    mangler FTS5 (eller databasen ikke er SQLite).
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    try:
+        with db.engine.begin() as conn:
+            existing = set(conn.execute(
+                text("SELECT name FROM sqlite_master WHERE name IN (:table, :ai, :ad, :au)"),
+                {'table': FTS_TABLE, 'ai': f'{FTS_TABLE}_ai', 'ad': f'{FTS_TABLE}_ad', 'au': f'{FTS_TABLE}_au'}
+            ).scalars())
+            for statement in _CREATE_STATEMENTS:
+                conn.execute(text(statement))
+            if len(existing) < 4:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError as e:
+        current_app.logger.warning(f"FTS5 ikke tilgængelig, bruger LIKE søgning: {e}")
+        _state()[str(db.engine.url)] = False
+        return False
+
+    _state()[str(db.engine.url)] = True
+    return True
+
+
+def drop_search_index():
+    """Slet FTS5 tabellen og dens triggers (bruges før drop_all)."""
+    if db.engine.dialect.name != 'sqlite':
+        return
+
+    with db.engine.begin() as conn:
+        for suffix in ('ai', 'ad', 'au'):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+    _state().pop(str(db.engine.url), None)
+
+
+def search_index_available():
+    """Afgør om FTS5 indekset kan bruges til søgning."""
+    if not current_app.config.get('SEARCH_USE_FTS', True):
+        return False
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    state = _state()
+    key = str(db.engine.url)
+    if key not in state:
+        row = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        state[key] = row is not None
+    return state[key]
+
+
+def build_match_expression(query):
+    """
+    Byg et FTS5 MATCH udtryk med præfikssøgning for hvert ord.
+
+    'hakket okse' bliver til '"hakket"* AND "okse"*'. Returnerer None hvis
+    søgeteksten ikke indeholder nogen ord.
+    """
+    tokens = _TOKEN_RE.findall(query.casefold())
+    if not tokens:
+        return None
+    return ' AND '.join(f'"{token}"*' for token in tokens)
+
+
+def ranked_matches(query):
+    """
+    Subquery med (rowid, rank) for varer der matcher søgeteksten.
+
+    Lavere rank er bedre (bm25). Returnerer None hvis FTS5 ikke kan bruges,
+    så kalderen skal falde tilbage til LIKE.
+    """
+    match = build_match_expression(query)
+    if match is None or not search_index_available():
+        return None
+
+    return text(
+        f"SELECT rowid, bm25({FTS_TABLE}, {NAVN_WEIGHT}, {NOTE_WEIGHT}) AS rank "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    ).bindparams(match=match).columns(rowid=Integer, rank=Float).subquery('vare_fts_match')
@@ -0,0 +1,144 @@
+"""
+Hurtig serialisering af store lister direkte fra rækker.
+
+Liste-endpoints henter kolonner som tuples (Core rækker) i stedet for ORM
+objekter, så der ikke oprettes et objekt med identity map og lazy-load
+relationer per række. Datoer formateres af SQLite (iso_datetime), og
+kategorinavne slås op i et dictionary der kun genindlæses når kategori
+tabellen har fået en ny version. Resultatet er de samme dictionaries som
+to_dict() returnerer.
+
+FastJSONProvider erstatter Flasks JSON provider: med orjson installeret
+(pip install huskeseddel[fast]) bruges den til alle jsonify svar, ellers
+standardbibliotekets json uden sortering af nøgler og uden \\u-escaping.
+"""
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import String, case, func, select, type_coerce
+from backend.config.config import db
+from backend.utils.tenancy import household_extension
+
+try:
+    import orjson
+except ImportError:  # orjson er valgfri
+    orjson = None
+
+
+def iso_datetime(column):
+    """
+    Dato som ISO tekst direkte fra SQL, identisk med datetime.isoformat().
+
+    SQLite gemmer DateTime som 'YYYY-MM-DD HH:MM:SS.ffffff'; isoformat()
+    bruger 'T' som separator og udelader mikrosekunder når de er 0.
+    """
+    text = type_coerce(column, String)
+    return case(
+        (func.substr(text, 21) == '000000', func.replace(func.substr(text, 1, 19), ' ', 'T')),
+        else_=func.replace(text, ' ', 'T')
+    )
+
+
+def kategori_names():
+    """
+    {kategori_id: navn} for alle kategorier.
+
+    Genbruges mellem requests indtil kategori tabellen ændres (data_version).
+    Med husstande har hver husstand sit eget opslag.
+    """
+    # Importeres her, da modellerne selv importerer iso_datetime fra modulet
+    from backend.models.kategori import Kategori
+    from backend.utils.versioning import get_versions
+
+    version = get_versions(['kategori'])['kategori']
+    holder = household_extension('kategori_names', dict)
+    cached = holder.get('cached')
+    if cached is None or cached[0] != version:
+        cached = (version, dict(db.session.execute(select(Kategori.id, Kategori.navn)).all()))
+        holder['cached'] = cached
+    return cached[1]
+
+
+def _project(items, fields):
+    if fields is None:
+        return items
+    return [{field: item[field] for field in fields} for item in items]
+
+
+def serialize_varer(rows, fields=None):
+    """
+    Byg vare dictionaries fra rækker fra Vare.listing_rows_query.
+
+    Rækkerne er (id, navn, kategori_id, note_vareregister, oprettelsesdato,
+    paa_liste); kategori_navn slås op i kategori_names().
+    """
+    names = kategori_names() if fields is None or 'kategori_navn' in fields else {}
+    items = [
+        {
+            'id': vare_id,
+            'navn': navn,
+            'kategori_id': kategori_id,
+            'kategori_navn': names.get(kategori_id),
+            'note_vareregister': note,
+            'oprettelsesdato': oprettelsesdato,
+            'paa_liste': bool(paa_liste)
+        }
+        for vare_id, navn, kategori_id, note, oprettelsesdato, paa_liste in rows
+    ]
+    return _project(items, fields)
+
+
+def serialize_elementer(rows, fields=None):
+    """
+    Byg element dictionaries fra rækker fra IndkoebslisteElement.listing_rows_query.
+
+    Rækkerne er (id, vare_id, note_liste, tilfoejelsesdato, status,
+    vare_navn, kategori_id); kategori_navn slås op i kategori_names().
+    """
+    names = kategori_names() if fields is None or 'kategori_navn' in fields else {}
+    items = [
+        {
+            'id': element_id,
+            'vare_id': vare_id,
+            'note_liste': note,
+            'tilfoejelsesdato': tilfoejelsesdato,
+            'status': status,
+            'vare_navn': vare_navn,
+            'kategori_navn': names.get(kategori_id)
+        }
+        for element_id, vare_id, note, tilfoejelsesdato, status, vare_navn, kategori_id in rows
+    ]
+    return _project(items, fields)
+
+
+# Datoer sendes videre til default, så de formateres som med Flasks provider
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson is not None else 0
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider der bruger orjson hvis det er installeret."""
+
+    sort_keys = False
+    ensure_ascii = False
+
+    def __init__(self, app, use_orjson=True):
+        super().__init__(app)
+        self.use_orjson = use_orjson and orjson is not None
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.dumps(obj, default=self.default, option=_ORJSON_OPTIONS).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # orjson giver bytes; undgå en omvej over str
+        body = orjson.dumps(obj, default=self.default, option=_ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Installer FastJSONProvider medmindre JSON_FAST_PROVIDER er slået fra."""
+    if app.config.get('JSON_FAST_PROVIDER', True):
+        app.json = FastJSONProvider(app, use_orjson=app.config.get('JSON_USE_ORJSON', True))
+    return app.json
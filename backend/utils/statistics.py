@@ -0,0 +1,207 @@
+"""
+Statistik over kategorier og indkøbslisten.
+
+Tællerne i kategori_statistik (antal varer, aktive og købte elementer per
+kategori) vedligeholdes inkrementelt af SQLite triggers på kategori, vare,
+indkoebsliste_element og indkoebsliste_arkiv, på samme måde som søgeindekset
+i search.py. Triggers fanger også bulk INSERT/UPDATE/DELETE, så tællerne
+altid følger data. Arkiverede elementer tæller med som købte, så en
+arkivering (og en flytning tilbage) ikke ændrer tællerne.
+
+Dermed er både /api/kategorier og /api/indkoebsliste/stats O(kategorier)
+og kræver én forespørgsel, uanset hvor mange varer og hvor lang historik
+der er.
+"""
+from sqlalchemy import func, text
+from backend.config.config import db
+from backend.models.kategori import Kategori
+from backend.models.kategori_statistik import KategoriStatistik
+from backend.utils.triggers import install_triggers
+
+TRIGGER_PREFIX = 'kategori_statistik'
+
+_ENSURE_ROW = """
+    INSERT OR IGNORE INTO kategori_statistik(kategori_id, antal_varer, aktive_varer, koebte_varer)
+    VALUES ({kategori_id}, 0, 0, 0);
+"""
+
+_ELEMENT_DELTA = """
+    UPDATE kategori_statistik SET
+        aktive_varer = aktive_varer {op} ({row}.status = 'aktiv'),
+        koebte_varer = koebte_varer {op} ({row}.status = 'købt')
+    WHERE kategori_id = (SELECT kategori_id FROM vare WHERE id = {row}.vare_id);
+"""
+
+_ARKIV_DELTA = """
+    UPDATE kategori_statistik SET koebte_varer = koebte_varer {op} 1
+    WHERE kategori_id = (SELECT kategori_id FROM vare WHERE id = {row}.vare_id);
+"""
+
+_VARE_DELTA = """
+    UPDATE kategori_statistik SET
+        antal_varer = antal_varer {op} 1,
+        aktive_varer = aktive_varer {op} (
+            SELECT COUNT(*) FROM indkoebsliste_element WHERE vare_id = {row}.id AND status = 'aktiv'
+        ),
+        koebte_varer = koebte_varer {op} (
+            SELECT COUNT(*) FROM indkoebsliste_element WHERE vare_id = {row}.id AND status = 'købt'
+        ) {op} (
+            SELECT COUNT(*) FROM indkoebsliste_arkiv WHERE vare_id = {row}.id
+        )
+    WHERE kategori_id = {row}.kategori_id;
+"""
+
+_TRIGGERS = {
+    'kategori_ai': f"""
+        AFTER INSERT ON kategori BEGIN
+            {_ENSURE_ROW.format(kategori_id='new.id')}
+        END
+    """,
+    'kategori_ad': """
+        AFTER DELETE ON kategori BEGIN
+            DELETE FROM kategori_statistik WHERE kategori_id = old.id;
+        END
+    """,
+    'vare_ai': f"""
+        AFTER INSERT ON vare BEGIN
+            {_ENSURE_ROW.format(kategori_id='new.kategori_id')}
+            UPDATE kategori_statistik SET antal_varer = antal_varer + 1
+            WHERE kategori_id = new.kategori_id;
+        END
+    """,
+    'vare_ad': """
+        AFTER DELETE ON vare BEGIN
+            UPDATE kategori_statistik SET antal_varer = antal_varer - 1
+            WHERE kategori_id = old.kategori_id;
+        END
+    """,
+    'vare_au': f"""
+        AFTER UPDATE OF kategori_id ON vare
+        WHEN old.kategori_id IS NOT new.kategori_id BEGIN
+            {_ENSURE_ROW.format(kategori_id='new.kategori_id')}
+            {_VARE_DELTA.format(op='-', row='old')}
+            {_VARE_DELTA.format(op='+', row='new')}
+        END
+    """,
+    'element_ai': f"""
+        AFTER INSERT ON indkoebsliste_element BEGIN
+            {_ELEMENT_DELTA.format(op='+', row='new')}
+        END
+    """,
+    'element_ad': f"""
+        AFTER DELETE ON indkoebsliste_element BEGIN
+            {_ELEMENT_DELTA.format(op='-', row='old')}
+        END
+    """,
+    'element_au': f"""
+        AFTER UPDATE OF status, vare_id ON indkoebsliste_element
+        WHEN old.status IS NOT new.status OR old.vare_id IS NOT new.vare_id BEGIN
+            {_ELEMENT_DELTA.format(op='-', row='old')}
+            {_ELEMENT_DELTA.format(op='+', row='new')}
+        END
+    """,
+    'arkiv_ai': f"""
+        AFTER INSERT ON indkoebsliste_arkiv BEGIN
+            {_ARKIV_DELTA.format(op='+', row='new')}
+        END
+    """,
+    'arkiv_ad': f"""
+        AFTER DELETE ON indkoebsliste_arkiv BEGIN
+            {_ARKIV_DELTA.format(op='-', row='old')}
+        END
+    """,
+}
+
+# Én grupperet scanning af vare, indkoebsliste_element og arkivet i stedet
+# for korrelerede subqueries, der scanner hele historikken én gang per kategori
+_REBUILD_STATEMENTS = [
+    "DELETE FROM kategori_statistik",
+    """
+    INSERT INTO kategori_statistik(kategori_id, antal_varer, aktive_varer, koebte_varer)
+    SELECT k.id, COALESCE(v.antal, 0), COALESCE(e.aktive, 0), COALESCE(e.koebte, 0)
+    FROM kategori k
+    LEFT JOIN (
+        SELECT kategori_id, COUNT(*) AS antal FROM vare GROUP BY kategori_id
+    ) v ON v.kategori_id = k.id
+    LEFT JOIN (
+        SELECT v.kategori_id,
+            SUM(e.status = 'aktiv') AS aktive,
+            SUM(e.status = 'købt') AS koebte
+        FROM (
+            SELECT vare_id, status FROM indkoebsliste_element
+            UNION ALL
+            SELECT vare_id, 'købt' FROM indkoebsliste_arkiv
+        ) e JOIN vare v ON v.id = e.vare_id
+        GROUP BY v.kategori_id
+    ) e ON e.kategori_id = k.id
+    """,
+]
+
+
+def create_statistics_triggers():
+    """
+    Opret triggers der vedligeholder kategori_statistik.
+
+    Tællerne genberegnes kun hvis en trigger ikke fandtes i forvejen (ny
+    database eller en database fra før tællerne blev indført).
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    with db.engine.begin() as conn:
+        if install_triggers(conn, TRIGGER_PREFIX, _TRIGGERS):
+            for statement in _REBUILD_STATEMENTS:
+                conn.execute(text(statement))
+    return True
+
+
+def rebuild_statistics():
+    """Genberegn alle tællere fra bunden (fuld scanning)."""
+    with db.engine.begin() as conn:
+        for statement in _REBUILD_STATEMENTS:
+            conn.execute(text(statement))
+
+
+def get_category_statistics():
+    """
+    Hent tællere for alle kategorier med én forespørgsel.
+
+    Returns:
+        list: Dictionaries med id, navn, antal_varer, aktive_varer og købte_varer
+    """
+    rows = db.session.query(
+        Kategori.id,
+        Kategori.navn,
+        func.coalesce(KategoriStatistik.antal_varer, 0),
+        func.coalesce(KategoriStatistik.aktive_varer, 0),
+        func.coalesce(KategoriStatistik.koebte_varer, 0)
+    ).outerjoin(
+        KategoriStatistik, KategoriStatistik.kategori_id == Kategori.id
+    ).order_by(Kategori.navn).all()
+
+    return [
+        {
+            'id': kategori_id,
+            'navn': navn,
+            'antal_varer': antal_varer,
+            'aktive_varer': aktive,
+            'købte_varer': købte
+        }
+        for kategori_id, navn, antal_varer, aktive, købte in rows
+    ]
+
+
+def get_list_statistics():
+    """Statistik over indkøbslisten samt fordelingen per kategori."""
+    kategorier = get_category_statistics()
+    aktive = sum(k['aktive_varer'] for k in kategorier)
+    købte = sum(k['købte_varer'] for k in kategorier)
+    total = aktive + købte
+
+    return {
+        'aktive_varer': aktive,
+        'købte_varer': købte,
+        'total_varer': total,
+        'procent_købt': round((købte / total) * 100, 1) if total > 0 else 0,
+        'kategorier': kategorier
+    }
@@ -0,0 +1,188 @@
+"""
+"Køb igen" forslag ud fra købshistorikken.
+
+Tabellen koebsstatistik har én række per vare med antal køb samt første og
+seneste købstidspunkt. Den vedligeholdes inkrementelt af SQLite triggers på
+indkoebsliste_element (samme mønster som kategori_statistik i
+statistics.py), så forslag aldrig kræver en scanning af historikken:
+
+- Et element der markeres som købt, eller indsættes direkte som købt
+  (import, seed), tæller som et køb på sin tilfoejelsesdato. Elementer har
+  ikke et særskilt købstidspunkt, og historikken sorteres også efter
+  tilfoejelsesdato, så triggers og rebuild_suggestions giver samme tal.
+- Et købt element der genaktiveres trækker købet fra igen. Var det det
+  første eller seneste køb, findes det nye første/seneste køb i de
+  tilbageværende købte og arkiverede elementer for varen. Er historikken
+  ryddet (ryd-købte), beholdes den gamle værdi - en tilnærmelse, da det
+  fjernede køb ikke kan erstattes af et der ikke længere findes. Når det
+  sidste køb trækkes fra, slettes varens række, så et senere køb ikke
+  sammenlignes med gamle tidspunkter.
+- Rydning af historikken (ryd-købte) ændrer ikke tællerne.
+- Arkivering ændrer ikke tællerne, og et arkiveret element der flyttes
+  tilbage til listen (se ArkiveretElement.restore) er ikke et nyt køb.
+
+Det forventede genkøbsinterval for en vare er den gennemsnitlige tid mellem
+køb, (seneste - første) / (antal - 1). Forslag rangeres efter hvor "forfaldne"
+de er: dage siden seneste køb divideret med intervallet.
+"""
+from sqlalchemy import case, func, text
+from backend.config.config import db
+from backend.models.kategori import Kategori
+from backend.models.vare import Vare
+from backend.models.koebsstatistik import KoebsStatistik
+from backend.utils.triggers import install_triggers
+
+TRIGGER_PREFIX = 'koebsstatistik'
+
+_REGISTER_KOEB = """
+    INSERT INTO koebsstatistik(vare_id, antal_koeb, foerste_koeb, sidste_koeb)
+    VALUES (new.vare_id, 1, {tidspunkt}, {tidspunkt})
+    ON CONFLICT(vare_id) DO UPDATE SET
+        antal_koeb = antal_koeb + 1,
+        foerste_koeb = CASE WHEN antal_koeb > 0
+            THEN MIN(foerste_koeb, excluded.foerste_koeb) ELSE excluded.foerste_koeb END,
+        sidste_koeb = CASE WHEN antal_koeb > 0
+            THEN MAX(sidste_koeb, excluded.sidste_koeb) ELSE excluded.sidste_koeb END;
+"""
+
+# Varens købstidspunkter i historikken, efter old.status er ændret fra 'købt'
+_KOEB_TIDSPUNKTER = """
+    SELECT tilfoejelsesdato FROM indkoebsliste_element WHERE vare_id = old.vare_id AND status = 'købt'
+    UNION ALL
+    SELECT tilfoejelsesdato FROM indkoebsliste_arkiv WHERE vare_id = old.vare_id
+"""
+
+_TRIGGERS = {
+    'element_ai': f"""
+        AFTER INSERT ON indkoebsliste_element
+        WHEN new.status = 'købt'
+            AND NOT EXISTS (SELECT 1 FROM indkoebsliste_arkiv WHERE id = new.id) BEGIN
+            {_REGISTER_KOEB.format(tidspunkt='new.tilfoejelsesdato')}
+        END
+    """,
+    'element_koeb': f"""
+        AFTER UPDATE OF status ON indkoebsliste_element
+        WHEN old.status IS NOT 'købt' AND new.status = 'købt' BEGIN
+            {_REGISTER_KOEB.format(tidspunkt='new.tilfoejelsesdato')}
+        END
+    """,
+    'element_genaktiver': f"""
+        AFTER UPDATE OF status ON indkoebsliste_element
+        WHEN old.status = 'købt' AND new.status IS NOT 'købt' BEGIN
+            UPDATE koebsstatistik SET
+                antal_koeb = MAX(antal_koeb - 1, 0),
+                foerste_koeb = CASE WHEN old.tilfoejelsesdato <= foerste_koeb
+                    THEN COALESCE((SELECT MIN(tilfoejelsesdato) FROM ({_KOEB_TIDSPUNKTER})), foerste_koeb)
+                    ELSE foerste_koeb END,
+                sidste_koeb = CASE WHEN old.tilfoejelsesdato >= sidste_koeb
+                    THEN COALESCE((SELECT MAX(tilfoejelsesdato) FROM ({_KOEB_TIDSPUNKTER})), sidste_koeb)
+                    ELSE sidste_koeb END
+            WHERE vare_id = old.vare_id;
+            DELETE FROM koebsstatistik WHERE vare_id = old.vare_id AND antal_koeb = 0;
+        END
+    """,
+    'vare_ad': """
+        AFTER DELETE ON vare BEGIN
+            DELETE FROM koebsstatistik WHERE vare_id = old.id;
+        END
+    """,
+}
+
+_REBUILD_STATEMENTS = [
+    "DELETE FROM koebsstatistik",
+    """
+    INSERT INTO koebsstatistik(vare_id, antal_koeb, foerste_koeb, sidste_koeb)
+    SELECT vare_id, COUNT(*), MIN(tilfoejelsesdato), MAX(tilfoejelsesdato)
+    FROM (
+        SELECT vare_id, tilfoejelsesdato FROM indkoebsliste_element WHERE status = 'købt'
+        UNION ALL
+        SELECT vare_id, tilfoejelsesdato FROM indkoebsliste_arkiv
+    )
+    GROUP BY vare_id
+    """,
+]
+
+
+def create_suggestion_triggers():
+    """
+    Opret triggers der vedligeholder koebsstatistik.
+    
+    Tabellen bygges fra historikken hvis en trigger ikke fandtes i forvejen.
+    Ændrede triggers udskiftes uden at tællerne bygges forfra, da køb i en
+    ryddet historik ellers ville gå tabt.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    
+    with db.engine.begin() as conn:
+        if install_triggers(conn, TRIGGER_PREFIX, _TRIGGERS):
+            for statement in _REBUILD_STATEMENTS:
+                conn.execute(text(statement))
+        else:
+            # Rækker uden køb fra før genaktivering slettede dem
+            conn.execute(text("DELETE FROM koebsstatistik WHERE antal_koeb = 0"))
+    return True
+
+
+def rebuild_suggestions():
+    """Genberegn koebsstatistik fra historikken (fuld scanning)."""
+    with db.engine.begin() as conn:
+        for statement in _REBUILD_STATEMENTS:
+            conn.execute(text(statement))
+
+
+def get_suggestions(limit=20):
+    """
+    Hent varer der sandsynligvis skal købes igen, mest forfaldne først.
+    
+    Varer der allerede er på listen udelades. Varer med kun ét køb har
+    intet interval og kommer efter varer med et kendt interval.
+    
+    Returns:
+        list: Dictionaries med vare, antal køb, interval og forfald
+    """
+    sidste = func.julianday(KoebsStatistik.sidste_koeb)
+    interval = case(
+        (KoebsStatistik.antal_koeb > 1,
+         func.max((sidste - func.julianday(KoebsStatistik.foerste_koeb)) / (KoebsStatistik.antal_koeb - 1), 1.0)),
+        else_=None
+    )
+    dage_siden = func.julianday('now') - sidste
+    forfald = dage_siden / interval
+    
+    rows = db.session.query(
+        KoebsStatistik.vare_id,
+        Vare.navn,
+        Kategori.navn,
+        KoebsStatistik.antal_koeb,
+        KoebsStatistik.sidste_koeb,
+        interval,
+        dage_siden,
+        forfald
+    ).join(
+        Vare, Vare.id == KoebsStatistik.vare_id
+    ).outerjoin(
+        Kategori, Kategori.id == Vare.kategori_id
+    ).filter(
+        KoebsStatistik.antal_koeb > 0,
+        ~Vare.paa_liste_expression()
+    ).order_by(
+        forfald.is_(None),
+        forfald.desc(),
+        KoebsStatistik.antal_koeb.desc(),
+        KoebsStatistik.sidste_koeb.desc()
+    ).limit(limit).all()
+    
+    return [
+        {
+            'vare_id': vare_id,
+            'vare_navn': vare_navn,
+            'kategori_navn': kategori_navn,
+            'antal_koeb': antal_koeb,
+            'sidste_koeb': sidste_koeb.isoformat(),
+            'interval_dage': round(interval_dage, 1) if interval_dage is not None else None,
+            'dage_siden': round(dage, 1),
+            'forfald': round(forfald_værdi, 2) if forfald_værdi is not None else None
+        }
+        for vare_id, vare_navn, kategori_navn, antal_koeb, sidste_koeb, interval_dage, dage, forfald_værdi in rows
+    ]
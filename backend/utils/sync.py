@@ -0,0 +1,208 @@
+"""
+Delta sync: "hvad er ændret siden version N".
+
+Alle skrivninger til kategori, vare og indkoebsliste_element tæller en
+global sekvens ('sync' i data_version) op, før ændringen udføres (se
+versioning.py). SQLite triggers stempler hver indsat eller opdateret række
+med sekvensens aktuelle værdi i kolonnen sync_version, og slettede rækker
+bliver til tombstones i tabellen sletning.
+
+Rækker har også afledte felter fra deres børn: vare.paa_liste (aktive
+elementer) og kategori.antal_varer (varer i kategorien). Triggers på
+børnene stempler derfor forælderen igen, når et element bliver eller
+holder op med at være aktivt, og når en vare oprettes, slettes eller
+flyttes til en anden kategori, så klienter der kun anvender deltaer ikke
+beholder forældede tal og flag.
+
+Da SQLite kun har én skriver ad gangen, bliver versionerne committet i
+stigende rækkefølge. En klient der har hentet alt til og med version N,
+får derfor alle senere ændringer ved at spørge efter sync_version > N.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy.orm import joinedload
+from backend.config.config import db
+from backend.models.data_version import DataVersion
+from backend.models.kategori import Kategori
+from backend.models.vare import Vare
+from backend.models.indkoebsliste_element import IndkoebslisteElement
+from backend.models.sletning import Sletning
+from backend.utils.triggers import install_triggers
+from backend.utils.versioning import SYNC_COUNTER
+
+TRIGGER_PREFIX = 'sync'
+
+# Laveste version der stadig har tombstones; ældre tokens kræver fuld sync
+SYNC_HORIZON = 'sync_horizon'
+
+# tabel -> kolonner hvis ændring skal give en ny sync_version
+SYNCED_TABLES = {
+    'kategori': ('navn', 'beskrivelse'),
+    'vare': ('navn', 'kategori_id', 'note_vareregister'),
+    'indkoebsliste_element': ('vare_id', 'note_liste', 'status', 'tilfoejelsesdato'),
+}
+
+_CURRENT_VERSION = f"(SELECT version FROM data_version WHERE tabel = '{SYNC_COUNTER}')"
+
+
+def _stamp(tabel, raekke_id):
+    """UPDATE der stempler en række med sekvensens aktuelle værdi."""
+    return f"UPDATE {tabel} SET sync_version = COALESCE({_CURRENT_VERSION}, 0) WHERE id = {raekke_id};"
+
+
+def _table_triggers(tabel, columns):
+    """Triggers der stempler ændrede rækker og opretter tombstones."""
+    stamp = _stamp(tabel, 'new.id')
+    return {
+        f'{tabel}_ai': f"""
+            AFTER INSERT ON {tabel} BEGIN
+                {stamp}
+            END
+        """,
+        f'{tabel}_au': f"""
+            AFTER UPDATE OF {', '.join(columns)} ON {tabel} BEGIN
+                {stamp}
+            END
+        """,
+        f'{tabel}_ad': f"""
+            AFTER DELETE ON {tabel} BEGIN
+                INSERT INTO sletning(tabel, raekke_id, sync_version, slettet)
+                VALUES ('{tabel}', old.id, COALESCE({_CURRENT_VERSION}, 0), CURRENT_TIMESTAMP);
+            END
+        """,
+    }
+
+
+# Triggers der stempler forælderen når et afledt felt kan have ændret sig
+_PARENT_TRIGGERS = {
+    'paa_liste_ai': f"""
+        AFTER INSERT ON indkoebsliste_element
+        WHEN new.status = 'aktiv' BEGIN
+            {_stamp('vare', 'new.vare_id')}
+        END
+    """,
+    'paa_liste_au': f"""
+        AFTER UPDATE OF status, vare_id ON indkoebsliste_element
+        WHEN (old.status = 'aktiv' OR new.status = 'aktiv')
+            AND (old.status IS NOT new.status OR old.vare_id IS NOT new.vare_id) BEGIN
+            {_stamp('vare', 'old.vare_id')}
+            {_stamp('vare', 'new.vare_id')}
+        END
+    """,
+    'paa_liste_ad': f"""
+        AFTER DELETE ON indkoebsliste_element
+        WHEN old.status = 'aktiv' BEGIN
+            {_stamp('vare', 'old.vare_id')}
+        END
+    """,
+    'antal_varer_ai': f"""
+        AFTER INSERT ON vare BEGIN
+            {_stamp('kategori', 'new.kategori_id')}
+        END
+    """,
+    'antal_varer_au': f"""
+        AFTER UPDATE OF kategori_id ON vare
+        WHEN old.kategori_id IS NOT new.kategori_id BEGIN
+            {_stamp('kategori', 'old.kategori_id')}
+            {_stamp('kategori', 'new.kategori_id')}
+        END
+    """,
+    'antal_varer_ad': f"""
+        AFTER DELETE ON vare BEGIN
+            {_stamp('kategori', 'old.kategori_id')}
+        END
+    """,
+}
+
+_TRIGGERS = {
+    name: body
+    for tabel, columns in SYNCED_TABLES.items()
+    for name, body in _table_triggers(tabel, columns).items()
+}
+_TRIGGERS.update(_PARENT_TRIGGERS)
+
+
+def create_sync_triggers():
+    """
+    Opret triggers der vedligeholder sync_version og tombstones.
+
+    Ændrede triggers udskiftes i eksisterende databaser (install_triggers).
+    Rækker stemples ikke om; de får den nye opførsel ved næste ændring.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    with db.engine.begin() as conn:
+        install_triggers(conn, TRIGGER_PREFIX, _TRIGGERS)
+    return True
+
+
+def prune_tombstones(days=30):
+    """
+    Slet tombstones ældre end et antal dage.
+
+    Klienter med et token fra før den ældste tilbageværende tombstone får
+    en fuld sync næste gang. Returnerer antal slettede tombstones.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    horizon = db.session.query(db.func.max(Sletning.sync_version)).filter(
+        Sletning.slettet < cutoff
+    ).scalar()
+    if horizon is None:
+        return 0
+
+    antal = Sletning.query.filter(Sletning.sync_version <= horizon).delete(synchronize_session=False)
+    db.session.merge(DataVersion(tabel=SYNC_HORIZON, version=horizon))
+    db.session.commit()
+    return antal
+
+
+def get_changes(since):
+    """
+    Hent alle ændringer efter version `since`.
+
+    Args:
+        since (int): Klientens seneste token (0 eller None giver fuld sync)
+
+    Returns:
+        dict: Ændrede kategorier, varer og elementer, ID'er på slettede
+              rækker og et nyt token
+    """
+    # Tokenet læses før data, så ændringer der sker undervejs kommer med
+    # (igen) i næste sync i stedet for at blive tabt
+    versions = DataVersion.get_versions([SYNC_COUNTER, SYNC_HORIZON])
+    token = versions[SYNC_COUNTER]
+    full = not since or since < versions[SYNC_HORIZON] or since > token
+    # Ved fuld sync medtages også rækker der aldrig er blevet stemplet (version 0)
+    since = -1 if full else since
+
+    kategorier = Kategori.listing_query().filter(
+        Kategori.sync_version > since
+    ).order_by(Kategori.id).all()
+    varer = Vare.listing_query().filter(
+        Vare.sync_version > since
+    ).order_by(Vare.id).all()
+    elementer = IndkoebslisteElement.query.options(
+        joinedload(IndkoebslisteElement.vare).joinedload(Vare.kategori)
+    ).filter(
+        IndkoebslisteElement.sync_version > since
+    ).order_by(IndkoebslisteElement.id).all()
+
+    slettede = {'kategorier': [], 'varer': [], 'elementer': []}
+    if not full:
+        navne = {'kategori': 'kategorier', 'vare': 'varer', 'indkoebsliste_element': 'elementer'}
+        for tabel, raekke_id in db.session.query(Sletning.tabel, Sletning.raekke_id).filter(
+            Sletning.sync_version > since
+        ).order_by(Sletning.id):
+            slettede[navne[tabel]].append(raekke_id)
+
+    return {
+        'token': str(token),
+        'full': full,
+        'kategorier': [kategori.to_dict(antal_varer=antal_varer) for kategori, antal_varer in kategorier],
+        'varer': [
+            vare.to_dict(kategori_navn, paa_liste)
+            for vare, kategori_navn, paa_liste in varer
+        ],
+        'elementer': [element.to_dict() for element in elementer],
+        'slettede': slettede
+    }
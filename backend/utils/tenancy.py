@@ -0,0 +1,383 @@
+"""
+Husstande: én SQLite database fil per husstand.
+
+Med HOUSEHOLD_MODE slået til vælger hver request en husstand, enten med en
+header (HOUSEHOLD_HEADER, default X-Household) eller et URL prefix
+(HOUSEHOLD_URL_PREFIX, default /h):
+
+    GET /api/indkoebsliste/                  X-Household: jensen
+    GET /h/jensen/api/indkoebsliste/
+
+Husstandens database ligger i HOUSEHOLD_DATA_DIR/<husstand>.db. Da hver fil
+har sin egen skrivelås, venter skrivninger i én husstand ikke på de andre.
+
+Engines holdes i en LRU pulje med højst HOUSEHOLD_MAX_ENGINES åbne engines;
+den mindst nyligt brugte lukkes når puljen er fuld. En husstand med åbne
+SSE forbindelser lukkes ikke, så puljen kan midlertidigt være større.
+Nye husstande oprettes med `flask db init --household <navn>`. Med
+HOUSEHOLD_AUTO_CREATE oprettes en ukendt husstand også ved den første
+skrivende request, men aldrig ved GET eller HEAD; ellers svares 404.
+`flask db migrate-households` kører create_tables for alle husstande.
+
+Den valgte husstand ligger i flask.g, og RoutingSQLAlchemy (config.py)
+giver dens engine til db.session, db.engine og db.create_all(). Data der
+caches i processen (autocomplete indeks, kategorinavne, SSE broker) hentes
+med household_extension, så hver husstand har sin egen udgave.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context, jsonify, request
+from sqlalchemy import create_engine, text
+from backend.config.sqlite import init_fork_safety, init_sqlite_tuning
+from backend.utils.metrics import instrument_engine
+
+try:
+    import fcntl
+except ImportError:  # Ikke på Windows; der bruges kun låsen i processen
+    fcntl = None
+
+HOUSEHOLD_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+# Nøgle i WSGI environ for husstanden fra URL prefixet
+ENVIRON_KEY = 'huskeseddel.household'
+
+# PRAGMA user_version sættes når create_tables er kørt færdigt på en husstand
+SCHEMA_MARKER = 1
+
+# Requests der aldrig opretter en husstand
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+class HouseholdError(Exception):
+    """Ugyldig eller ukendt husstand."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class Household:
+    """En husstands engine og de data processen cacher for den."""
+
+    def __init__(self, name, path, engine):
+        self.name = name
+        self.path = path
+        self.engine = engine
+        self.engines = {None: engine}
+        self.extensions = {}
+        self.schema_ready = False
+        self.schema_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def extension(self, key, factory):
+        """Hent (og opret ved første brug) husstandens udgave af en extension."""
+        with self._lock:
+            value = self.extensions.get(key)
+            if value is None:
+                value = self.extensions[key] = factory()
+            return value
+
+    def in_use(self):
+        """Husstanden har åbne SSE forbindelser og må ikke lukkes."""
+        broker = self.extensions.get('event_broker')
+        return broker is not None and broker.subscriber_count() > 0
+
+
+class HouseholdPool:
+    """Trådsikker LRU pulje af åbne husstands-engines."""
+
+    def __init__(self, app, data_dir, max_engines=64):
+        self.app = app
+        self.data_dir = data_dir
+        self.max_engines = max_engines
+        self._households = OrderedDict()
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.evictions = 0
+
+    def path(self, name):
+        return os.path.join(self.data_dir, f'{name}.db')
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def names(self):
+        """Navne på alle husstande med en database fil."""
+        if not os.path.isdir(self.data_dir):
+            return []
+        return sorted(
+            filename[:-3] for filename in os.listdir(self.data_dir)
+            if filename.endswith('.db') and HOUSEHOLD_PATTERN.match(filename[:-3])
+        )
+
+    def get(self, name):
+        """Hent husstanden fra puljen eller åbn en ny engine til den."""
+        with self._lock:
+            household = self._households.get(name)
+            if household is not None:
+                self._households.move_to_end(name)
+                return household
+
+            household = Household(name, self.path(name), self._create_engine(name))
+            self._households[name] = household
+            self.opened += 1
+            evicted = self._evict(keep=name)
+
+        for old in evicted:
+            # Forbindelser der stadig er i brug lukkes når de gives tilbage
+            old.engine.dispose()
+        return household
+
+    def _evict(self, keep):
+        """Fjern de mindst nyligt brugte husstande ud over max_engines. Kaldes med låsen holdt."""
+        evicted = []
+        for name in list(self._households):
+            if len(self._households) <= self.max_engines:
+                break
+            household = self._households[name]
+            if name == keep or household.in_use():
+                continue
+            del self._households[name]
+            evicted.append(household)
+        self.evictions += len(evicted)
+        return evicted
+
+    def _create_engine(self, name):
+        os.makedirs(self.data_dir, exist_ok=True)
+        options = dict(self.app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        options.setdefault('echo', self.app.config.get('SQLALCHEMY_ECHO', False))
+        engine = create_engine(f'sqlite:///{self.path(name)}', **options)
+        init_sqlite_tuning(self.app, engine)
+        init_fork_safety(engine)
+        instrument_engine(self.app, engine)
+        return engine
+
+    def close_all(self):
+        """Luk alle engines i puljen."""
+        with self._lock:
+            households = list(self._households.values())
+            self._households.clear()
+        for household in households:
+            household.engine.dispose()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'open': len(self._households),
+                'max_engines': self.max_engines,
+                'opened': self.opened,
+                'evictions': self.evictions
+            }
+
+
+def _schema_version(engine):
+    with engine.connect() as conn:
+        return conn.execute(text('PRAGMA user_version')).scalar()
+
+
+@contextmanager
+def _schema_lock(path):
+    """
+    Lås på tværs af worker-processer mens en husstands skema oprettes.
+
+    Låsen tages på mappen med databaserne, så der ikke efterlades lock filer.
+    Selve database filen kan ikke bruges: når en anden fil descriptor til den
+    lukkes, slipper processen også SQLite's egne låse på filen.
+    """
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _create_schema(household):
+    from backend.config.database import create_tables
+
+    create_tables()
+    with household.engine.begin() as conn:
+        conn.execute(text(f'PRAGMA user_version = {SCHEMA_MARKER}'))
+
+
+def migrate_household(household):
+    """
+    Kør create_tables på husstandens database og marker skemaet som oprettet.
+
+    Skal kaldes med husstanden valgt (se use_household).
+    """
+    with household.schema_lock, _schema_lock(household.path):
+        _create_schema(household)
+        household.schema_ready = True
+
+
+def _ensure_schema(household):
+    """Opret skemaet i en ny husstand; eksisterende migreres med CLI'en."""
+    if household.schema_ready:
+        return
+    with household.schema_lock:
+        if not household.schema_ready and _schema_version(household.engine) < SCHEMA_MARKER:
+            with _schema_lock(household.path):
+                # En anden worker kan have oprettet det mens vi ventede
+                if _schema_version(household.engine) < SCHEMA_MARKER:
+                    _create_schema(household)
+        household.schema_ready = True
+
+
+def normalize_household(name):
+    """Valider et husstandsnavn (små bogstaver, tal, - og _)."""
+    name = (name or '').strip().lower()
+    if not HOUSEHOLD_PATTERN.match(name):
+        raise HouseholdError('Ugyldig husstand: brug 1-64 tegn a-z, 0-9, - og _')
+    return name
+
+
+def get_pool():
+    """Hent husstandspuljen for den aktuelle app (None uden HOUSEHOLD_MODE)."""
+    return current_app.extensions.get('households')
+
+
+def select_household(name, create=None, migrate=False):
+    """
+    Vælg husstanden for den aktuelle app context.
+
+    Args:
+        name: Husstandens navn
+        create: Opret husstanden hvis den ikke findes (default HOUSEHOLD_AUTO_CREATE)
+        migrate: Kør create_tables selv om skemaet allerede er oprettet
+    """
+    pool = get_pool()
+    if pool is None:
+        raise HouseholdError('Husstande er ikke slået til (HOUSEHOLD_MODE)')
+
+    name = normalize_household(name)
+    if create is None:
+        create = current_app.config.get('HOUSEHOLD_AUTO_CREATE', False)
+    if not create and not pool.exists(name):
+        raise HouseholdError(f'Husstanden {name} findes ikke', 404)
+
+    household = pool.get(name)
+    g.household = household
+    if migrate:
+        migrate_household(household)
+    else:
+        _ensure_schema(household)
+    return household
+
+
+@contextmanager
+def use_household(name, create=None, migrate=False):
+    """
+    Kør kode mod en husstands database i sin egen app context (og session).
+
+    Bruges af CLI'en og jobs uden for requests.
+    """
+    with current_app.app_context():
+        yield select_household(name, create, migrate)
+
+
+def current_household():
+    """Den valgte husstand, eller None."""
+    if not has_app_context():
+        return None
+    return g.get('household')
+
+
+def household_name():
+    """Navnet på den valgte husstand, eller None."""
+    household = current_household()
+    return household.name if household is not None else None
+
+
+def household_extension(key, factory):
+    """
+    Husstandens udgave af app.extensions[key], oprettet med factory.
+
+    Uden en valgt husstand bruges app.extensions[key] som før.
+    """
+    household = current_household()
+    if household is None:
+        value = current_app.extensions.get(key)
+        if value is None:
+            value = current_app.extensions.setdefault(key, factory())
+        return value
+    return household.extension(key, factory)
+
+
+class HouseholdPrefixMiddleware:
+    """
+    WSGI middleware der flytter /h/<husstand> fra stien til SCRIPT_NAME.
+
+    Routes ser derfor de samme URL'er som uden prefix, og url_for bygger
+    URL'er med prefixet.
+    """
+
+    def __init__(self, wsgi_app, prefix='/h'):
+        self.wsgi_app = wsgi_app
+        self.prefix = prefix.rstrip('/') + '/'
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(self.prefix):
+            name, slash, rest = path[len(self.prefix):].partition('/')
+            if name and slash:
+                environ[ENVIRON_KEY] = name
+                environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + self.prefix + name
+                environ['PATH_INFO'] = '/' + rest
+        return self.wsgi_app(environ, start_response)
+
+
+def _select_request_household():
+    """before_request: vælg husstand fra URL prefix eller header."""
+    from_path = request.environ.get(ENVIRON_KEY)
+    from_header = request.headers.get(current_app.config.get('HOUSEHOLD_HEADER', 'X-Household'))
+
+    if from_path is None and not from_header:
+        # Health, metrics og cache statistik ligger uden for blueprints og bruger ingen husstand
+        if request.blueprint is None or request.method == 'OPTIONS':
+            return None
+        return jsonify({
+            'error': 'Husstand mangler',
+            'details': 'Angiv husstanden med headeren '
+                       f"{current_app.config.get('HOUSEHOLD_HEADER', 'X-Household')} "
+                       f"eller URL prefixet {current_app.config.get('HOUSEHOLD_URL_PREFIX', '/h')}/<husstand>/"
+        }), 400
+
+    create = current_app.config.get('HOUSEHOLD_AUTO_CREATE', False) and request.method not in SAFE_METHODS
+    try:
+        if from_path is not None and from_header and normalize_household(from_path) != normalize_household(from_header):
+            raise HouseholdError('Husstanden i URL og header er forskellige')
+        select_household(from_path if from_path is not None else from_header, create=create)
+    except HouseholdError as e:
+        return jsonify({'error': e.message}), e.status_code
+    return None
+
+
+def init_households(app):
+    """
+    Opret husstandspuljen, URL prefix middleware og request hook.
+
+    Gør ingenting hvis HOUSEHOLD_MODE er slået fra.
+    """
+    if not app.config.get('HOUSEHOLD_MODE', False):
+        app.extensions['households'] = None
+        return None
+
+    data_dir = app.config.get('HOUSEHOLD_DATA_DIR') or 'households'
+    if not os.path.isabs(data_dir):
+        # Som relative SQLite stier i SQLALCHEMY_DATABASE_URI
+        data_dir = os.path.join(app.instance_path, data_dir)
+
+    pool = HouseholdPool(app, data_dir, app.config.get('HOUSEHOLD_MAX_ENGINES', 64))
+    app.extensions['households'] = pool
+    if app.config.get('HOUSEHOLD_URL_PREFIX'):
+        app.wsgi_app = HouseholdPrefixMiddleware(app.wsgi_app, app.config['HOUSEHOLD_URL_PREFIX'])
+    app.before_request(_select_request_household)
+    return pool
@@ -0,0 +1,315 @@
+"""
+Streaming eksport og bulk import af kategorier, varer og indkøbslisten.
+
+Eksporten læser rækker med yield_per fra en Core select, så hele tabellen
+aldrig ligger i hukommelsen, og skriver dem som NDJSON (én JSON linje per
+række) eller CSV i bidder. Relationer eksporteres som navne i stedet for
+ID'er, så data kan importeres i en anden installation:
+
+- kategorier: navn, beskrivelse, oprettelsesdato
+- varer: navn, kategori, note_vareregister, oprettelsesdato
+- historik: vare, kategori, note_liste, status, tilfoejelsesdato
+  (alle elementer på indkøbslisten, både aktive, købte og arkiverede)
+
+Importen læser samme formater linje for linje og indsætter i bidder af
+chunk_size rækker med én transaktion per bid. Kategori- og varenavne slås op
+i et dictionary der indlæses én gang; manglende kategorier og varer oprettes.
+Kategorier og varer der allerede findes springes over, og det samme gør
+aktive elementer for varer der allerede er på listen. Ved en fejl er
+tidligere bidder allerede committet.
+"""
+import codecs
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import String, func, insert, literal, select, type_coerce
+from backend.config.config import db
+from backend.models.kategori import Kategori
+from backend.models.vare import Vare
+from backend.models.indkoebsliste_element import IndkoebslisteElement
+from backend.models.arkiveret_element import ArkiveretElement
+from backend.utils.validation import ValidationError
+
+ENTITIES = ('kategorier', 'varer', 'historik')
+FORMATS = ('ndjson', 'csv')
+
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+COLUMNS = {
+    'kategorier': ('navn', 'beskrivelse', 'oprettelsesdato'),
+    'varer': ('navn', 'kategori', 'note_vareregister', 'oprettelsesdato'),
+    'historik': ('vare', 'kategori', 'note_liste', 'status', 'tilfoejelsesdato'),
+}
+
+YIELD_PER = 5000
+CHUNK_SIZE = 10000
+
+_encoder = json.JSONEncoder(ensure_ascii=False)
+
+
+def _iso(column):
+    """
+    Dato som ISO tekst direkte fra SQL.
+    
+    SQLite gemmer DateTime som 'YYYY-MM-DD HH:MM:SS.ffffff'; at hente teksten
+    undgår at parse og formatere en datetime per række.
+    """
+    return func.replace(type_coerce(column, String), ' ', 'T')
+
+
+def _export_statements(entity):
+    """Core selects for en entitet med kolonnerne i COLUMNS, i eksportrækkefølge."""
+    if entity == 'kategorier':
+        return [select(
+            Kategori.navn, Kategori.beskrivelse, _iso(Kategori.oprettelsesdato)
+        ).order_by(Kategori.id)]
+
+    if entity == 'varer':
+        return [select(
+            Vare.navn, Kategori.navn, Vare.note_vareregister, _iso(Vare.oprettelsesdato)
+        ).join(Kategori, Kategori.id == Vare.kategori_id).order_by(Vare.id)]
+
+    # Arkivet (den ældste historik) først og derefter listen; to statements
+    # i stedet for en sorteret UNION ALL, så eksporten kan streames
+    return [
+        select(
+            Vare.navn, Kategori.navn, ArkiveretElement.note_liste,
+            literal('købt'), _iso(ArkiveretElement.tilfoejelsesdato)
+        ).join(
+            Vare, Vare.id == ArkiveretElement.vare_id
+        ).join(
+            Kategori, Kategori.id == Vare.kategori_id
+        ).order_by(ArkiveretElement.id),
+        select(
+            Vare.navn, Kategori.navn, IndkoebslisteElement.note_liste,
+            IndkoebslisteElement.status, _iso(IndkoebslisteElement.tilfoejelsesdato)
+        ).join(
+            Vare, Vare.id == IndkoebslisteElement.vare_id
+        ).join(
+            Kategori, Kategori.id == Vare.kategori_id
+        ).order_by(IndkoebslisteElement.id),
+    ]
+
+
+def _check(entity, fmt=None):
+    if entity not in ENTITIES:
+        raise ValidationError(f'Ukendt entitet: {entity}', 404)
+    if fmt is not None and fmt not in FORMATS:
+        raise ValidationError(f'Ukendt format: {fmt} (brug ndjson eller csv)')
+
+
+def _export_rows(entity):
+    """Generator over eksporterede rækker som tuples, hentet i bidder."""
+    for statement in _export_statements(entity):
+        result = db.session.execute(statement.execution_options(yield_per=YIELD_PER))
+        for partition in result.partitions():
+            yield partition
+
+
+def export_entity(entity, fmt='ndjson'):
+    """
+    Generator der yielder eksporten af en entitet som tekst i bidder.
+
+    Skal køres inden for en app context (brug stream_with_context i routes).
+    """
+    _check(entity, fmt)
+    columns = COLUMNS[entity]
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for partition in _export_rows(entity):
+            writer.writerows(partition)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    for partition in _export_rows(entity):
+        yield ''.join(
+            _encoder.encode(dict(zip(columns, row))) + '\n'
+            for row in partition
+        )
+
+
+def read_rows(lines, fmt='ndjson'):
+    """
+    Parse importdata linje for linje.
+
+    Args:
+        lines: Iterable af bytes linjer (fil åbnet binært eller request.stream)
+        fmt: 'ndjson' eller 'csv'
+
+    Yields:
+        tuple: (linjenummer, dict)
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(codecs.iterdecode(lines, 'utf-8-sig'))
+        for row in reader:
+            yield reader.line_num, {key: (value if value != '' else None) for key, value in row.items()}
+        return
+
+    for nummer, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            raise ValidationError(f'Linje {nummer}: ugyldig JSON')
+        if not isinstance(row, dict):
+            raise ValidationError(f'Linje {nummer}: forventede et JSON objekt')
+        yield nummer, row
+
+
+def _text(row, key, nummer, required=False):
+    value = row.get(key)
+    if value:
+        value = (value if isinstance(value, str) else str(value)).strip() or None
+    else:
+        value = None
+    if required and not value:
+        raise ValidationError(f'Linje {nummer}: {key} er påkrævet')
+    return value
+
+
+def _datetime(row, key, nummer, now):
+    value = row.get(key)
+    if not value:
+        return now
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f'Linje {nummer}: ugyldig dato i {key}')
+
+
+class _Importer:
+    """Holder navneopslag og den aktuelle bid under en import."""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.now = datetime.utcnow()
+        self.kategorier = dict(db.session.execute(select(Kategori.navn, Kategori.id)).all())
+        self.varer = None
+        self.pending = []
+        self.importeret = 0
+        self.sprunget_over = 0
+
+    def load_varer(self):
+        """(kategori_id, varenavn) -> vare_id for alle eksisterende varer."""
+        self.varer = {
+            (kategori_id, navn): vare_id
+            for vare_id, kategori_id, navn in db.session.execute(select(Vare.id, Vare.kategori_id, Vare.navn))
+        }
+
+    def kategori_id(self, navn):
+        """Slå en kategori op og opret den hvis den mangler."""
+        kategori_id = self.kategorier.get(navn)
+        if kategori_id is None:
+            kategori_id = db.session.execute(
+                insert(Kategori).values(navn=navn, oprettelsesdato=self.now)
+            ).inserted_primary_key[0]
+            self.kategorier[navn] = kategori_id
+        return kategori_id
+
+    def vare_id(self, kategori_id, navn):
+        """Slå en vare op og opret den hvis den mangler."""
+        key = (kategori_id, navn)
+        vare_id = self.varer.get(key)
+        if vare_id is None:
+            vare_id = db.session.execute(
+                insert(Vare).values(navn=navn, kategori_id=kategori_id, oprettelsesdato=self.now)
+            ).inserted_primary_key[0]
+            self.varer[key] = vare_id
+        return vare_id
+
+    def add(self, model, values):
+        self.pending.append(values)
+        if len(self.pending) >= self.chunk_size:
+            self.flush(model)
+
+    def flush(self, model):
+        """Indsæt den aktuelle bid og commit."""
+        if self.pending:
+            db.session.execute(insert(model), self.pending)
+            self.importeret += len(self.pending)
+            self.pending = []
+        db.session.commit()
+
+
+def import_entity(entity, rows, chunk_size=CHUNK_SIZE):
+    """
+    Importer rækker fra read_rows i bidder af chunk_size.
+
+    Returns:
+        dict: Antal importerede og oversprungne rækker
+    """
+    _check(entity)
+    importer = _Importer(chunk_size)
+
+    try:
+        if entity == 'kategorier':
+            model = Kategori
+            for nummer, row in rows:
+                navn = _text(row, 'navn', nummer, required=True)
+                if navn in importer.kategorier:
+                    importer.sprunget_over += 1
+                    continue
+                importer.kategorier[navn] = None
+                importer.add(model, {
+                    'navn': navn,
+                    'beskrivelse': _text(row, 'beskrivelse', nummer),
+                    'oprettelsesdato': _datetime(row, 'oprettelsesdato', nummer, importer.now)
+                })
+
+        elif entity == 'varer':
+            model = Vare
+            importer.load_varer()
+            for nummer, row in rows:
+                navn = _text(row, 'navn', nummer, required=True)
+                kategori_id = importer.kategori_id(_text(row, 'kategori', nummer, required=True))
+                if (kategori_id, navn) in importer.varer:
+                    importer.sprunget_over += 1
+                    continue
+                importer.varer[(kategori_id, navn)] = None
+                importer.add(model, {
+                    'navn': navn,
+                    'kategori_id': kategori_id,
+                    'note_vareregister': _text(row, 'note_vareregister', nummer),
+                    'oprettelsesdato': _datetime(row, 'oprettelsesdato', nummer, importer.now)
+                })
+
+        else:
+            model = IndkoebslisteElement
+            importer.load_varer()
+            # Samme vare må kun være aktiv på listen én gang
+            aktive = set(db.session.execute(
+                select(IndkoebslisteElement.vare_id).where(IndkoebslisteElement.status == 'aktiv')
+            ).scalars())
+            for nummer, row in rows:
+                status = _text(row, 'status', nummer) or 'købt'
+                if status not in ('aktiv', 'købt'):
+                    raise ValidationError(f"Linje {nummer}: status skal være 'aktiv' eller 'købt'")
+                kategori_id = importer.kategori_id(_text(row, 'kategori', nummer, required=True))
+                vare_id = importer.vare_id(kategori_id, _text(row, 'vare', nummer, required=True))
+                if status == 'aktiv':
+                    if vare_id in aktive:
+                        importer.sprunget_over += 1
+                        continue
+                    aktive.add(vare_id)
+                importer.add(model, {
+                    'vare_id': vare_id,
+                    'note_liste': _text(row, 'note_liste', nummer),
+                    'status': status,
+                    'tilfoejelsesdato': _datetime(row, 'tilfoejelsesdato', nummer, importer.now)
+                })
+
+        importer.flush(model)
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {'importeret': importer.importeret, 'sprunget_over': importer.sprunget_over}
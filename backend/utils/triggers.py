@@ -0,0 +1,48 @@
+"""
+Installation af SQLite triggers der vedligeholder afledte tabeller.
+
+Tællerne i kategori_statistik og koebsstatistik, oprydningen i arkivet og
+sync_version og tombstones til delta sync holdes ved lige af triggers der
+oprettes af create_tables. Når en trigger ændres i koden, skal eksisterende
+databaser have den nye udgave uden at tællerne nødvendigvis bygges forfra; koebsstatistik kan f.eks. ikke
+genskabes efter historikken er ryddet.
+"""
+from sqlalchemy import text
+
+
+def _normalize(sql):
+    return ' '.join(sql.split())
+
+
+def install_triggers(conn, prefix, triggers):
+    """
+    Opret triggers med navnene {prefix}_{suffix} ud fra triggers (suffix -> definition).
+
+    Triggers hvis definition er ændret, udskiftes, og triggers med samme
+    prefix der ikke længere findes i triggers, slettes. En udskiftet trigger
+    skal give samme resultat som den gamle for eksisterende data, da
+    tabellen den vedligeholder ikke genberegnes.
+
+    Returns:
+        bool: True hvis mindst én trigger manglede, så kalderen skal genberegne
+    """
+    existing = dict(conn.execute(
+        text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name GLOB :pattern"),
+        {'pattern': f'{prefix}_*'}
+    ).all())
+    expected = {f'{prefix}_{suffix}': body for suffix, body in triggers.items()}
+
+    for name in existing.keys() - expected.keys():
+        conn.execute(text(f'DROP TRIGGER {name}'))
+
+    missing = False
+    for name, body in expected.items():
+        statement = f'CREATE TRIGGER {name} {body}'
+        if name not in existing:
+            missing = True
+        elif _normalize(existing[name]) != _normalize(statement):
+            conn.execute(text(f'DROP TRIGGER {name}'))
+        else:
+            continue
+        conn.execute(text(statement))
+    return missing
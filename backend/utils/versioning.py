@@ -0,0 +1,159 @@
+"""
+Versionering af data og betingede GET requests (ETag / If-None-Match).
+
+Hver gang en transaktion ændrer kategori, vare, indkoebsliste_element eller
+indkoebsliste_arkiv tælles en versionstæller i data_version op i samme
+transaktion. Ændringer
+opsamles fra både unit-of-work flushes (after_flush) og bulk INSERT/UPDATE/
+DELETE statements (do_orm_execute).
+
+Efter commit får funktioner registreret med on_commit besked om hvilke
+tabeller transaktionen ændrede (bruges f.eks. til cache invalidering).
+
+Endpoints dekoreret med conditional_get bygger en stærk ETag ud fra
+request-URL'en og versionerne af de tabeller de læser fra. Matcher den
+klientens If-None-Match returneres 304 uden at route funktionen kaldes.
+Sammenligningen er svag, så ETags fra komprimerede svar (W/"...", se
+backend/utils/compression.py) også matcher.
+"""
+import hashlib
+from functools import wraps
+from itertools import chain
+from flask import request, make_response, current_app, has_app_context
+from sqlalchemy import event
+from backend.config.config import db
+from backend.utils.tenancy import household_name
+
+TRACKED_TABLES = frozenset({'kategori', 'vare', 'indkoebsliste_element', 'indkoebsliste_arkiv'})
+
+# Global sekvens til delta sync; tælles op FØR ændringer, så triggers kan
+# stemple rækkerne med den nye værdi (se backend/utils/sync.py)
+SYNC_COUNTER = 'sync'
+
+
+def _data_version():
+    """DataVersion modellen; importeres først ved brug, så `import backend.app` ikke indlæser modellerne."""
+    from backend.models.data_version import DataVersion
+    return DataVersion
+
+
+def _changed_tables(objects):
+    """Find de overvågede tabeller som en samling ORM objekter hører til."""
+    tables = set()
+    for obj in objects:
+        table = getattr(obj, '__table__', None)
+        if table is not None and table.name in TRACKED_TABLES:
+            tables.add(table.name)
+    return tables
+
+
+def _record_changes(session, tables):
+    """Tæl versioner op og husk tabellerne til after_commit."""
+    _data_version().bump(session.connection(), sorted(tables))
+    session.info.setdefault('changed_tables', set()).update(tables)
+
+
+def _before_flush(session, flush_context, instances):
+    """Tæl sync sekvensen op før en flush der ændrer overvågede tabeller."""
+    if _changed_tables(chain(session.new, session.dirty, session.deleted)):
+        _data_version().bump(session.connection(), [SYNC_COUNTER])
+
+
+def _after_flush(session, flush_context):
+    """Tæl versioner op for tabeller der blev ændret i denne flush."""
+    tables = _changed_tables(chain(session.new, session.dirty, session.deleted))
+    if tables:
+        _record_changes(session, tables)
+
+
+def _do_orm_execute(orm_execute_state):
+    """Tæl versioner op for bulk INSERT/UPDATE/DELETE på overvågede modeller."""
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table.name in TRACKED_TABLES:
+        _data_version().bump(orm_execute_state.session.connection(), [SYNC_COUNTER])
+        _record_changes(orm_execute_state.session, {mapper.local_table.name})
+
+
+def _after_commit(session):
+    """Giv registrerede lyttere besked om de tabeller transaktionen ændrede."""
+    tables = session.info.pop('changed_tables', None)
+    if not tables or not has_app_context():
+        return
+    for callback in current_app.extensions.get('commit_listeners', []):
+        callback(frozenset(tables))
+
+
+def _after_rollback(session):
+    """Glem ændringer fra en transaktion der blev rullet tilbage."""
+    session.info.pop('changed_tables', None)
+
+
+def init_versioning(app):
+    """Registrer session events der holder data_version opdateret."""
+    app.extensions.setdefault('commit_listeners', [])
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'do_orm_execute', _do_orm_execute)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
+
+
+def on_commit(app, callback):
+    """
+    Registrer en funktion der kaldes efter hver commit der ændrede data.
+    
+    Funktionen får et frozenset med navnene på de ændrede tabeller.
+    """
+    app.extensions.setdefault('commit_listeners', []).append(callback)
+
+
+def get_versions(tables):
+    """Hent tabelversioner, højst én gang per tabel per request."""
+    cached = request.environ.setdefault('huskeseddel.data_versions', {})
+    missing = [t for t in tables if t not in cached]
+    if missing:
+        cached.update(_data_version().get_versions(missing))
+    return {t: cached[t] for t in tables}
+
+
+def compute_etag(tables):
+    """Byg en stærk ETag ud fra request-URL'en og tabelversionerne."""
+    versions = get_versions(sorted(tables))
+    parts = [request.full_path] + [f'{t}={v}' for t, v in sorted(versions.items())]
+    household = household_name()
+    if household is not None:
+        # Husstande har hver deres versionstællere
+        parts.insert(0, f'household={household}')
+    key = '|'.join(parts)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def conditional_get(*tables):
+    """
+    Decorator for GET endpoints der kun afhænger af de angivne tabeller.
+    
+    Args:
+        tables: Navne på de tabeller endpointet læser fra
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag = compute_etag(tables)
+            
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag)
+            # Browseren må gerne gemme svaret, men skal revalidere hver gang
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,11 @@
+"""
+WSGI entry point til produktion.
+
+Bruges af gunicorn (se gunicorn.conf.py i roden af projektet):
+
+    gunicorn -c gunicorn.conf.py backend.wsgi:app
+"""
+import os
+from backend.app import create_app
+
+app = create_app(os.environ.get('FLASK_ENV', 'production'))
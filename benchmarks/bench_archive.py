@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark: den aktive liste med lang købshistorik før og efter arkivering.
+
+Indlæser 20.000 varer med 50 køb hver (1.000.000 købte elementer) og 200
+varer på den aktive liste i en fil-database, og måler de varme opslag der
+rammer indkoebsliste_element:
+
+- GET /api/indkoebsliste/ (den aktive liste)
+- IndkoebslisteElement.find_active_by_vare
+- GET /api/varer/?cursor= (paa_liste EXISTS per vare)
+- tilføj og fjern en vare (skrivninger vedligeholder tabellens indekser)
+- GET /api/indkoebsliste/historik, første side og en side langt tilbage
+- GET /api/sync uden token (fuld sync læser hele indkoebsliste_element)
+
+samt størrelsen af tabellen og dens indekser.
+
+Derefter flyttes alt ældre end 30 dage til arkivet med compact_history, og
+målingerne gentages. Historik, statistik og forslag sammenlignes før og
+efter, så arkiveringen kan ses ikke at ændre svarene.
+
+Kør med: uv run python -m benchmarks.bench_archive
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ANTAL_VARER = 20000
+HISTORIK_PR_VARE = 50
+AKTIVE = 200
+GENTAGELSER = 200
+
+
+def median_ms(fn, gentagelser=GENTAGELSER):
+    tider = []
+    for _ in range(gentagelser):
+        start = time.perf_counter()
+        fn()
+        tider.append((time.perf_counter() - start) * 1000)
+    return statistics.median(tider)
+
+
+def get_json(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def measure(app, client):
+    """Mål de varme opslag og returner {navn: median ms}."""
+    from backend.config import db
+    from backend.models import IndkoebslisteElement
+
+    rng = random.Random(42)
+    resultater = {}
+    with app.app_context():
+        # Nye forbindelser, så sidecachen ikke er varmet op af forrige fase
+        db.engine.dispose()
+        vare_ids = [rng.randint(1, ANTAL_VARER) for _ in range(GENTAGELSER)]
+        ids = iter(vare_ids * 2)
+        resultater['find_active_by_vare'] = median_ms(
+            lambda: IndkoebslisteElement.find_active_by_vare(next(ids))
+        )
+        db.session.remove()
+
+    resultater['GET /indkoebsliste/'] = median_ms(lambda: get_json(client, '/api/indkoebsliste/'))
+    resultater['GET /varer/?cursor= (100)'] = median_ms(
+        lambda: get_json(client, '/api/varer/?cursor=&limit=100')
+    )
+
+    vare_id = ANTAL_VARER  # Ikke på den aktive liste
+
+    def tilfoej_og_fjern():
+        response = client.post('/api/indkoebsliste/tilfoej', json={'vare_id': vare_id})
+        assert response.status_code == 201, response.get_json()
+        assert client.delete(f"/api/indkoebsliste/{response.get_json()['id']}").status_code == 200
+    resultater['tilføj + fjern'] = median_ms(tilfoej_og_fjern, 50)
+
+    resultater['historik første side (50)'] = median_ms(
+        lambda: get_json(client, '/api/indkoebsliste/historik?cursor=&limit=50')
+    )
+    resultater['GET /sync (fuld)'] = median_ms(lambda: get_json(client, '/api/sync'), 3)
+
+    cursor = ''
+    for _ in range(200):
+        cursor = get_json(client, f'/api/indkoebsliste/historik?cursor={cursor}&limit=500')['next_cursor']
+    resultater['historik efter 100.000 (50)'] = median_ms(
+        lambda: get_json(client, f'/api/indkoebsliste/historik?cursor={cursor}&limit=50')
+    )
+    return resultater
+
+
+def table_mib(app):
+    """Størrelse af indkoebsliste_element og dens indekser i MiB (dbstat)."""
+    from sqlalchemy import text
+    from backend.config import db
+
+    with app.app_context():
+        size = db.session.execute(text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN ("
+            "SELECT name FROM sqlite_master WHERE tbl_name = 'indkoebsliste_element')"
+        )).scalar()
+        db.session.remove()
+    return size / (1024 * 1024)
+
+
+def snapshot(client):
+    """Svar der ikke må ændres af en arkivering."""
+    return {
+        'historik': get_json(client, '/api/indkoebsliste/historik?limit=5000'),
+        'stats': get_json(client, '/api/indkoebsliste/stats'),
+        'forslag': get_json(client, '/api/indkoebsliste/forslag?limit=200'),
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Før backend importeres, da konfigurationen læser DATABASE_URL ved import
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'archive.db')}"
+        from benchmarks.common import bulk_load, timer
+        from backend.app import create_app
+        from backend.utils.archive import compact_history, get_archive_statistics
+
+        app = create_app('development')
+        client = app.test_client()
+        with app.app_context():
+            with timer() as t:
+                bulk_load(ANTAL_VARER, historik_pr_vare=HISTORIK_PR_VARE, aktive=AKTIVE)
+            print(f'Indlæst {ANTAL_VARER * HISTORIK_PR_VARE} købte og {AKTIVE} aktive elementer '
+                  f'på {t["seconds"]:.1f} s')
+
+        før = measure(app, client)
+        før['indkoebsliste_element (MiB)'] = table_mib(app)
+        før_svar = snapshot(client)
+
+        with app.app_context():
+            with timer() as t:
+                antal = compact_history(30)
+            tal = get_archive_statistics()
+        print(f'compact_history(30): {antal} elementer arkiveret på {t["seconds"]:.1f} s; '
+              f"{tal['elementer']} tilbage i indkoebsliste_element, {tal['arkiverede']} i arkivet")
+
+        efter = measure(app, client)
+        efter['indkoebsliste_element (MiB)'] = table_mib(app)
+        uændret = snapshot(client) == før_svar
+
+        print(f"\n{'':<32}{'før':>12}{'efter':>12}")
+        for navn in før:
+            enhed = '' if navn.endswith('(MiB)') else 'ms'
+            print(f'{navn:<32}{før[navn]:>9.2f} {enhed:2}{efter[navn]:>9.2f} {enhed}')
+        print(f'\nHistorik, statistik og forslag uændrede efter arkivering: {"ja" if uændret else "NEJ"}')
+        return 0 if uændret else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark: samtidige lange forbindelser mod de trådede servere og ASGI.
+
+For hver server åbnes FORBINDELSER idle SSE streams på
+/api/indkoebsliste/stream (som browsere med live opdateringer), og mens de
+er åbne måles:
+
+- hvor mange streams serveren nåede at svare inden for 5 sekunder, og hvor
+  mange den afviste med 503 (EVENT_MAX_STREAMS i gunicorn)
+- serverens samlede RSS og antal tråde (alle processer), og RSS per stream
+  i forhold til den tomgang der blev målt før streams blev åbnet
+- latens for GET /api/indkoebsliste/ ved siden af de åbne streams
+- tiden fra en vare tilføjes til alle streams har fået eventet
+
+Serverne er Werkzeug dev serveren med threaded=True (run_backend.py i
+development), gunicorn med gunicorn.conf.py (WEB_WORKERS workers med
+WEB_THREADS tråde) og uvicorn med backend.asgi:app i én proces. Alle kører
+mod den samme fil-baserede SQLite database.
+
+Kør med: uv run python -m benchmarks.bench_asgi
+(kræver pip install huskeseddel[asgi])
+"""
+import http.client
+import json
+import os
+import selectors
+import socket
+import statistics
+import sys
+import subprocess
+import tempfile
+import time
+from benchmarks.bench_serving import ROOT, free_port, start, wait_for_server
+
+FORBINDELSER = (50, 400)
+SVAR_TIMEOUT = 5
+GET_GENTAGELSER = 20
+
+
+def process_tree(pid):
+    """pid og alle dens efterkommere (fra /proc)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def memory_and_threads(pid):
+    """Samlet RSS i MiB og antal tråde for serverens processer."""
+    rss_kib = threads = 0
+    for process in process_tree(pid):
+        try:
+            with open(f'/proc/{process}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        rss_kib += int(line.split()[1])
+                    elif line.startswith('Threads:'):
+                        threads += int(line.split()[1])
+        except OSError:
+            continue
+    return rss_kib / 1024, threads
+
+
+def open_streams(port, antal):
+    """
+    Åbn antal SSE streams inden for SVAR_TIMEOUT.
+
+    Returnerer (forbundne, afviste, ventende): streams med 200, streams der fik
+    503 fordi serveren har nået EVENT_MAX_STREAMS, og streams uden svar.
+    """
+    selector = selectors.DefaultSelector()
+    for _ in range(antal):
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.sendall(b'GET /api/indkoebsliste/stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n\r\n')
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ, b'')
+
+    forbundne, afviste = [], []
+    deadline = time.time() + SVAR_TIMEOUT
+    while len(forbundne) + len(afviste) < antal and time.time() < deadline:
+        for key, _ in selector.select(timeout=0.1):
+            data = key.data + key.fileobj.recv(4096)
+            if b'retry:' in data:
+                selector.unregister(key.fileobj)
+                (forbundne if data.startswith(b'HTTP/1.1 200') else afviste).append(key.fileobj)
+            else:
+                selector.modify(key.fileobj, selectors.EVENT_READ, data)
+    ventende = [key.fileobj for key in selector.get_map().values()]
+    selector.close()
+    return forbundne, afviste, ventende
+
+
+def request(port, method, path, body=None):
+    """Send et request; returnerer (status, sekunder, svar) eller (None, None, None) ved timeout."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=SVAR_TIMEOUT)
+    headers = {'Content-Type': 'application/json'} if body is not None else {}
+    start_tid = time.perf_counter()
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, time.perf_counter() - start_tid, data
+    except OSError:
+        return None, None, None
+    finally:
+        conn.close()
+
+
+def fan_out(port, streams):
+    """Tilføj en ny vare til listen og mål tiden til alle streams har modtaget element_added."""
+    status, _, data = request(port, 'POST', '/api/varer/', {'navn': f'Bench {port}', 'kategori_id': 1})
+    if status != 201:
+        return None
+    vare_id = json.loads(data)['id']
+
+    selector = selectors.DefaultSelector()
+    for sock in streams:
+        selector.register(sock, selectors.EVENT_READ)
+    start_tid = time.perf_counter()
+    status, _, _ = request(port, 'POST', '/api/indkoebsliste/tilfoej', {'vare_id': vare_id})
+    if status != 201:
+        return None
+    modtaget = set()
+    while len(modtaget) < len(streams) and time.perf_counter() - start_tid < SVAR_TIMEOUT:
+        for key, _ in selector.select(timeout=0.1):
+            if b'element_added' in key.fileobj.recv(65536):
+                modtaget.add(key.fileobj)
+    selector.close()
+    return time.perf_counter() - start_tid if len(modtaget) == len(streams) else None
+
+
+def measure(navn, command, env, antal):
+    """Start serveren, åbn antal streams og udskriv målingerne."""
+    port = free_port()
+    env = dict(env, WEB_BIND=f'127.0.0.1:{port}')
+    server = start([part.replace('{port}', str(port)) for part in command], env)
+    try:
+        wait_for_server(port)
+        for _ in range(GET_GENTAGELSER):
+            request(port, 'GET', '/api/indkoebsliste/')
+        tomgang_mib, _ = memory_and_threads(server.pid)
+
+        forbundne, afviste, ventende = open_streams(port, antal)
+        time.sleep(1)
+        rss_mib, threads = memory_and_threads(server.pid)
+
+        latenser = [request(port, 'GET', '/api/indkoebsliste/')[1] for _ in range(GET_GENTAGELSER)]
+        if None in latenser:
+            get = 'timeout'
+        else:
+            get = f'{statistics.median(latenser) * 1000:.1f} ms'
+        leveret = fan_out(port, forbundne) if forbundne else None
+        per_stream = (rss_mib - tomgang_mib) * 1024 / len(forbundne) if forbundne else 0
+
+        print(f'{navn:<24}{antal:>8}{len(forbundne):>9}{len(afviste):>8}{rss_mib:>9.1f}{per_stream:>11.1f}'
+              f'{threads:>8}{get:>12}{"timeout" if leveret is None else f"{leveret * 1000:.0f} ms":>12}')
+        for sock in forbundne + afviste + ventende:
+            sock.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        env['FLASK_ENV'] = 'production'
+        env['WEB_ACCESS_LOG'] = ''
+        env['METRICS_ENABLED'] = 'false'
+        env['WEB_MAX_REQUESTS'] = '0'
+        env['WEB_TIMEOUT'] = '120'  # gthread workers må ikke genstartes mens de venter på streams
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_serving', '--seed'], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+        servere = [
+            ('Werkzeug threaded', [sys.executable, '-m', 'benchmarks.bench_serving', '--dev', '{port}']),
+            (f"gunicorn {env.get('WEB_WORKERS', 2)}w x {env.get('WEB_THREADS', 8)}t",
+             [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'backend.wsgi:app']),
+            ('uvicorn (ASGI, 1 proces)',
+             [sys.executable, '-m', 'uvicorn', 'backend.asgi:app', '--host', '127.0.0.1', '--port', '{port}',
+              '--log-level', 'warning', '--no-access-log']),
+        ]
+        print(f"Idle SSE streams, {os.cpu_count()} CPU'er; RSS per stream i forhold til tomgang\n")
+        print(f"{'server':<24}{'streams':>8}{'svarede':>9}{'afvist':>8}{'RSS MiB':>9}{'KiB/stream':>11}"
+              f"{'tråde':>8}{'GET liste':>12}{'event':>12}")
+        for navn, command in servere:
+            for antal in FORBINDELSER:
+                measure(navn, command, env, antal)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: autocomplete opslag i prefix indekset over 100.000 varenavne.
+
+Måler opbygning af indekset, selve opslaget (mål: under 1 ms) for prefixer
+på 1-6 tegn, en inkrementel opdatering efter commit og hele endpointet
+GET /api/varer/autocomplete sammenlignet med GET /api/varer?q=.
+
+Kør med: uv run python -m benchmarks.bench_autocomplete
+"""
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import insert
+
+from benchmarks.common import make_app, seed, timer
+from backend.config import db
+from backend.models import Vare
+from backend.utils.autocomplete import get_index
+
+ANTAL_VARER = 100000
+OPSLAG = 20000
+
+STAVELSER = ['mæl', 'ost', 'brød', 'rug', 'kaf', 'fe', 'te', 'smør', 'æble', 'løg', 'kar', 'tof', 'fel',
+             'ris', 'pas', 'ta', 'laks', 'kyl', 'ling', 'hak', 'ket', 'ok', 'se', 'kød', 'yo', 'ghurt']
+
+
+def random_names(n, rng):
+    """Syntetiske varenavne med 1-3 ord."""
+    def word():
+        return ''.join(rng.choice(STAVELSER) for _ in range(rng.randint(1, 3)))
+    return [' '.join(word() for _ in range(rng.randint(1, 3))).capitalize() for _ in range(n)]
+
+
+def percentile(values, p):
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def main():
+    rng = random.Random(42)
+    app = make_app()
+    client = app.test_client()
+
+    with app.app_context():
+        seed(0, antal_kategorier=10)
+        db.session.execute(insert(Vare), [
+            {'navn': navn, 'kategori_id': (i % 10) + 1} for i, navn in enumerate(random_names(ANTAL_VARER, rng))
+        ])
+        db.session.commit()
+
+        with timer() as t:
+            index = get_index()
+        print(f'Byg indeks over {len(index)} varer: {t["seconds"] * 1000:.0f} ms')
+
+        navne = [row[0] for row in db.session.query(Vare.navn).limit(2000)]
+        prefixer = [rng.choice(navne)[:rng.randint(1, 6)] for _ in range(OPSLAG)]
+        tider = []
+        for prefix in prefixer:
+            start = time.perf_counter()
+            index.lookup(prefix, 10)
+            tider.append((time.perf_counter() - start) * 1e6)
+        tider.sort()
+        print(f'Opslag ({OPSLAG} prefixer, top 10): p50 {percentile(tider, 50):.1f} µs, '
+              f'p99 {percentile(tider, 99):.1f} µs, max {tider[-1]:.1f} µs')
+
+        vare = Vare(navn='Benchmark vare', kategori_id=1)
+        db.session.add(vare)
+        with timer() as t:
+            db.session.commit()
+        print(f'Commit af ny vare inkl. inkrementel opdatering: {t["seconds"] * 1000:.2f} ms')
+        assert index.lookup('benchmark')[0]['navn'] == 'Benchmark vare'
+
+    def endpoint(url):
+        tider = []
+        for prefix in prefixer[:200]:
+            start = time.perf_counter()
+            response = client.get(url + prefix)
+            tider.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200
+        return statistics.median(tider)
+
+    print(f'GET /api/varer/autocomplete?q=   median {endpoint("/api/varer/autocomplete?q="):7.2f} ms')
+    print(f'GET /api/varer?q=                median {endpoint("/api/varer/?q="):7.2f} ms')
+
+    if percentile(tider, 99) >= 1000:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
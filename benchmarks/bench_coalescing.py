@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: N samtidige ens GET requests med og uden single-flight.
+
+Starter SAMTIDIGE tråde bag en barriere, der alle henter den samme URL
+gennem Flask test klienten mod en fil-database, og tæller de SQL
+statements der sendes (opslag i data_version, som hver request laver for
+ETag og nøgle, tælles for sig). Læsecachen er slået fra, så alle requests
+ellers ville køre route funktionen. Hver liste-query forsinkes med
+FORSINKELSE sekunder, så requests når at overlappe som på en travl server.
+
+Med coalescing skal de samtidige requests tilsammen sende lige så mange
+liste-queries som én enkelt request, og alle skal få det samme svar.
+Scriptet fejler med exit kode 1 ellers.
+
+Kør med: uv run python -m benchmarks.bench_coalescing
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+SAMTIDIGE = (8, 32)
+FORSINKELSE = 0.05
+URLS = [
+    '/api/indkoebsliste/',
+    '/api/varer/?q=Vare 1',
+    '/api/indkoebsliste/historik?limit=200',
+]
+
+
+def run_concurrent(app, url, antal):
+    """Hent url fra antal tråde på én gang; returnerer (svar, liste-queries, version-queries, sekunder)."""
+    from benchmarks.common import count_queries
+
+    barrier = threading.Barrier(antal)
+    svar = [None] * antal
+
+    def worker(i):
+        client = app.test_client()
+        barrier.wait()
+        response = client.get(url)
+        svar[i] = (response.status_code, response.get_data())
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(antal)]
+    with app.app_context(), count_queries() as statements:
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sekunder = time.perf_counter() - start
+    versioner = sum(1 for statement in statements if 'data_version' in statement)
+    return svar, len(statements) - versioner, versioner, sekunder
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Før backend importeres, da konfigurationen læser DATABASE_URL ved import
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'coalescing.db')}"
+        os.environ['METRICS_ENABLED'] = 'false'
+        from sqlalchemy import event
+        from benchmarks.common import make_app, seed
+        from backend.config import db
+        from backend.utils.coalescing import SingleFlight
+
+        app = make_app('production')
+        app.extensions['read_cache'] = None  # Hver request skal ellers køre route funktionen
+        with app.app_context():
+            seed(2000, aktive_pr_vare=1, koebte_pr_vare=1)
+            db.session.commit()
+
+            def slow_query(conn, cursor, statement, parameters, context, executemany):
+                if 'data_version' not in statement:
+                    time.sleep(FORSINKELSE)
+            event.listen(db.engine, 'before_cursor_execute', slow_query)
+
+        flights = app.extensions['coalescing']
+        ok = True
+        print(f"Samtidige GET requests, liste-queries forsinket {FORSINKELSE * 1000:.0f} ms\n")
+        print(f"{'url':<40}{'N':>4}{'coalescing':>12}{'queries':>9}{'versioner':>11}{'tid':>10}"
+              f"{'delte':>7}  svar ens")
+        for url in URLS:
+            # Én request alene (efter opvarmning af kategorinavne): hvor mange queries koster endpointet
+            app.extensions['coalescing'] = None
+            run_concurrent(app, url, 1)
+            _, enkelt, _, _ = run_concurrent(app, url, 1)
+            for antal in SAMTIDIGE:
+                for navn, aktiv in (('fra', None), ('til', SingleFlight(flights.ttl, flights.wait_timeout))):
+                    app.extensions['coalescing'] = aktiv
+                    svar, queries, versioner, sekunder = run_concurrent(app, url, antal)
+                    ens = all(s == svar[0] for s in svar) and svar[0][0] == 200
+                    delte = aktiv.stats()['joined'] + aktiv.stats()['reused'] if aktiv else 0
+                    print(f'{url:<40}{antal:>4}{navn:>12}{queries:>9}{versioner:>11}'
+                          f'{sekunder * 1000:>7.0f} ms{delte:>7}  {"ja" if ens else "NEJ"}')
+                    if aktiv is not None and (queries != enkelt or not ens):
+                        ok = False
+        app.extensions['coalescing'] = flights
+
+        print(f'\n{"OK" if ok else "FEJL"}: N samtidige requests med coalescing sender '
+              f'{"" if ok else "ikke "}det samme antal liste-queries som én request')
+        return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes sparet og CPU per request med gzip/brotli komprimering.
+
+Seeder ANTAL_VARER varer med købshistorik og henter store listesvar
+gennem Flask test klienten med læsecachen slået til, som i produktion:
+
+- uden komprimering (Accept-Encoding: identity)
+- gzip og brotli uden cache af komprimerede bodies (komprimeres hver gang)
+- gzip og brotli med cachen (samme ETag, så kun første request komprimerer)
+
+For hver variant vises svarets størrelse og CPU tid per request
+(time.process_time, median af GENTAGELSER blokke), så prisen for
+komprimeringen kan ses i forhold til de sparede bytes.
+
+Bemærk at de syntetiske varenavne ("Vare 123") komprimerer bedre end rigtige.
+
+Kør med: uv run python -m benchmarks.bench_compression
+"""
+import statistics
+import time
+
+from benchmarks.common import make_app, seed
+from backend.config import db
+from backend.utils.compression import brotli
+
+ANTAL_VARER = 5000
+GENTAGELSER = 5
+REQUESTS_PR_BLOK = 20
+
+ENDPOINTS = [
+    '/api/varer/',
+    '/api/varer/?cursor=&limit=100',
+    '/api/indkoebsliste/',
+    '/api/indkoebsliste/historik?limit=500',
+]
+
+
+def cpu_ms(client, url, headers):
+    """Median CPU ms per request og svarets størrelse i bytes."""
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.status_code
+    tider = []
+    for _ in range(GENTAGELSER):
+        start = time.process_time()
+        for _ in range(REQUESTS_PR_BLOK):
+            client.get(url, headers=headers)
+        tider.append((time.process_time() - start) * 1000 / REQUESTS_PR_BLOK)
+    return statistics.median(tider), len(response.data)
+
+
+def main():
+    app = make_app()
+    with app.app_context():
+        seed(ANTAL_VARER, aktive_pr_vare=0, koebte_pr_vare=2)
+        db.session.execute(db.text(
+            "INSERT INTO indkoebsliste_element (vare_id, status, tilfoejelsesdato, sync_version) "
+            "SELECT id, 'aktiv', CURRENT_TIMESTAMP, 0 FROM vare WHERE id % 25 = 0"
+        ))
+        db.session.commit()
+
+    compressor = app.extensions['compression']
+    cache = compressor.cache
+    client = app.test_client()
+
+    encodings = ['gzip', 'br'] if brotli is not None else ['gzip']
+    if brotli is None:
+        print('brotli er ikke installeret (pip install huskeseddel[fast]); springer br over')
+    print(f'{ANTAL_VARER} varer, gzip niveau {compressor.gzip_level}, brotli niveau {compressor.brotli_level}, '
+          f'median af {GENTAGELSER}x{REQUESTS_PR_BLOK} requests\n')
+    print(f"{'endpoint':<40}{'kodning':<16}{'bytes':>10}{'sparet':>9}{'CPU/req':>11}{'ekstra':>10}")
+
+    for url in ENDPOINTS:
+        base_ms, base_bytes = cpu_ms(client, url, {'Accept-Encoding': 'identity'})
+        print(f"{url:<40}{'identity':<16}{base_bytes:>10}{'':>9}{base_ms:>8.2f} ms")
+        for encoding in encodings:
+            for navn, cached in ((encoding, None), (f'{encoding} + cache', cache)):
+                compressor.cache = cached
+                ms, size = cpu_ms(client, url, {'Accept-Encoding': encoding})
+                print(f"{'':<40}{navn:<16}{size:>10}{1 - size / base_bytes:>8.0%} "
+                      f'{ms:>7.2f} ms{ms - base_ms:>+7.2f} ms')
+        compressor.cache = cache
+
+    stats = compressor.stats()
+    print(f"\nI alt {stats['bytes_in']} -> {stats['bytes_out']} bytes, "
+          f"{stats['cpu_seconds']:.2f} s CPU i komprimering, cache hit ratio {stats['cache']['hit_ratio']}")
+
+
+if __name__ == '__main__':
+    main()
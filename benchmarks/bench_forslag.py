@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GET /api/indkoebsliste/forslag med flere års købshistorik.
+
+Seeder 2.000 varer med 520 købte elementer hver (ti års ugentlige indkøb,
+1.040.000 rækker) og sammenligner svartiden fra den vedligeholdte
+koebsstatistik tabel med en GROUP BY over hele historikken, som endpointet
+ellers skulle lave for hvert request.
+
+Kør med: uv run python -m benchmarks.bench_forslag
+"""
+import statistics
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import make_app, seed, timer
+from backend.config import db
+
+ANTAL_VARER = 2000
+KOEB_PR_VARE = 520
+GENTAGELSER = 20
+
+SCAN_QUERY = text("""
+    SELECT vare_id, COUNT(*), MIN(tilfoejelsesdato), MAX(tilfoejelsesdato)
+    FROM indkoebsliste_element
+    WHERE status = 'købt'
+    GROUP BY vare_id
+""")
+
+
+def median_ms(fn):
+    """Median af GENTAGELSER kørsler i millisekunder."""
+    tider = []
+    for _ in range(GENTAGELSER):
+        start = time.perf_counter()
+        fn()
+        tider.append((time.perf_counter() - start) * 1000)
+    return statistics.median(tider)
+
+
+def main():
+    app = make_app()
+    client = app.test_client()
+
+    with app.app_context():
+        with timer() as t:
+            seed(ANTAL_VARER, koebte_pr_vare=KOEB_PR_VARE)
+        print(f'Seedet {ANTAL_VARER * KOEB_PR_VARE} købte elementer på {t["seconds"]:.1f} s '
+              f'(inkl. vedligeholdelse af koebsstatistik)')
+
+        scan = median_ms(lambda: db.session.execute(SCAN_QUERY).all())
+
+    response = client.get('/api/indkoebsliste/forslag')
+    assert response.status_code == 200, response.get_json()
+    endpoint = median_ms(lambda: client.get('/api/indkoebsliste/forslag'))
+
+    print(f'GET /forslag fra koebsstatistik   {endpoint:8.2f} ms')
+    print(f'GROUP BY over hele historikken    {scan:8.2f} ms (kun forespørgslen)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: skrivninger/sek når alle klienter skriver til én husstand og når
+de er fordelt på flere husstande (én SQLite fil per husstand).
+
+Gunicorn kører med HOUSEHOLD_MODE (WEB_WORKERS workers med WEB_THREADS
+tråde), og KLIENTER klient-processer opretter kategorier med POST
+/api/kategorier/ i VARIGHED sekunder. Klient i skriver til husstand
+i % antal husstande. Med én husstand venter alle skrivninger på den samme
+skrivelås; med flere har hver fil sin egen.
+
+Kør med: uv run python -m benchmarks.bench_households
+"""
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.bench_serving import ROOT, free_port, percentile, start, wait_for_server
+
+KLIENTER = 8
+VARIGHED = 10
+HUSSTANDE = (1, 2, 4, 8)
+
+
+def client(args):
+    """Opret kategorier i VARIGHED sekunder og returner latenser og fejl."""
+    port, nummer, husstand, stop_at = args
+    headers = {'Content-Type': 'application/json', 'X-Household': husstand}
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latenser = []
+    fejl = 0
+    i = 0
+    while time.time() < stop_at:
+        i += 1
+        body = json.dumps({'navn': f'Kategori {nummer}-{i}'})
+        start_tid = time.perf_counter()
+        try:
+            conn.request('POST', '/api/kategorier/', body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except OSError:
+            fejl += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        if response.status != 201:
+            fejl += 1
+            continue
+        latenser.append(time.perf_counter() - start_tid)
+    conn.close()
+    return latenser, fejl
+
+
+def measure(port, antal_husstande, runde):
+    """Belast serveren med KLIENTER skrivere fordelt på antal_husstande."""
+    husstande = [f'bench{runde}-{i}' for i in range(antal_husstande)]
+    for husstand in husstande:
+        # Åbn husstandens engine før målingen
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.request('GET', '/api/kategorier/', headers={'X-Household': husstand})
+        conn.getresponse().read()
+        conn.close()
+
+    stop_at = time.time() + VARIGHED
+    jobs = [(port, i, husstande[i % antal_husstande], stop_at) for i in range(KLIENTER)]
+    with multiprocessing.Pool(KLIENTER) as pool:
+        resultater = pool.map(client, jobs)
+
+    latenser = sorted(l for latens, _ in resultater for l in latens)
+    fejl = sum(f for _, f in resultater)
+    print(
+        f'{antal_husstande:>2} husstand(e)   {len(latenser) / VARIGHED:8.1f} skrivninger/s   '
+        f'p50 {percentile(latenser, 50) * 1000:6.1f} ms   '
+        f'p99 {percentile(latenser, 99) * 1000:6.1f} ms   fejl {fejl}'
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'default.db')}"
+        env['FLASK_ENV'] = 'production'
+        env['HOUSEHOLD_MODE'] = 'true'
+        env['HOUSEHOLD_DATA_DIR'] = os.path.join(tmp, 'households')
+        env['WEB_ACCESS_LOG'] = ''
+        env.setdefault('WEB_WORKERS', '4')
+        env['METRICS_ENABLED'] = 'false'
+        env['WEB_MAX_REQUESTS'] = '0'  # Ingen genstart af workers midt i målingen
+
+        # Husstande oprettes med CLI'en; serveren opretter dem ikke selv
+        for runde, antal in enumerate(HUSSTANDE):
+            for i in range(antal):
+                subprocess.run([sys.executable, '-m', 'flask', '--app', 'backend.app', 'db', 'init',
+                                '--household', f'bench{runde}-{i}'],
+                               cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+        port = free_port()
+        env['WEB_BIND'] = f'127.0.0.1:{port}'
+        print(f"POST /api/kategorier/, {KLIENTER} klienter, {VARIGHED} s, gunicorn "
+              f"{env['WEB_WORKERS']}w x {env.get('WEB_THREADS', 8)}t, {os.cpu_count()} CPU'er")
+
+        server = start([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'backend.wsgi:app'], env)
+        try:
+            wait_for_server(port)
+            for runde, antal in enumerate(HUSSTANDE):
+                measure(port, antal, runde)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
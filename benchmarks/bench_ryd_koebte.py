@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: DELETE /api/indkoebsliste/ryd-købte med 1.000.000 købte elementer.
+
+Sammenligner den tidligere per-række ORM sletning (ved 100.000 rækker, da den
+ellers tager for lang tid) med den nuværende bulk DELETE ved 1.000.000 rækker.
+Peak hukommelse måles med tracemalloc.
+
+Kør med: uv run python -m benchmarks.bench_ryd_koebte
+"""
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app, seed, timer
+from backend.config import db
+from backend.models import IndkoebslisteElement
+
+
+def orm_delete():
+    """Den gamle implementering: indlæs og slet hver række via sessionen."""
+    for element in IndkoebslisteElement.query.filter_by(status='købt').all():
+        db.session.delete(element)
+    db.session.commit()
+
+
+def run(antal_varer, koebte_pr_vare, fn):
+    """Seed data og mål tid og peak hukommelse for fn."""
+    app = make_app()
+    with app.app_context():
+        seed(antal_varer, koebte_pr_vare=koebte_pr_vare)
+        tracemalloc.start()
+        with timer() as t:
+            fn(app)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rest = IndkoebslisteElement.query.filter_by(status='købt').count()
+        db.session.remove()
+    return t['seconds'], peak, rest
+
+
+def main():
+    def via_endpoint(app):
+        response = app.test_client().delete('/api/indkoebsliste/ryd-købte')
+        assert response.status_code == 200, response.get_json()
+    
+    def via_endpoint_older_than(app):
+        # Trim historikken i to trin: først det ældste (seed lægger købte
+        # elementer med 7 dages mellemrum), derefter resten
+        cutoff = (datetime.utcnow() - timedelta(days=36)).isoformat()
+        for query in (f'?older_than={cutoff}', ''):
+            response = app.test_client().delete(f'/api/indkoebsliste/ryd-købte{query}')
+            assert response.status_code == 200
+    
+    kørsler = [
+        ('ORM per række', 100000, 1, lambda app: orm_delete()),
+        ('bulk DELETE', 100000, 1, via_endpoint),
+        ('bulk DELETE', 100000, 10, via_endpoint),
+        ('bulk DELETE + older_than', 100000, 10, via_endpoint_older_than),
+    ]
+    for navn, varer, pr_vare, fn in kørsler:
+        seconds, peak, rest = run(varer, pr_vare, fn)
+        print(f"{navn:<26}{varer * pr_vare:>9} rækker: {seconds:7.2f} s, "
+              f"peak {peak / 1024 / 1024:7.1f} MiB, tilbage {rest}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
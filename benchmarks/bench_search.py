@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: FTS5 søgning mod LIKE søgning i Vare.search på 100.000 varer.
+
+Kør med: uv run python -m benchmarks.bench_search
+"""
+import random
+import statistics
+import sys
+
+from benchmarks.common import make_app, seed, timer
+from backend.config import db
+from backend.models import Vare
+
+ORD = [
+    'mælk', 'ost', 'smør', 'æbler', 'pærer', 'løg', 'kød', 'fisk', 'brød', 'rugbrød',
+    'pasta', 'ris', 'kaffe', 'te', 'øl', 'vin', 'juice', 'yoghurt', 'skyr', 'æg',
+    'gulerødder', 'kartofler', 'tomater', 'agurk', 'salat', 'laks', 'rejer', 'kylling',
+    'hakket', 'økologisk', 'frosne', 'friske', 'store', 'små', 'røget', 'grønne',
+]
+SOEGNINGER = ['m', 'mæ', 'mælk', 'øko', 'røget laks', 'gulerødder', 'ost', 'å']
+ANTAL_VARER = 100000
+GENTAGELSER = 20
+
+
+def seed_navne(antal):
+    """Indsæt varer med realistiske, sammensatte navne."""
+    rnd = random.Random(42)
+    db.session.execute(
+        Vare.__table__.update().where(Vare.id == db.bindparam('b_id')).values(navn=db.bindparam('b_navn')),
+        [
+            {'b_id': i, 'b_navn': ' '.join(rnd.sample(ORD, 3)).capitalize()}
+            for i in range(1, antal + 1)
+        ]
+    )
+    db.session.commit()
+
+
+def measure(app, use_fts):
+    """Returner median og p95 i ms for hver søgning."""
+    app.config['SEARCH_USE_FTS'] = use_fts
+    resultater = {}
+    for q in SOEGNINGER:
+        tider = []
+        for _ in range(GENTAGELSER):
+            with timer() as t:
+                antal = len(Vare.search(q))
+            tider.append(t['seconds'] * 1000)
+        tider.sort()
+        resultater[q] = (statistics.median(tider), tider[int(len(tider) * 0.95) - 1], antal)
+    return resultater
+
+
+def main():
+    app = make_app()
+    with app.app_context():
+        seed(ANTAL_VARER)
+        seed_navne(ANTAL_VARER)
+        
+        like = measure(app, use_fts=False)
+        fts = measure(app, use_fts=True)
+    
+    print(f"{'søgning':<14}{'LIKE p50':>10}{'LIKE p95':>10}{'FTS p50':>10}{'FTS p95':>10}{'træf LIKE/FTS':>16}")
+    for q in SOEGNINGER:
+        l50, l95, ln = like[q]
+        f50, f95, fn = fts[q]
+        print(f"{q:<14}{l50:>9.1f}ms{l95:>8.1f}ms{f50:>8.1f}ms{f95:>8.1f}ms{ln:>9}/{fn}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serialisering af GET /api/varer med 50.000 varer.
+
+Sammenligner den tidligere vej (ORM objekter med to_dict() og Flasks
+standard JSON provider med sorterede nøgler) med rækker fra
+Vare.listing_rows_query, serialize_varer og FastJSONProvider, med og uden
+orjson. Tid er bedste af GENTAGELSER; allokeringer måles med tracemalloc
+(peak under kørslen) i en separat kørsel.
+
+Til sidst måles hele endpointet gennem test klienten med læsecachen slået
+fra, så hver request rammer databasen.
+
+Kør med: uv run python -m benchmarks.bench_serialization
+"""
+import gc
+import time
+import tracemalloc
+
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.common import make_app, seed
+from backend.config import db
+from backend.models import Vare
+from backend.utils.serialization import FastJSONProvider, orjson, serialize_varer
+
+ANTAL_VARER = 50000
+GENTAGELSER = 5
+
+
+def old_path(app):
+    rows = Vare.search_listing_query('', None, None).all()
+    body = app.json.response([
+        vare.to_dict(kategori_navn, paa_liste)
+        for vare, kategori_navn, paa_liste in rows
+    ]).get_data()
+    db.session.expunge_all()
+    return body
+
+
+def new_path(app):
+    rows = Vare.search_rows_query('', None, None).all()
+    return app.json.response(serialize_varer(rows)).get_data()
+
+
+def measure(app, path):
+    """(bedste tid i sekunder, peak MiB, bytes)."""
+    body = path(app)
+    tider = []
+    for _ in range(GENTAGELSER):
+        gc.collect()
+        start = time.perf_counter()
+        path(app)
+        tider.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    path(app)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tider), peak / 1024 / 1024, len(body)
+
+
+def main():
+    app = make_app()
+    app.extensions['read_cache'] = None  # Hver request skal serialisere
+
+    varianter = [
+        ('to_dict + Flask json (sort_keys)', old_path, DefaultJSONProvider(app)),
+        ('rækker + json', new_path, FastJSONProvider(app, use_orjson=False)),
+    ]
+    if orjson is not None:
+        varianter.append(('rækker + orjson', new_path, FastJSONProvider(app, use_orjson=True)))
+    else:
+        print('orjson er ikke installeret (pip install huskeseddel[fast]); springer orjson over')
+
+    with app.app_context():
+        seed(ANTAL_VARER, aktive_pr_vare=0, koebte_pr_vare=0)
+        db.session.execute(db.text(
+            "INSERT INTO indkoebsliste_element (vare_id, status, tilfoejelsesdato, sync_version) "
+            "SELECT id, 'aktiv', CURRENT_TIMESTAMP, 0 FROM vare WHERE id % 10 = 0"
+        ))
+        db.session.commit()
+
+        print(f'{ANTAL_VARER} varer, bedste af {GENTAGELSER}:')
+        resultater = {}
+        for navn, path, provider in varianter:
+            app.json = provider
+            with app.test_request_context('/api/varer/'):
+                resultater[navn] = measure(app, path)
+            sekunder, peak, size = resultater[navn]
+            print(f'  {navn:<34} {sekunder * 1000:8.1f} ms   peak {peak:6.1f} MiB   {size / 1024 / 1024:5.1f} MiB JSON')
+
+        base = resultater[varianter[0][0]]
+        for navn, _, _ in varianter[1:]:
+            sekunder, peak, _ = resultater[navn]
+            print(f'  {navn}: {base[0] / sekunder:.1f}x hurtigere, {base[1] - peak:.1f} MiB mindre peak')
+
+    # Hele endpointet (uden læsecache og ETag) med hver provider
+    client = app.test_client()
+    print('GET /api/varer/ gennem test klienten:')
+    for navn, _, provider in varianter[1:]:
+        app.json = provider
+        tider = []
+        for _ in range(GENTAGELSER):
+            start = time.perf_counter()
+            response = client.get('/api/varer/')
+            tider.append(time.perf_counter() - start)
+            assert response.status_code == 200
+        print(f'  {navn:<34} {min(tider) * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
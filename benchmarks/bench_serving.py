@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark: requests/sek for GET /api/indkoebsliste med Werkzeug dev serveren
+(app.run, som run_backend.py brugte i produktion) og med gunicorn
+(gunicorn.conf.py, WEB_WORKERS workers med WEB_THREADS tråde).
+
+Begge servere kører mod den samme fil-baserede SQLite database i hver sin
+proces, og belastningen genereres af KLIENTER klient-processer der hver
+sender requests i VARIGHED sekunder (en ny forbindelse per request).
+
+Kør med: uv run python -m benchmarks.bench_serving
+"""
+import http.client
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KLIENTER = 8
+VARIGHED = 10
+AKTIVE_ELEMENTER = 200
+STI = '/api/indkoebsliste/'
+
+
+def percentile(values, p):
+    """Simpel percentil på en sorteret liste."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def free_port():
+    """Find en ledig TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def seed_database():
+    """Opret databasen med aktive elementer (i en child proces)."""
+    from benchmarks.common import make_app, seed
+    app = make_app('production')
+    with app.app_context():
+        seed(AKTIVE_ELEMENTER, aktive_pr_vare=1)
+
+
+def run_dev_server(port):
+    """Start Werkzeug dev serveren som run_backend.py gjorde (i en child proces)."""
+    from backend.app import create_app
+    app = create_app('production')
+    app.run(host='127.0.0.1', port=port, threaded=True)
+
+
+def wait_for_server(port, timeout=30):
+    """Vent til serveren svarer på health check."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'Serveren på port {port} startede ikke')
+
+
+def client(args):
+    """Send requests i VARIGHED sekunder og returner latenser og fejl."""
+    port, stop_at = args
+    latenser = []
+    fejl = 0
+    while time.time() < stop_at:
+        start = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.request('GET', STI)
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status != 200:
+                fejl += 1
+                continue
+        except OSError:
+            fejl += 1
+            continue
+        latenser.append(time.perf_counter() - start)
+    return latenser, fejl
+
+
+def measure(navn, port):
+    """Belast serveren og udskriv requests/sek og latens."""
+    wait_for_server(port)
+    stop_at = time.time() + VARIGHED
+    with multiprocessing.Pool(KLIENTER) as pool:
+        resultater = pool.map(client, [(port, stop_at)] * KLIENTER)
+
+    latenser = sorted(l for latens, _ in resultater for l in latens)
+    fejl = sum(f for _, f in resultater)
+    print(
+        f'{navn:<28} {len(latenser) / VARIGHED:8.1f} req/s   '
+        f'p50 {percentile(latenser, 50) * 1000:6.1f} ms   '
+        f'p99 {percentile(latenser, 99) * 1000:6.1f} ms   fejl {fejl}'
+    )
+
+
+def start(command, env):
+    """Start en server proces uden at fylde terminalen med access logs."""
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--seed':
+        seed_database()
+        return
+    if len(sys.argv) > 2 and sys.argv[1] == '--dev':
+        run_dev_server(int(sys.argv[2]))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        env['FLASK_ENV'] = 'production'
+        env['WEB_ACCESS_LOG'] = ''
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_serving', '--seed'], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+        print(f'GET {STI} med {AKTIVE_ELEMENTER} aktive elementer, {KLIENTER} klienter, {VARIGHED} s, '
+              f'{os.cpu_count()} CPU\'er')
+
+        port = free_port()
+        server = start([sys.executable, '-m', 'benchmarks.bench_serving', '--dev', str(port)], env)
+        try:
+            measure('Werkzeug dev server', port)
+        finally:
+            server.terminate()
+            server.wait()
+
+        port = free_port()
+        env['WEB_BIND'] = f'127.0.0.1:{port}'
+        server = start([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'backend.wsgi:app'], env)
+        try:
+            measure(f"gunicorn ({env.get('WEB_WORKERS', 2)}w x {env.get('WEB_THREADS', 8)}t)", port)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: samtidige skrivere mod en fil-baseret SQLite database med og
+uden SQLite tuning (WAL, synchronous=NORMAL, busy_timeout osv.).
+
+Hver tråd tilføjer varer til listen og markerer dem som købt via API'et,
+mens en læsetråd henter listen. Der rapporteres skrivninger/sek, p50/p99
+latens og antal fejl (typisk "database is locked").
+
+Hver konfiguration køres i sin egen proces, så indstillingerne læses
+fra miljøvariablerne ved import.
+
+Kør med: uv run python -m benchmarks.bench_sqlite_concurrency
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SKRIVERE = 8
+OPERATIONER_PR_SKRIVER = 150
+
+
+def percentile(values, p):
+    """Simpel percentil på en sorteret liste."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def worker_run():
+    """Kør selve målingen (i en child proces)."""
+    from benchmarks.common import make_app, seed
+    from backend.config import db
+    
+    app = make_app('production')
+    with app.app_context():
+        seed(SKRIVERE * OPERATIONER_PR_SKRIVER)
+        db.session.remove()
+    
+    latenser = []
+    fejl = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    
+    def skriver(n):
+        client = app.test_client()
+        første = n * OPERATIONER_PR_SKRIVER + 1
+        for vare_id in range(første, første + OPERATIONER_PR_SKRIVER):
+            start = time.perf_counter()
+            response = client.post('/api/indkoebsliste/tilfoej', json={'vare_id': vare_id})
+            if response.status_code == 201:
+                element_id = response.get_json()['id']
+                response = client.post(f'/api/indkoebsliste/{element_id}/koeb')
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.status_code in (200, 201):
+                    latenser.append(elapsed)
+                else:
+                    fejl.append(response.get_json().get('details', response.status_code))
+    
+    def læser():
+        client = app.test_client()
+        while not stop.is_set():
+            client.get('/api/indkoebsliste/')
+    
+    læsetråd = threading.Thread(target=læser)
+    læsetråd.start()
+    tråde = [threading.Thread(target=skriver, args=(n,)) for n in range(SKRIVERE)]
+    start = time.perf_counter()
+    for t in tråde:
+        t.start()
+    for t in tråde:
+        t.join()
+    varighed = time.perf_counter() - start
+    stop.set()
+    læsetråd.join()
+    
+    latenser.sort()
+    print(json.dumps({
+        'ops_per_sec': len(latenser) / varighed,
+        'p50_ms': percentile(latenser, 50) * 1000,
+        'p99_ms': percentile(latenser, 99) * 1000,
+        'errors': len(fejl),
+        'first_error': str(fejl[0]) if fejl else None
+    }))
+
+
+def main():
+    if os.environ.get('BENCH_CHILD'):
+        worker_run()
+        return 0
+    
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for tuning in ('false', 'true'):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                BENCH_CHILD='1',
+                SQLITE_TUNING=tuning,
+                READ_CACHE_ENABLED='false',
+                DATABASE_URL=f'sqlite:///{os.path.join(tmp, "bench.db")}'
+            )
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_sqlite_concurrency'],
+                cwd=root, env=env, capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+        
+        label = 'med tuning' if tuning == 'true' else 'uden tuning'
+        print(f"{label:<12} {result['ops_per_sec']:8.1f} ops/s  p50 {result['p50_ms']:7.1f} ms  "
+              f"p99 {result['p99_ms']:7.1f} ms  fejl {result['errors']}")
+        if result['first_error']:
+            print(f"{'':<12} første fejl: {result['first_error']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Load test: mange idle abonnenter på /api/indkoebsliste/stream.
+
+Starter en rigtig (trådet) WSGI server, åbner ABONNENTER samtidige SSE
+forbindelser og måler processens CPU forbrug mens de er idle. Derefter
+tilføjes en vare til listen, og der måles hvor lang tid det tager før alle
+abonnenter har modtaget eventet. Til sidst testes genoptagelse med
+Last-Event-ID.
+
+Kør med: uv run python -m benchmarks.bench_sse
+"""
+import selectors
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from benchmarks.common import make_app, seed
+from backend.config import db
+
+ABONNENTER = 300
+IDLE_SEKUNDER = 10
+
+
+def open_stream(port, last_event_id=None):
+    """Åbn en SSE forbindelse og læs svar headers."""
+    sock = socket.create_connection(('127.0.0.1', port))
+    headers = 'GET /api/indkoebsliste/stream HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n'
+    if last_event_id:
+        headers += f'Last-Event-ID: {last_event_id}\r\n'
+    sock.sendall((headers + '\r\n').encode())
+    buffer = b''
+    while b'retry:' not in buffer:
+        buffer += sock.recv(4096)
+    return sock
+
+
+def read_until(sock, marker, timeout=5):
+    """Læs fra en socket indtil marker er modtaget."""
+    sock.settimeout(timeout)
+    buffer = b''
+    while marker not in buffer:
+        buffer += sock.recv(4096)
+    return buffer.decode()
+
+
+def main():
+    app = make_app()
+    app.config['EVENT_MAX_SUBSCRIBERS'] = ABONNENTER + 10
+    app.extensions['event_broker'].max_subscribers = ABONNENTER + 10
+    with app.app_context():
+        seed(10)
+    
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+    broker = app.extensions['event_broker']
+    
+    sockets = [open_stream(port) for _ in range(ABONNENTER)]
+    while broker.subscriber_count() < ABONNENTER:
+        time.sleep(0.05)
+    print(f"{broker.subscriber_count()} abonnenter forbundet, {threading.active_count()} tråde")
+    
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    time.sleep(IDLE_SEKUNDER)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    print(f"CPU mens idle: {cpu * 1000:.1f} ms over {wall:.1f} s ({cpu / wall * 100:.2f}%)")
+    
+    selector = selectors.DefaultSelector()
+    for sock in sockets:
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+    
+    with app.app_context():
+        first_id = db.session.execute(db.text('SELECT COALESCE(MAX(id), 0) FROM liste_event')).scalar()
+    start = time.perf_counter()
+    with app.app_context():
+        response = app.test_client().post('/api/indkoebsliste/tilfoej', json={'vare_id': 1})
+        assert response.status_code == 201
+    
+    modtaget = set()
+    while len(modtaget) < ABONNENTER and time.perf_counter() - start < 10:
+        for key, _ in selector.select(timeout=1):
+            if b'element_added' in key.fileobj.recv(65536):
+                modtaget.add(key.fileobj)
+    print(f"Event leveret til {len(modtaget)}/{ABONNENTER} abonnenter på "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+    
+    for sock in sockets:
+        sock.close()
+    
+    # Genoptagelse: forbind med ID'et fra før eventet og forvent replay
+    first_id = str(first_id)
+    sock = open_stream(port, last_event_id=first_id)
+    data = read_until(sock, b'element_added')
+    print("Genoptagelse med Last-Event-ID:", 'OK' if 'element_added' in data else 'FEJL')
+    sock.close()
+    
+    server.shutdown()
+    return 0 if len(modtaget) == ABONNENTER else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: opstartstid fra ny proces til første svar.
+
+Hver måling kører i en frisk Python proces mod en eksisterende database og
+måler tre faser: import af backend.app (Flask, SQLAlchemy og appens egne
+moduler), create_app og den første request (GET /api/kategorier/ via test
+clienten, inkl. første database forbindelse). Desuden tælles SQL statements
+under create_app, som skal være 0.
+
+Målet er at create_app + første request ligger et godt stykke under 200 ms.
+
+Kør med: uv run python -m benchmarks.bench_startup
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MÅLINGER = 7
+MÅL_MS = 200
+
+
+def seed_database():
+    """Opret en database med sample data (i en child proces)."""
+    from benchmarks.common import make_app
+    from backend.config.database import init_sample_data
+    app = make_app('production')
+    with app.app_context():
+        init_sample_data()
+
+
+def measure_once():
+    """Mål én opstart (i en child proces) og udskriv resultatet som JSON."""
+    import time
+    start = time.perf_counter()
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from backend.app import create_app
+    imported = time.perf_counter()
+
+    statements = []
+    event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    app = create_app('production')
+    created = time.perf_counter()
+    create_statements = len(statements)
+
+    response = app.test_client().get('/api/kategorier/')
+    served = time.perf_counter()
+
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_request_ms': (served - created) * 1000,
+        'create_app_statements': create_statements,
+        'status': response.status_code
+    }))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--seed':
+        seed_database()
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        measure_once()
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--seed'], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+        resultater = []
+        for _ in range(MÅLINGER):
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_startup', '--measure'], cwd=ROOT, env=env,
+                                    check=True, capture_output=True, text=True).stdout
+            resultater.append(json.loads(output.strip().splitlines()[-1]))
+
+    def median(key):
+        return statistics.median(r[key] for r in resultater)
+
+    app_tid = median('create_app_ms') + median('first_request_ms')
+    print(f'Median af {MÅLINGER} opstarter:')
+    print(f"  import backend.app      {median('import_ms'):7.1f} ms")
+    print(f"  create_app              {median('create_app_ms'):7.1f} ms   "
+          f"({max(r['create_app_statements'] for r in resultater)} SQL statements)")
+    print(f"  første request          {median('first_request_ms'):7.1f} ms")
+    print(f'  create_app + request    {app_tid:7.1f} ms   (mål < {MÅL_MS} ms)')
+
+    if app_tid >= MÅL_MS or any(r['create_app_statements'] or r['status'] != 200 for r in resultater):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
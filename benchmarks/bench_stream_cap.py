@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Load test: resten af API'et svarer mens gunicorn har åbne SSE streams.
+
+Med gthread optager hver åben stream en tråd. Scriptet starter gunicorn med
+gunicorn.conf.py (WEB_WORKERS workers med WEB_THREADS tråde og
+EVENT_MAX_STREAMS streams per worker), åbner for hvert antal i STREAMS
+samtidige streams og holder dem åbne, mens det sender HEALTH_REQUESTS
+requests til /api/health og GET /api/indkoebsliste/ med SVAR_TIMEOUT.
+
+Streams over grænsen skal få 503 med Retry-After, og alle requests til
+resten af API'et skal svare. Scriptet fejler med exit kode 1 ellers.
+
+Kør med: uv run python -m benchmarks.bench_stream_cap
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.bench_asgi import SVAR_TIMEOUT, open_streams, request
+from benchmarks.bench_serving import ROOT, free_port, start, wait_for_server
+
+HEALTH_REQUESTS = 20
+
+
+def measure(env, antal):
+    """Åbn antal streams mod en ny server; returnerer True hvis API'et svarede hele tiden."""
+    port = free_port()
+    server = start([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'backend.wsgi:app'],
+                   dict(env, WEB_BIND=f'127.0.0.1:{port}'))
+    try:
+        wait_for_server(port)
+        forbundne, afviste, ventende = open_streams(port, antal)
+        time.sleep(1)
+
+        latenser, fejl = [], 0
+        for i in range(HEALTH_REQUESTS):
+            status, sekunder, _ = request(port, 'GET', '/api/health' if i % 2 else '/api/indkoebsliste/')
+            if status != 200:
+                fejl += 1
+            else:
+                latenser.append(sekunder)
+        p50 = f'{statistics.median(latenser) * 1000:.1f} ms' if latenser else '-'
+        print(f'{antal:>8}{len(forbundne):>9}{len(afviste):>8}{len(ventende):>9}{p50:>10}{fejl:>7}')
+        for sock in forbundne + afviste + ventende:
+            sock.close()
+        return fejl == 0 and not ventende
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        env['FLASK_ENV'] = 'production'
+        env['WEB_ACCESS_LOG'] = ''
+        env['METRICS_ENABLED'] = 'false'
+        env['WEB_MAX_REQUESTS'] = '0'
+        env['WEB_TIMEOUT'] = '120'  # gthread workers må ikke genstartes mens de venter på streams
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_serving', '--seed'], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+        workers = int(env.get('WEB_WORKERS', 2))
+        threads = int(env.get('WEB_THREADS', 8))
+        print(f"gunicorn {workers}w x {threads}t, EVENT_MAX_STREAMS "
+              f"{env.get('EVENT_MAX_STREAMS', max(1, threads // 2))} per worker; "
+              f"{HEALTH_REQUESTS} requests til API'et med {SVAR_TIMEOUT} s timeout\n")
+        print(f"{'streams':>8}{'svarede':>9}{'afvist':>8}{'ventende':>9}{'p50 API':>10}{'fejl':>7}")
+        ok = all([measure(env, antal) for antal in (workers * threads // 2, workers * threads, 4 * workers * threads)])
+
+        print(f'\n{"OK" if ok else "FEJL"}: API\'et svarer{"" if ok else " ikke"} mens streams er åbne')
+        return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
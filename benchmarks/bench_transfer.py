@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming eksport og chunked import af historik.
+
+Seeder varer med 100 købte elementer hver, eksporterer historikken som
+NDJSON og CSV til en midlertidig fil og importerer NDJSON filen i en ny, tom
+database.
+
+Tiden måles ved 1.000.000 rækker. Peak hukommelse måles med tracemalloc
+ved 100.000 og 300.000 rækker (tracemalloc gør kørslen flere gange
+langsommere) for at vise at den er konstant i antal rækker.
+
+Kør med: uv run python -m benchmarks.bench_transfer
+"""
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.common import make_app, seed, timer
+from backend.models import IndkoebslisteElement
+from backend.utils.transfer import export_entity, import_entity, read_rows
+
+KOEB_PR_VARE = 100
+
+
+def measure(navn, antal, fn, trace):
+    """Kør fn og udskriv tid og rækker/sek, eller peak hukommelse med trace."""
+    if trace:
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{navn:<24} {antal:>9} rækker: peak {peak / 1024 / 1024:6.1f} MiB')
+        return
+
+    with timer() as t:
+        fn()
+    print(f'{navn:<24} {antal:>9} rækker: {t["seconds"]:6.2f} s ({antal / t["seconds"]:>7.0f} rækker/s)')
+
+
+def export_to(path, entity, fmt):
+    def run():
+        with open(path, 'w', encoding='utf-8') as output:
+            for chunk in export_entity(entity, fmt):
+                output.write(chunk)
+    return run
+
+
+def run(antal, trace):
+    """Eksporter og importer `antal` historik rækker."""
+    with tempfile.TemporaryDirectory() as tmp:
+        varer_path = os.path.join(tmp, 'varer.ndjson')
+        historik_path = os.path.join(tmp, 'historik.ndjson')
+
+        app = make_app()
+        with app.app_context():
+            seed(antal // KOEB_PR_VARE, koebte_pr_vare=KOEB_PR_VARE)
+            export_to(varer_path, 'varer', 'ndjson')()
+            measure('eksport historik NDJSON', antal, export_to(historik_path, 'historik', 'ndjson'), trace)
+            measure('eksport historik CSV', antal, export_to(os.path.join(tmp, 'historik.csv'), 'historik', 'csv'),
+                    trace)
+
+        app = make_app()
+        with app.app_context():
+            with open(varer_path, 'rb') as fil:
+                import_entity('varer', read_rows(fil))
+
+            def run_import():
+                with open(historik_path, 'rb') as fil:
+                    resultat = import_entity('historik', read_rows(fil))
+                assert resultat['importeret'] == antal, resultat
+
+            measure('import historik NDJSON', antal, run_import, trace)
+            assert IndkoebslisteElement.query.count() == antal
+
+
+def main():
+    print('Hukommelse (tracemalloc):')
+    run(100000, trace=True)
+    run(300000, trace=True)
+    print('Tid:')
+    run(1000000, trace=False)
+
+
+if __name__ == '__main__':
+    main()
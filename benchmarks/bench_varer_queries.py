@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark: GET /api/varer må ikke lave N+1 queries.
+
+Antallet af SQL statements skal være det samme ved 10 og 10.000 varer.
+Scriptet afslutter med exit code 1 hvis det ikke er tilfældet.
+
+Kør med: uv run python -m benchmarks.bench_varer_queries
+"""
+import sys
+
+from benchmarks.common import make_app, seed, count_queries, timer
+from backend.config import db
+
+
+def measure(antal_varer):
+    """Returner (antal queries, sekunder) for GET /api/varer."""
+    app = make_app()
+    with app.app_context():
+        seed(antal_varer, aktive_pr_vare=1, koebte_pr_vare=3)
+        client = app.test_client()
+        with count_queries() as statements, timer() as t:
+            response = client.get('/api/varer/')
+        assert response.status_code == 200
+        assert len(response.get_json()) == antal_varer
+        db.session.remove()
+    return len(statements), t['seconds']
+
+
+def main():
+    resultater = {n: measure(n) for n in (10, 10000)}
+    for n, (queries, seconds) in resultater.items():
+        print(f"{n:>6} varer: {queries} queries, {seconds * 1000:.1f} ms")
+    
+    if len({queries for queries, _ in resultater.values()}) != 1:
+        print("FEJL: antallet af queries afhænger af antallet af varer (N+1)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tjek med EXPLAIN QUERY PLAN at de varme forespørgsler bruger indekser.
+
+Scriptet fejler (exit code 1) hvis en af forespørgslerne laver en fuld
+tabelscanning, eller hvis indekserne ikke kan migreres ind i en database
+der er oprettet uden dem.
+
+Kør med: uv run python -m benchmarks.check_query_plans
+"""
+import re
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect
+from sqlalchemy.dialects import sqlite
+
+from benchmarks.common import make_app, seed
+from backend.config import db, create_indexes
+from backend.models import Vare, IndkoebslisteElement
+from backend.utils.archive import compact_history
+
+# "SCAN tabel" uden "USING (COVERING) INDEX" er en fuld tabelscanning
+# (en scanning af en subquery, f.eks. "SCAN historik", tæller ikke)
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def query_plan(query):
+    """Returner detaljerne fra EXPLAIN QUERY PLAN for en ORM query."""
+    statement = query.statement.compile(
+        dialect=sqlite.dialect(), compile_kwargs={'literal_binds': True}
+    )
+    rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {statement}')).all()
+    return [row[3] for row in rows]
+
+
+def check_migration():
+    """Slet indekserne og kontroller at create_indexes genskaber dem."""
+    for table in (Vare.__table__, IndkoebslisteElement.__table__):
+        for index in table.indexes:
+            index.drop(db.engine)
+    create_indexes()
+    
+    inspector = inspect(db.engine)
+    mangler = [
+        index.name
+        for table in (Vare.__table__, IndkoebslisteElement.__table__)
+        for index in table.indexes
+        if index.name not in {i['name'] for i in inspector.get_indexes(table.name)}
+    ]
+    return mangler
+
+
+def main():
+    app = make_app()
+    fejl = 0
+    with app.app_context():
+        seed(5000, koebte_pr_vare=5, aktive_pr_vare=1)
+        # Køb ældre end 20 dage (3 af 5 per vare) flyttes til arkivet
+        compact_history(20)
+        
+        mangler = check_migration()
+        if mangler:
+            print(f"FEJL: indekser blev ikke migreret: {', '.join(mangler)}")
+            fejl += 1
+        
+        db.session.execute(db.text('ANALYZE'))
+        
+        queries = {
+            'find_active_by_vare': IndkoebslisteElement.query.filter_by(vare_id=42, status='aktiv'),
+            'get_active_list': IndkoebslisteElement.active_list_query(),
+            'get_purchased_items': IndkoebslisteElement.purchased_items_query().limit(50),
+            'get_by_category': Vare.query.filter_by(kategori_id=3).order_by(Vare.navn),
+            'search (kategorifilter)': Vare.query.filter(Vare.kategori_id.in_([1, 2])).order_by(Vare.navn),
+            'listing_query (paa_liste)': Vare.listing_query().order_by(Vare.navn, Vare.id),
+            'historik_rows_query (side 2)': IndkoebslisteElement.historik_rows_query(
+                50, [datetime.utcnow(), 10 ** 9]
+            ),
+        }
+        
+        for navn, query in queries.items():
+            plan = query_plan(query)
+            scans = [
+                line for line in plan
+                if FULL_SCAN.match(line) and FULL_SCAN.match(line).group(1) in db.metadata.tables
+            ]
+            status = 'FEJL' if scans else 'OK'
+            fejl += bool(scans)
+            print(f"{status:<5}{navn}")
+            for line in plan:
+                print(f"       {line}")
+    
+    return 1 if fejl else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
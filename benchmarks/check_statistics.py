@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tjek at de trigger-vedligeholdte tabeller svarer til en genberegning.
+
+Udfører SKRIDT tilfældige handlinger på få varer (tilføj til listen, køb,
+genaktiver, køb direkte som import gør, og indimellem arkivering af gammel
+historik) og sammenligner efter hvert skridt koebsstatistik med det
+rebuild_suggestions ville give, og kategori_statistik med det
+rebuild_statistics ville give.
+Få varer giver mange køb og fortrydelser af den samme vare, så også varer
+hvor det sidste køb fortrydes og varen købes igen bliver prøvet.
+
+Scriptet fejler (exit code 1) ved første afvigelse og udskriver skridtet.
+
+Kør med: uv run python -m benchmarks.check_statistics
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from benchmarks.common import make_app, seed
+from backend.config import db
+from backend.models import IndkoebslisteElement
+from backend.utils import statistics, suggestions
+from backend.utils.archive import compact_history
+
+ANTAL_VARER = 5
+SKRIDT = 2000
+SEED = 1
+
+KOEBSSTATISTIK = text('SELECT vare_id, antal_koeb, foerste_koeb, sidste_koeb FROM koebsstatistik ORDER BY vare_id')
+KATEGORI_STATISTIK = text('SELECT * FROM kategori_statistik ORDER BY kategori_id')
+
+
+def snapshot():
+    """Indholdet af de vedligeholdte tabeller."""
+    return db.session.execute(KOEBSSTATISTIK).all(), db.session.execute(KATEGORI_STATISTIK).all()
+
+
+def rebuilt():
+    """
+    Tabellerne som rebuild_suggestions og rebuild_statistics ville bygge dem.
+
+    Genberegningen rulles tilbage, så afvigelser i de vedligeholdte tabeller
+    kan ophobes over flere skridt som i en rigtig database.
+    """
+    db.session.commit()
+    for statement in suggestions._REBUILD_STATEMENTS + statistics._REBUILD_STATEMENTS:
+        db.session.execute(text(statement))
+    forventet = snapshot()
+    db.session.rollback()
+    return forventet
+
+
+def step(rng, nu):
+    """Udfør én tilfældig handling; returnerer en beskrivelse."""
+    vare_id = rng.randint(1, ANTAL_VARER)
+    aktiv = db.session.execute(text(
+        "SELECT id FROM indkoebsliste_element WHERE vare_id = :v AND status = 'aktiv'"), {'v': vare_id}
+    ).scalar()
+    koebte = db.session.execute(text(
+        "SELECT id FROM indkoebsliste_element WHERE vare_id = :v AND status = 'købt'"), {'v': vare_id}
+    ).scalars().all()
+    dato = nu - timedelta(days=rng.randint(0, 720), seconds=rng.randint(0, 86400))
+    handling = rng.random()
+
+    if handling < 0.02:
+        compact_history(older_than_days=rng.randint(30, 720))
+        return 'arkiver'
+    if handling < 0.3 and koebte:
+        element_id = rng.choice(koebte)
+        db.session.execute(text("UPDATE indkoebsliste_element SET status = 'aktiv' WHERE id = :id"),
+                           {'id': element_id})
+        return f'genaktiver {element_id} (vare {vare_id})'
+    if handling < 0.6 and aktiv is not None:
+        db.session.execute(text("UPDATE indkoebsliste_element SET status = 'købt' WHERE id = :id"), {'id': aktiv})
+        return f'køb {aktiv} (vare {vare_id})'
+    status = 'aktiv' if aktiv is None and handling < 0.8 else 'købt'
+    db.session.execute(insert(IndkoebslisteElement), [
+        {'vare_id': vare_id, 'antal': 1, 'status': status, 'tilfoejelsesdato': dato}
+    ])
+    return f'tilføj {status} (vare {vare_id})'
+
+
+def main():
+    app = make_app()
+    rng = random.Random(SEED)
+    nu = datetime.utcnow()
+    with app.app_context():
+        seed(ANTAL_VARER, antal_kategorier=2)
+        db.session.commit()
+
+        for nummer in range(1, SKRIDT + 1):
+            handling = step(rng, nu)
+            db.session.commit()
+            for navn, vedligeholdt, forventet in zip(('koebsstatistik', 'kategori_statistik'), snapshot(), rebuilt()):
+                if vedligeholdt != forventet:
+                    print(f'FEJL efter skridt {nummer} ({handling}): {navn} afviger fra en genberegning')
+                    print(f'  vedligeholdt: {vedligeholdt}')
+                    print(f'  genberegnet:  {forventet}')
+                    return 1
+
+    print(f'OK: koebsstatistik og kategori_statistik svarer til en genberegning efter {SKRIDT} skridt')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
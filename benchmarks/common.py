@@ -0,0 +1,172 @@
+"""
+Fælles hjælpefunktioner til benchmarks: app opsætning, data-seeding og måling.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Tilføj projektets rod til Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert
+
+from backend.app import create_app
+from backend.config import db, create_tables
+from backend.models import Kategori, Vare, IndkoebslisteElement
+from backend.utils.search import drop_search_index
+
+
+def make_app(config_name='testing'):
+    """Opret en app med en tom database."""
+    app = create_app(config_name)
+    with app.app_context():
+        drop_search_index()
+        db.drop_all()
+        create_tables()
+    return app
+
+
+def seed(antal_varer, antal_kategorier=10, aktive_pr_vare=0, koebte_pr_vare=0, batch_size=10000):
+    """
+    Indsæt syntetiske data med bulk INSERT statements.
+    
+    Skal kaldes inden for en app context.
+    """
+    db.session.execute(insert(Kategori), [
+        {'navn': f'Kategori {i}', 'oprettelsesdato': datetime.utcnow()}
+        for i in range(1, antal_kategorier + 1)
+    ])
+    
+    nu = datetime.utcnow()
+    for start in range(0, antal_varer, batch_size):
+        stop = min(start + batch_size, antal_varer)
+        db.session.execute(insert(Vare), [
+            {
+                'id': i,
+                'navn': f'Vare {i:07d}',
+                'kategori_id': (i % antal_kategorier) + 1,
+                'note_vareregister': None,
+                'oprettelsesdato': nu,
+            }
+            for i in range(start + 1, stop + 1)
+        ])
+        
+        elementer = []
+        for i in range(start + 1, stop + 1):
+            for n in range(koebte_pr_vare):
+                elementer.append({
+                    'vare_id': i,
+                    'status': 'købt',
+                    'tilfoejelsesdato': nu - timedelta(days=7 * (n + 1)),
+                })
+            for _ in range(aktive_pr_vare):
+                elementer.append({'vare_id': i, 'status': 'aktiv', 'tilfoejelsesdato': nu})
+        if elementer:
+            db.session.execute(insert(IndkoebslisteElement), elementer)
+    
+    db.session.commit()
+
+
+# Varenavne i bulk_load, så søgning og autocomplete rammer en realistisk andel
+VAREORD = [
+    'Mælk', 'Havregryn', 'Rugbrød', 'Smør', 'Ost', 'Æbler', 'Bananer', 'Kaffe', 'Te', 'Pasta',
+    'Ris', 'Tomater', 'Agurk', 'Løg', 'Kartofler', 'Gulerødder', 'Hakket oksekød', 'Kylling',
+    'Laks', 'Æg', 'Yoghurt', 'Skyr', 'Juice', 'Øl', 'Vin', 'Toiletpapir', 'Opvaskemiddel',
+    'Shampoo', 'Tandpasta', 'Mel', 'Sukker', 'Salt', 'Peber', 'Olivenolie', 'Leverpostej',
+    'Rullepølse', 'Remoulade', 'Ketchup', 'Chips', 'Chokolade',
+]
+
+DATO_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def bulk_load(antal_varer, antal_kategorier=10, historik_pr_vare=0, aktive=0, batch_size=50000):
+    """
+    Opret en tom database og indlæs syntetiske data hurtigt.
+    
+    Rækkerne indsættes med executemany direkte på sqlite3 forbindelsen i én
+    transaktion, før søgeindeks og triggers findes. Bagefter opretter
+    create_tables() triggers og bygger FTS indekset, kategori_statistik og
+    koebsstatistik fra de indlæste data i stedet for række for række.
+    
+    Vare i købes hver 3.-30. dag (afhængigt af i) historik_pr_vare gange
+    bagud fra i dag; de første `aktive` varer er på den aktive liste.
+    Skal kaldes inden for en app context. Returnerer antal rækker per tabel.
+    """
+    drop_search_index()
+    db.drop_all()
+    db.create_all()
+    
+    nu = datetime.utcnow()
+    oprettet = nu.strftime(DATO_FORMAT)
+    # Købsdatoer per (interval, n) beregnes én gang i stedet for per række
+    datoer = {
+        interval: [(nu - timedelta(days=interval * (n + 1))).strftime(DATO_FORMAT) for n in range(historik_pr_vare)]
+        for interval in range(3, 31)
+    }
+    
+    def varer():
+        for i in range(1, antal_varer + 1):
+            yield i, f'{VAREORD[i % len(VAREORD)]} {i}', (i % antal_kategorier) + 1, oprettet
+    
+    def historik():
+        for i in range(1, antal_varer + 1):
+            for dato in datoer[3 + i % 28]:
+                yield i, 'købt', dato
+    
+    def aktive_elementer():
+        for i in range(1, min(aktive, antal_varer) + 1):
+            yield i, 'aktiv', oprettet
+    
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.executemany(
+            'INSERT INTO kategori (id, navn, oprettelsesdato) VALUES (?, ?, ?)',
+            ((k, f'Kategori {k}', oprettet) for k in range(1, antal_kategorier + 1))
+        )
+        cursor.executemany('INSERT INTO vare (id, navn, kategori_id, oprettelsesdato) VALUES (?, ?, ?, ?)', varer())
+        for rows in (historik(), aktive_elementer()):
+            cursor.executemany(
+                'INSERT INTO indkoebsliste_element (vare_id, status, tilfoejelsesdato) VALUES (?, ?, ?)', rows
+            )
+        connection.commit()
+    finally:
+        connection.close()
+    
+    with timer() as t:
+        create_tables()
+    return {
+        'kategori': antal_kategorier,
+        'vare': antal_varer,
+        'indkoebsliste_element': antal_varer * historik_pr_vare + min(aktive, antal_varer),
+        'afledte_data_sekunder': round(t['seconds'], 2),
+    }
+
+
+@contextmanager
+def count_queries():
+    """Tæl SQL statements der sendes til databasen inden for blokken."""
+    statements = []
+    engine = db.engine
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@contextmanager
+def timer():
+    """Mål tid i sekunder; resultatet ligger i result['seconds']."""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for REST API'et: alle endpoints i kategori, vare og
+indkoebsliste blueprints ved en given datamængde.
+
+1. En database seedes med bulk_load i en separat proces (1k, 100k eller
+   1M varer med lange købshistorikker).
+2. Hvert endpoint kaldes sekventielt gennem Flask test klienten og, hvis
+   gunicorn er installeret, gennem gunicorn (gunicorn.conf.py) med en
+   keep-alive forbindelse. Hver kørsel får sin egen kopi af databasen.
+3. Per endpoint rapporteres throughput, p50/p95/p99 latens, SQL queries og
+   SQL tid per request (fra Server-Timing headeren, se utils/metrics.py),
+   samt peak RSS for processen der svarer.
+
+Resultatet skrives som JSON og sammenlignes med benchmarks/baseline.json.
+En regression (p50, p95 og throughput ud over tolerancen, flere queries per
+request eller højere peak RSS) udskrives og giver exit kode 1.
+
+Kør med:
+    uv run python -m benchmarks.suite --scale 1k
+    uv run python -m benchmarks.suite --scale 100k --no-server
+    uv run python -m benchmarks.suite --scale 1k --update-baseline
+
+Skrive-endpoints kaldes på data som suiten selv opretter (kategorier,
+varer og liste elementer), så de seedede data kun ændres af det sidste
+endpoint (DELETE /api/indkoebsliste/ryd-købte, som kaldes én gang).
+SSE streamen er ikke med; den måles af benchmarks/bench_sse.py.
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.bench_serving import free_port, percentile, wait_for_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+SCALES = {
+    '1k': {'varer': 1000, 'kategorier': 20, 'historik_pr_vare': 50, 'aktive': 200, 'requests': 200},
+    '100k': {'varer': 100000, 'kategorier': 100, 'historik_pr_vare': 20, 'aktive': 200, 'requests': 100},
+    '1m': {'varer': 1000000, 'kategorier': 500, 'historik_pr_vare': 5, 'aktive': 200, 'requests': 50},
+}
+
+# Maksimal tid per endpoint før resten af dets requests springes over
+MAX_SECONDS_PER_CASE = 20
+
+_SERVER_TIMING_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+class Case:
+    """
+    Ét endpoint i suiten.
+
+    path og body kan være callables der får (i, state) og returnerer stien
+    eller JSON body for request nummer i. collect(state, data) kaldes med
+    hvert svar, så senere cases kan bruge ID'er oprettet af tidligere.
+    """
+
+    def __init__(self, method, path, body=None, name=None, collect=None, requests=None, max_varer=None):
+        self.method = method
+        self.path = path
+        self.body = body
+        self.name = name or f'{method} {path}'
+        self.collect = collect
+        self.requests = requests
+        self.max_varer = max_varer
+
+    def count(self, default):
+        if self.requests is None:
+            return default
+        return self.requests(default) if callable(self.requests) else self.requests
+
+    def request(self, i, state):
+        path = self.path(i, state) if callable(self.path) else self.path
+        body = self.body(i, state) if callable(self.body) else self.body
+        return path, body
+
+
+def _collect(key, field='id'):
+    def collect(state, data):
+        state.setdefault(key, []).append(data[field])
+    return collect
+
+
+def _collect_batch(key):
+    def collect(state, data):
+        state.setdefault(key, []).extend(result['element']['id'] for result in data['results'])
+    return collect
+
+
+def _batch(key, size=10):
+    return lambda i, state: state[key][i * size:(i + 1) * size]
+
+
+def build_cases():
+    """Alle endpoints i den rækkefølge de kaldes."""
+    return [
+        # kategori
+        Case('GET', '/api/kategorier/'),
+        Case('GET', '/api/kategorier/?cursor=&limit=50'),
+        Case('GET', lambda i, s: f'/api/kategorier/{i % 20 + 1}', name='GET /api/kategorier/<id>'),
+        Case('POST', '/api/kategorier/', lambda i, s: {'navn': f'Benchmark kategori {i}'},
+             collect=_collect('kategorier')),
+        Case('PUT', lambda i, s: f"/api/kategorier/{s['kategorier'][i]}", {'beskrivelse': 'Opdateret'},
+             name='PUT /api/kategorier/<id>'),
+        Case('DELETE', lambda i, s: f"/api/kategorier/{s['kategorier'][i]}", name='DELETE /api/kategorier/<id>'),
+
+        # vare
+        Case('GET', '/api/varer/', max_varer=100000),
+        Case('GET', '/api/varer/?cursor=&limit=50'),
+        Case('GET', '/api/varer/?q=mælk&cursor=&limit=50'),
+        Case('GET', '/api/varer/?kategori_id=1&kategori_id=2&cursor=&limit=50'),
+        Case('GET', '/api/varer/autocomplete?q=hav'),
+        Case('GET', lambda i, s: f'/api/varer/{i * 7919 % 1000 + 1}', name='GET /api/varer/<id>'),
+        Case('GET', lambda i, s: f'/api/varer/kategori/{i % 20 + 1}', name='GET /api/varer/kategori/<id>'),
+        Case('POST', '/api/varer/', lambda i, s: {'navn': f'Benchmark vare {i}', 'kategori_id': 1},
+             collect=_collect('varer'), requests=lambda n: n * 2),
+        Case('PUT', lambda i, s: f"/api/varer/{s['varer'][i]}", {'note_vareregister': 'Opdateret'},
+             name='PUT /api/varer/<id>'),
+
+        # indkoebsliste
+        Case('GET', '/api/indkoebsliste/'),
+        Case('GET', '/api/indkoebsliste/?cursor=&limit=50'),
+        Case('GET', '/api/indkoebsliste/historik'),
+        Case('GET', '/api/indkoebsliste/historik?cursor=&limit=50'),
+        Case('GET', '/api/indkoebsliste/stats'),
+        Case('GET', '/api/indkoebsliste/forslag'),
+        Case('POST', '/api/indkoebsliste/tilfoej', lambda i, s: {'vare_id': s['varer'][i]},
+             collect=_collect('elementer')),
+        Case('PUT', lambda i, s: f"/api/indkoebsliste/{s['elementer'][i]}", {'note_liste': '2 stk'},
+             name='PUT /api/indkoebsliste/<id>'),
+        Case('POST', lambda i, s: f"/api/indkoebsliste/{s['elementer'][i]}/koeb",
+             name='POST /api/indkoebsliste/<id>/koeb'),
+        Case('POST', lambda i, s: f"/api/indkoebsliste/{s['elementer'][i]}/genaktiver",
+             name='POST /api/indkoebsliste/<id>/genaktiver'),
+        Case('DELETE', lambda i, s: f"/api/indkoebsliste/{s['elementer'][i]}",
+             name='DELETE /api/indkoebsliste/<id>'),
+        Case('POST', '/api/indkoebsliste/batch/tilfoej',
+             lambda i, s: {'vare_ids': s['varer'][len(s['elementer']) + i * 10:len(s['elementer']) + (i + 1) * 10]},
+             collect=_collect_batch('batch_elementer'), requests=lambda n: n // 10),
+        Case('POST', '/api/indkoebsliste/batch/koeb',
+             lambda i, s: {'element_ids': _batch('batch_elementer')(i, s)}, requests=lambda n: n // 10),
+        Case('POST', '/api/indkoebsliste/batch/genaktiver',
+             lambda i, s: {'element_ids': _batch('batch_elementer')(i, s)}, requests=lambda n: n // 10),
+        Case('POST', '/api/indkoebsliste/batch/fjern',
+             lambda i, s: {'element_ids': _batch('batch_elementer')(i, s)}, requests=lambda n: n // 10),
+
+        # Oprydning: varerne er ikke længere på listen og kan slettes
+        Case('DELETE', lambda i, s: f"/api/varer/{s['varer'][i]}", name='DELETE /api/varer/<id>',
+             requests=lambda n: n * 2),
+        Case('DELETE', '/api/indkoebsliste/ryd-købte', requests=1),
+    ]
+
+
+class TestClientDriver:
+    """Kald endpoints gennem Flask test klienten i denne proces."""
+
+    name = 'test_client'
+
+    def __init__(self):
+        from backend.app import create_app
+        self.app = create_app('production')
+        self.client = self.app.test_client()
+
+    def request(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        data = response.get_data()
+        return response.status_code, response.headers.get('Server-Timing'), data
+
+    def peak_rss_mb(self):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def close(self):
+        pass
+
+
+class GunicornDriver:
+    """Kald endpoints på gunicorn over én keep-alive HTTP forbindelse."""
+
+    name = 'gunicorn'
+
+    def __init__(self, env):
+        self.port = free_port()
+        env = dict(env, WEB_BIND=f'127.0.0.1:{self.port}', WEB_ACCESS_LOG='')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'backend.wsgi:app'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        wait_for_server(self.port)
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+
+    def request(self, method, path, body):
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, _quote(path), payload, headers)
+            response = self.connection.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Workeren er genstartet (WEB_MAX_REQUESTS); forbind igen
+            self.connection.close()
+            self.connection.request(method, _quote(path), payload, headers)
+            response = self.connection.getresponse()
+        data = response.read()
+        return response.status, response.getheader('Server-Timing'), data
+
+    def peak_rss_mb(self):
+        """Højeste VmHWM blandt gunicorn processerne (kun Linux)."""
+        pids = [self.process.pid]
+        try:
+            with open(f'/proc/{self.process.pid}/task/{self.process.pid}/children') as f:
+                pids += [int(pid) for pid in f.read().split()]
+        except OSError:
+            return None
+        peak = 0
+        for pid in pids:
+            try:
+                with open(f'/proc/{pid}/status') as f:
+                    for line in f:
+                        if line.startswith('VmHWM:'):
+                            peak = max(peak, int(line.split()[1]))
+            except OSError:
+                pass
+        return peak / 1024 or None
+
+    def close(self):
+        self.connection.close()
+        self.process.terminate()
+        self.process.wait()
+
+
+def _quote(path):
+    from urllib.parse import quote
+    return quote(path, safe='/?=&')
+
+
+def run_case(driver, case, count, state):
+    """Kald et endpoint count gange og returner målingerne."""
+    latenser = []
+    queries = []
+    db_ms = []
+    fejl = []
+    start = time.perf_counter()
+    for i in range(count):
+        if time.perf_counter() - start > MAX_SECONDS_PER_CASE:
+            break
+        try:
+            path, body = case.request(i, state)
+        except (IndexError, KeyError):
+            # En tidligere case nåede ikke at oprette nok data (tidsgrænse eller fejl)
+            break
+        t0 = time.perf_counter()
+        status, server_timing, data = driver.request(case.method, path, body)
+        latenser.append(time.perf_counter() - t0)
+
+        if status >= 400:
+            fejl.append(f'{status} {path}: {data[:200]!r}')
+            continue
+        match = _SERVER_TIMING_RE.search(server_timing or '')
+        if match:
+            db_ms.append(float(match.group(1)))
+            queries.append(int(match.group(2)))
+        if case.collect is not None:
+            case.collect(state, json.loads(data))
+    elapsed = time.perf_counter() - start
+
+    latenser.sort()
+    return {
+        'requests': len(latenser),
+        'errors': len(fejl),
+        'error_samples': fejl[:3],
+        'rps': round(len(latenser) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latenser, 50) * 1000, 3),
+        'p95_ms': round(percentile(latenser, 95) * 1000, 3),
+        'p99_ms': round(percentile(latenser, 99) * 1000, 3),
+        # Typisk den første request, før læsecache og autocomplete indeks er varme
+        'max_ms': round(latenser[-1] * 1000, 3) if latenser else None,
+        'queries': round(sum(queries) / len(queries), 2) if queries else None,
+        'db_ms': round(sum(db_ms) / len(db_ms), 3) if db_ms else None,
+    }
+
+
+def run_suite(driver, scale):
+    """Kør alle cases mod en driver."""
+    settings = SCALES[scale]
+    state = {}
+    endpoints = {}
+    for case in build_cases():
+        if case.max_varer is not None and settings['varer'] > case.max_varer:
+            continue
+        result = run_case(driver, case, case.count(settings['requests']), state)
+        endpoints[case.name] = result
+        print(
+            f"  {case.name:<58} {result['rps'] or 0:8.1f} req/s  p50 {result['p50_ms']:8.2f}  "
+            f"p95 {result['p95_ms']:8.2f}  p99 {result['p99_ms']:8.2f} ms  "
+            f"queries {result['queries'] if result['queries'] is not None else '-':>5}"
+            + (f"  FEJL {result['errors']}" if result['errors'] else '')
+        )
+    peak = driver.peak_rss_mb()
+    print(f"  peak RSS: {peak:.1f} MiB" if peak else '  peak RSS: ukendt')
+    return {'peak_rss_mb': round(peak, 1) if peak else None, 'endpoints': endpoints}
+
+
+def seed_database(scale):
+    """Seed DATABASE_URL med bulk_load (køres i en child proces)."""
+    from backend.app import create_app
+    from benchmarks.common import bulk_load, timer
+    settings = SCALES[scale]
+    app = create_app('production')
+    with app.app_context():
+        with timer() as t:
+            rows = bulk_load(
+                settings['varer'], settings['kategorier'], settings['historik_pr_vare'], settings['aktive']
+            )
+    print(json.dumps({'seconds': round(t['seconds'], 2), 'rows': rows}))
+
+
+def compare(results, baseline, tolerance):
+    """
+    Sammenlign med baseline og returner en liste af regressioner.
+
+    Tider må være tolerance (f.eks. 0.5 = 50 %) dårligere end baseline og
+    mindst 1 ms langsommere før de tæller, og p50, p95 og throughput skal
+    alle være forværret. Queries per request skal være (næsten) uændrede, da de ikke
+    afhænger af maskinen.
+    """
+    regressions = []
+    for mode, current in results['modes'].items():
+        base = baseline.get(mode)
+        if base is None:
+            continue
+        if base.get('peak_rss_mb') and current.get('peak_rss_mb'):
+            if current['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+                regressions.append(
+                    f"{mode}: peak RSS {current['peak_rss_mb']} MiB > baseline {base['peak_rss_mb']} MiB"
+                )
+        for name, result in current['endpoints'].items():
+            old = base['endpoints'].get(name)
+            if old is None:
+                continue
+            if result['errors']:
+                regressions.append(f"{mode} {name}: {result['errors']} fejl, f.eks. {result['error_samples'][0]}")
+            # Et enkelt udsving (anden last på maskinen) rammer kun en af tiderne;
+            # en reel forværring flytter p50, p95 og throughput på én gang
+            slower = [
+                key for key in ('p50_ms', 'p95_ms')
+                if key in old and result[key] > old[key] * (1 + tolerance) and result[key] - old[key] > 1
+            ]
+            if old.get('rps') and result['rps'] and result['rps'] * (1 + tolerance) < old['rps'] \
+                    and 1000 / result['rps'] - 1000 / old['rps'] > 1:
+                slower.append('rps')
+            if len(slower) == len([key for key in ('p50_ms', 'p95_ms', 'rps') if old.get(key)]):
+                regressions.append(
+                    f"{mode} {name}: p50/p95 {result['p50_ms']}/{result['p95_ms']} ms, {result['rps']} req/s; "
+                    f"baseline {old.get('p50_ms')}/{old['p95_ms']} ms, {old['rps']} req/s"
+                )
+            if old.get('queries') is not None and result['queries'] is not None \
+                    and result['queries'] > old['queries'] + max(0.5, old['queries'] * 0.1):
+                regressions.append(f"{mode} {name}: {result['queries']} queries > baseline {old['queries']}")
+    return regressions
+
+
+def _baseline_entry(results):
+    """Den del af resultatet der gemmes som baseline."""
+    return {
+        mode: {
+            'peak_rss_mb': current['peak_rss_mb'],
+            'endpoints': {
+                name: {key: result[key] for key in ('rps', 'p50_ms', 'p95_ms', 'queries')}
+                for name, result in current['endpoints'].items()
+            }
+        }
+        for mode, current in results['modes'].items()
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite for REST API\'et')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--no-server', action='store_true', help='Spring gunicorn kørslen over')
+    parser.add_argument('--output', help='JSON resultatfil (standard benchmarks/results/<scale>.json)')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.5, help='Tilladt forværring af tider (0.5 = 50 %%)')
+    parser.add_argument('--update-baseline', action='store_true', help='Gem resultatet som ny baseline')
+    parser.add_argument('--seed', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed_database(args.scale)
+        return
+
+    settings = SCALES[args.scale]
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded = os.path.join(tmp, 'seed.db')
+        env = dict(os.environ, FLASK_ENV='production', DATABASE_URL=f'sqlite:///{seeded}')
+        print(f"Seeder {settings['varer']} varer med {settings['historik_pr_vare']} køb per vare ...")
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.suite', '--seed', '--scale', args.scale],
+            cwd=ROOT, env=env, check=True, capture_output=True, text=True
+        ).stdout
+        seed = json.loads(output.strip().splitlines()[-1])
+        print(f"  {seed['rows']} på {seed['seconds']} s")
+
+        results = {
+            'meta': {
+                'scale': args.scale,
+                'settings': settings,
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': _git_commit(),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'seed': seed,
+            'modes': {},
+        }
+
+        # Hver kørsel får sin egen kopi, da ryd-købte ændrer de seedede data
+        copy = os.path.join(tmp, 'test_client.db')
+        shutil.copyfile(seeded, copy)
+        os.environ.update(FLASK_ENV='production', DATABASE_URL=f'sqlite:///{copy}')
+        print('Flask test klient:')
+        driver = TestClientDriver()
+        try:
+            results['modes'][driver.name] = run_suite(driver, args.scale)
+        finally:
+            driver.close()
+
+        if args.no_server:
+            pass
+        elif importlib.util.find_spec('gunicorn') is None:
+            print('gunicorn er ikke installeret; springer server kørslen over')
+        else:
+            copy = os.path.join(tmp, 'gunicorn.db')
+            shutil.copyfile(seeded, copy)
+            print('gunicorn:')
+            driver = GunicornDriver(dict(env, DATABASE_URL=f'sqlite:///{copy}'))
+            try:
+                results['modes'][driver.name] = run_suite(driver, args.scale)
+            finally:
+                driver.close()
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f'{args.scale}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f'Resultat skrevet til {output_path}')
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline[args.scale] = _baseline_entry(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f'Baseline for {args.scale} opdateret i {args.baseline}')
+        return
+
+    errors = [
+        f'{mode} {name}: {result["errors"]} fejl, f.eks. {result["error_samples"][0]}'
+        for mode, current in results['modes'].items()
+        for name, result in current['endpoints'].items() if result['errors']
+    ]
+    if args.scale in baseline:
+        regressions = compare(results, baseline[args.scale], args.tolerance)
+        regressions += [error for error in errors if error not in regressions]
+    else:
+        print(f'Ingen baseline for {args.scale}; kør med --update-baseline for at gemme en')
+        regressions = errors
+
+    if regressions:
+        print('\n' + '!' * 72)
+        print(f'REGRESSION: {len(regressions)} målinger er dårligere end baseline ({args.scale}):')
+        for regression in regressions:
+            print(f'  - {regression}')
+        print('!' * 72)
+        sys.exit(1)
+    if args.scale in baseline:
+        print(f'OK: ingen regressioner i forhold til baseline ({args.scale})')
+
+
+if __name__ == '__main__':
+    main()
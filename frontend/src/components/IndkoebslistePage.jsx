@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { useQuery, useMutation, useQueryClient } from 'react-query';
 import { 
   Card, 
@@ -26,11 +26,48 @@ function IndkoebslistePage() {
 
   const queryClient = useQueryClient();
 
+  // Live opdateringer fra andre enheder i stedet for polling. EventSource
+  // genforbinder selv efter netværksfejl, men giver op hvis serveren svarer
+  // med en fejl (f.eks. 503 ved for mange streams); så prøves igen med
+  // stigende pause, og listen hentes i mellemtiden med en lang fallback.
+  const [liveForbundet, setLiveForbundet] = useState(true);
+  useEffect(() => {
+    let stream;
+    let timer;
+    let pause = 3000;
+    const refresh = () => {
+      queryClient.invalidateQueries('indkoebsliste');
+      queryClient.invalidateQueries('indkoebsliste-stats');
+      queryClient.invalidateQueries('indkoebsliste-historik');
+    };
+    const connect = () => {
+      stream = indkoebslisteService.openStream();
+      stream.onopen = () => {
+        pause = 3000;
+        setLiveForbundet(true);
+      };
+      stream.onerror = () => {
+        if (stream.readyState !== EventSource.CLOSED) return;
+        setLiveForbundet(false);
+        timer = setTimeout(connect, pause);
+        pause = Math.min(pause * 2, 60000);
+      };
+      ['element_added', 'element_updated', 'element_removed', 'purchased_cleared', 'reset']
+        .forEach((type) => stream.addEventListener(type, refresh));
+    };
+    connect();
+    return () => {
+      clearTimeout(timer);
+      stream.close();
+    };
+  }, [queryClient]);
+
   // Fetch aktiv indkøbsliste
   const { data: aktivListe = [], isLoading: listeLoading } = useQuery(
     'indkoebsliste',
     indkoebslisteService.getAktivListe,
     {
+      refetchInterval: liveForbundet ? false : 60000,
       onError: (err) => {
         setError(err.response?.data?.error || 'Kunne ikke hente indkøbsliste');
       }
@@ -45,7 +82,9 @@ function IndkoebslistePage() {
   );
 
   // Fetch liste statistik
-  const { data: stats } = useQuery('indkoebsliste-stats', indkoebslisteService.getStats);
+  const { data: stats } = useQuery('indkoebsliste-stats', indkoebslisteService.getStats, {
+    refetchInterval: liveForbundet ? false : 60000
+  });
 
   // Fetch varer for add modal
   const { data: alleVarer = [] } = useQuery(
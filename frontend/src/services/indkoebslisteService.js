@@ -1,7 +1,7 @@
 /**
  * Indkøbsliste API service
  */
-import apiClient from './api.js';
+import apiClient, { API_BASE_URL } from './api.js';
 
 export const indkoebslisteService = {
   // Hent aktiv indkøbsliste
@@ -55,6 +55,9 @@ export const indkoebslisteService = {
     return response.data;
   },
 
+  // Åbn live stream med ændringer (Server-Sent Events)
+  openStream: () => new EventSource(`${API_BASE_URL}/indkoebsliste/stream`),
+
   // Hent liste statistik
   getStats: async () => {
     const response = await apiClient.get('/indkoebsliste/stats');
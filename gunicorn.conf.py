@@ -0,0 +1,55 @@
+"""
+Gunicorn konfiguration for Huskeseddel backend.
+
+Alle indstillinger kan overstyres med miljøvariabler:
+- WEB_BIND               Adresse (default: 0.0.0.0:$PORT eller 0.0.0.0:5000)
+- WEB_WORKERS            Antal worker-processer (default: 2)
+- WEB_THREADS            Tråde per worker (default: 8)
+- EVENT_MAX_STREAMS      Åbne SSE streams per worker, 0 = ingen grænse (default: halvdelen af WEB_THREADS)
+- WEB_TIMEOUT            Sekunder før en hængende worker genstartes (default: 30)
+- WEB_GRACEFUL_TIMEOUT   Sekunder workers får til at afslutte requests ved reload/stop (default: 30)
+- WEB_KEEPALIVE          Sekunder en keep-alive forbindelse holdes åben (default: 5)
+- WEB_MAX_REQUESTS       Genstart en worker efter så mange requests, 0 = aldrig (default: 1000)
+- WEB_PRELOAD            Opret appen i master-processen før fork (default: true)
+- WEB_ACCESS_LOG         Fil til access log, '-' = stdout, tom = slået fra (default: -)
+
+Graceful reload: `kill -HUP <master pid>` starter nye workers og lader de
+gamle afslutte deres igangværende requests inden for WEB_GRACEFUL_TIMEOUT.
+Med WEB_PRELOAD=true indlæses koden i master, så ny kode kræver en
+genstart (eller USR2 efterfulgt af QUIT til den gamle master).
+"""
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get('WEB_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+
+# gthread: hver worker betjener flere requests samtidigt med tråde, så en
+# åben SSE stream (/api/indkoebsliste/stream) ikke blokerer hele workeren
+worker_class = 'gthread'
+workers = _env_int('WEB_WORKERS', 2)
+threads = _env_int('WEB_THREADS', 8)
+
+# Hver stream holder en tråd så længe den er åben. Over grænsen svarer
+# streamen 503 med Retry-After, så de øvrige tråde altid kan svare resten af
+# API'et. Mange samtidige live klienter: brug WEB_SERVER=uvicorn (backend/asgi.py).
+# Sættes før appen importeres, da konfigurationen læses ved import.
+os.environ.setdefault('EVENT_MAX_STREAMS', str(max(1, threads // 2)))
+
+timeout = _env_int('WEB_TIMEOUT', 30)
+graceful_timeout = _env_int('WEB_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('WEB_KEEPALIVE', 5)
+
+max_requests = _env_int('WEB_MAX_REQUESTS', 1000)
+max_requests_jitter = max_requests // 10
+
+# Appen (inkl. oprettelse af tabeller) oprettes én gang i master-processen.
+# Database forbindelser kasseres i hver worker efter fork (init_fork_safety).
+preload_app = os.environ.get('WEB_PRELOAD', 'true').lower() in ('true', '1', 'yes')
+
+accesslog = os.environ.get('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('WEB_LOG_LEVEL', 'info')
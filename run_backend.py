@@ -11,16 +11,53 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from backend.app import create_app
 
+
+def init_database(env):
+    """
+    Opret tabeller og sample data før serveren starter.
+    
+    Gøres én gang her i stedet for i create_app, så gunicorn workers ikke
+    kapløber om at oprette skema og sample data.
+    """
+    from backend.config.database import create_tables, init_sample_data
+    
+    app = create_app(env)
+    with app.app_context():
+        create_tables()
+        init_sample_data()
+    return app
+
+
+def run_uvicorn(root):
+    """
+    Erstat processen med uvicorn og backend.asgi:app (kræver huskeseddel[asgi]).
+
+    Bruger WEB_BIND, WEB_WORKERS og WEB_ACCESS_LOG ligesom gunicorn.conf.py.
+    """
+    bind = os.environ.get('WEB_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+    host, port = bind.rsplit(':', 1)
+    args = [
+        sys.executable, '-m', 'uvicorn', 'backend.asgi:app',
+        '--app-dir', root,
+        '--host', host,
+        '--port', port,
+        '--workers', os.environ.get('WEB_WORKERS', '2')
+    ]
+    if not os.environ.get('WEB_ACCESS_LOG', '-'):
+        args.append('--no-access-log')
+    print("🔧 Starting Huskeseddel backend in production mode (uvicorn)...")
+    os.execvp(sys.executable, args)
+
+
 def main():
     """Main entry point."""
     # Set environment
     env = os.environ.get('FLASK_ENV', 'development')
     
-    # Create app
-    app = create_app(env)
-    
     # Run server
     if env == 'development':
+        app = init_database(env)
+        
         print("🛒 Starter Huskeseddel backend i development mode...")
         print("📡 API tilgængelig på: http://localhost:5000")
         print("📋 Health check: http://localhost:5000/api/health")
@@ -42,13 +79,19 @@ def main():
             threaded=True  # Use threading instead of multiprocessing
         )
     else:
-        print("🔧 Starting Huskeseddel backend in production mode...")
-        print("📡 API listening on port 5000")
-        app.run(
-            debug=False,
-            host='0.0.0.0',
-            port=int(os.environ.get('PORT', 5000))
-        )
+        # Produktion køres af gunicorn med flere workers (se gunicorn.conf.py)
+        init_database(env)
+        root = os.path.dirname(os.path.abspath(__file__))
+        if os.environ.get('WEB_SERVER', 'gunicorn') == 'uvicorn':
+            run_uvicorn(root)
+        print("🔧 Starting Huskeseddel backend in production mode (gunicorn)...")
+        os.execvp(sys.executable, [
+            sys.executable, '-m', 'gunicorn',
+            '--config', os.path.join(root, 'gunicorn.conf.py'),
+            '--chdir', root,
+            'backend.wsgi:app'
+        ])
+
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
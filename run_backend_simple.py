@@ -8,10 +8,14 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from backend.app import create_app
+from backend.config.database import create_tables, init_sample_data
 
 def main():
     """Main entry point - no reloader."""
     app = create_app('development')
+    with app.app_context():
+        create_tables()
+        init_sample_data()
     
     print("🛒 Starter Huskeseddel backend (no-reloader mode)...")
     print("📡 API tilgængelig på: http://localhost:5000")